@@ -2,6 +2,8 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests run on a thread each, see core.asgi. Start it with
+``APP_SERVER=asgi`` in scripts/run.sh.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -9,8 +11,8 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
+from core.asgi import get_asgi_application  # noqa: E402
+
 application = get_asgi_application()
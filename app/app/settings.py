@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -51,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,10 +93,45 @@ DATABASES = {
         'NAME' : os.environ.get('DB_NAME'),
         'USER' : os.environ.get('DB_USER'),
         'PASSWORD' : os.environ.get('DB_PASSWORD'),
-        'PORT' : os.environ.get('DB_PORT')
+        'PORT' : os.environ.get('DB_PORT'),
+        # Seconds a worker thread keeps its connection between requests,
+        # 0 closing it after each one. Kept connections are checked with a
+        # SELECT 1 before each request (core.signals) unless health checks
+        # are turned off.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        # Set behind a pooler in transaction mode such as pgbouncer, where
+        # a cursor cannot outlive the transaction that declared it.
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            int(os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 0))
+        ),
     }
 }
 
+# Read replicas of the default database, as comma separated HOST[:PORT]
+# with the same name and credentials. GET list and retrieve requests of
+# the recipe API read from them (core.routers); a user who changed data
+# reads the primary for REPLICA_PIN_SECONDS afterwards, which should stay
+# above the replica lag. Pins are kept in a cache shared by the workers.
+REPLICA_DATABASES = []
+for index, replica in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))
+):
+    host, _, port = replica.partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+REPLICA_PIN_CACHE_ALIAS = os.environ.get('REPLICA_PIN_CACHE_ALIAS', 'default')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -126,6 +163,34 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing. New passwords use PASSWORD_HASHER (scrypt, argon2 or
+# pbkdf2); logins with a hash from another hasher or older parameters
+# are rehashed. argon2 requires the argon2-cffi package.
+_PASSWORD_HASHERS = {
+    'scrypt': 'core.hashers.ScryptPasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt')
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items()
+    if name != PASSWORD_HASHER
+]
+SCRYPT_WORK_FACTOR = int(os.environ.get('SCRYPT_WORK_FACTOR', 2 ** 14))
+SCRYPT_BLOCK_SIZE = int(os.environ.get('SCRYPT_BLOCK_SIZE', 8))
+SCRYPT_PARALLELISM = int(os.environ.get('SCRYPT_PARALLELISM', 1))
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 102400))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 8))
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 260000))
+
+# Threads per worker hashing passwords, and how many more hashes may wait
+# for one before further logins get a 503 after the timeout (seconds).
+# 0 workers hashes inline.
+HASHING_WORKERS = int(os.environ.get('HASHING_WORKERS', 1))
+HASHING_QUEUE = int(os.environ.get('HASHING_QUEUE', 8))
+HASHING_QUEUE_TIMEOUT = float(os.environ.get('HASHING_QUEUE_TIMEOUT', 5))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -160,10 +225,103 @@ AUTH_USER_MODEL = 'core.User'
 REST_FRAMEWORK = {
  'DEFAULT_SCHEMA_CLASS' : 'drf_spectacular.openapi.AutoSchema',
  'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-    ]
+        'user.authentication.CachedTokenAuthentication',
+    ],
+    # Sliding window limits of core.throttling, as requests/period. An
+    # empty variable disables a limit.
+    'DEFAULT_THROTTLE_RATES': {
+        scope: os.environ.get(f'THROTTLE_{scope.upper()}', default) or None
+        for scope, default in (
+            ('login_ip', '60/min'),
+            ('login_email', '10/min'),
+            ('signup_ip', '20/hour'),
+            ('signup_email', '5/hour'),
+            ('recipe_user', '600/min'),
+        )
+    },
 }
 
+# Token authentication cache. Leave the alias empty for a per-process LRU
+# cache, or name an entry of CACHES to share it between workers.
+TOKEN_AUTH_CACHE_ALIAS = os.environ.get('TOKEN_AUTH_CACHE_ALIAS', '')
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 30))
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
-}
\ No newline at end of file
+}
+
+# Entries kept by the local memory and file based caches, which cull a
+# third of them at random once full. Memcached evicts by itself and takes
+# no such option.
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+
+CACHES = {}
+for alias, prefix, location in (
+    ('default', 'CACHE', ''),
+    # Recipe list responses, kept apart so their churn cannot evict the
+    # throttle counters, cached tokens or replica pins.
+    ('responses', 'RESPONSE_CACHE', 'responses'),
+):
+    backend = os.environ.get(
+        f'{prefix}_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+    )
+    CACHES[alias] = {
+        'BACKEND': backend,
+        'LOCATION': os.environ.get(f'{prefix}_LOCATION', location),
+        'OPTIONS': {} if 'memcached' in backend else {
+            'MAX_ENTRIES': CACHE_MAX_ENTRIES,
+        },
+    }
+
+# Counters of the throttles. Use a cache shared by all workers so the
+# limits hold across them.
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS', 'default')
+
+# Cached list responses of the recipe API, and the list ETags built on
+# their per-user versions. They need a cache shared by all workers
+# (RESPONSE_CACHE_BACKEND), or a version bump in one worker leaves the
+# others serving stale lists, so they are off by default with the local
+# memory cache. A timeout of 0 disables both. Hits and misses are served
+# at /metrics.
+RESPONSE_CACHE_ALIAS = os.environ.get('RESPONSE_CACHE_ALIAS', 'responses')
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get(
+    'RESPONSE_CACHE_TIMEOUT',
+    0 if CACHES[RESPONSE_CACHE_ALIAS]['BACKEND'].endswith('LocMemCache')
+    else 300,
+))
+
+# Worker processes rendering recipe image thumbnails; 0 renders them
+# inline after the upload commits.
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+
+# Recipe image files modified more recently are never deleted, neither
+# when released nor by collect_recipe_images: an identical upload may be
+# reusing them in a transaction that has not committed yet.
+IMAGE_GRACE_SECONDS = int(os.environ.get('IMAGE_GRACE_SECONDS', 3600))
+
+# Limits of uploaded recipe images, checked while the upload streams in.
+# Keep the byte limit in line with client_max_body_size in the proxy.
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.environ.get('IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.environ.get('IMAGE_UPLOAD_MAX_PIXELS', 40_000_000)
+)
+
+# Request metrics served at /metrics. Every request is counted; the sample
+# rate (0 to 1) sets the share timed in detail.
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 0.1))
+METRICS_ALLOWED_IPS = os.environ.get(
+    'METRICS_ALLOWED_IPS', '127.0.0.1'
+).split(',')
+# A directory shared by the workers of a server, where each writes its
+# metrics at most every METRICS_SHARE_SECONDS. Scrapes reach one worker
+# only, and render the others from there. Empty serves each worker's own
+# metrics, which only suits a single worker.
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_SHARE_SECONDS = float(os.environ.get('METRICS_SHARE_SECONDS', 1))
+
+# Requests per ASGI worker running their views at once, each on its own
+# thread and database connection (see core.asgi). Unused under uWSGI.
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 16))
@@ -0,0 +1,134 @@
+"""
+ASGI handler running each request on a thread of a fixed pool
+
+Django 3.2 runs the sync part of every ASGI request, which here is all
+of it (middleware, DRF views, the ORM), on one thread shared by the
+whole process, so one slow request stalls all the others. This handler
+keeps ASGI_THREADS threads per process instead and runs everything a
+request does in Django, down to producing streamed chunks and closing
+the response, on one of them. Each thread keeps its own database
+connection, which CONN_MAX_AGE can persist as under uWSGI.
+
+Request bodies are read on the event loop before a thread is taken, so a
+client uploading slowly holds neither a thread nor a connection.
+"""
+
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers import asgi, base
+from django.http import FileResponse
+from django.urls import set_script_prefix
+
+
+_DONE = object()
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """Django's ASGI handler running each request on a pool thread."""
+
+    def __init__(self):
+        base.BaseHandler.__init__(self)
+        # The sync middleware chain, as there is no switch per middleware.
+        self.load_middleware()
+        self._threads = None
+
+    @contextlib.asynccontextmanager
+    async def _thread(self):
+        """Reserve a pool thread and yield a coroutine function using it."""
+        if self._threads is None:
+            # Created here to bind to the server's event loop.
+            self._threads = asyncio.Queue()
+            for index in range(settings.ASGI_THREADS):
+                self._threads.put_nowait(ThreadPoolExecutor(
+                    1, thread_name_prefix=f'asgi-{index}'
+                ))
+        executor = await self._threads.get()
+        loop = asyncio.get_running_loop()
+        try:
+            yield lambda func, *args: loop.run_in_executor(
+                executor, func, *args
+            )
+        finally:
+            self._threads.put_nowait(executor)
+
+    async def __call__(self, scope, receive, send):
+        """Read the body, then answer the request on a pool thread."""
+        if scope['type'] != 'http':
+            raise ValueError(
+                'Django can only handle ASGI/HTTP connections, not %s.'
+                % scope['type']
+            )
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+        async with self._thread() as run:
+            response = await run(self._respond, scope, body_file)
+            await self._send_response(response, send, run)
+
+    def _respond(self, scope, body_file):
+        """Build the response of a request, on its pool thread."""
+        set_script_prefix(self.get_script_prefix(scope))
+        signals.request_started.send(sender=self.__class__, scope=scope)
+        request, error_response = self.create_request(scope, body_file)
+        if request is None:
+            return error_response
+        response = self.get_response(request)
+        response._handler_class = self.__class__
+        if isinstance(response, FileResponse):
+            response.block_size = self.chunk_size
+        return response
+
+    async def _send_response(self, response, send, run):
+        """Send a response, running its iteration and close on run."""
+        headers = [
+            (
+                header.encode('ascii') if isinstance(header, str) else header,
+                value.encode('latin1') if isinstance(value, str) else value,
+            )
+            for header, value in response.items()
+        ]
+        headers.extend(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        )
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': headers,
+            })
+            if response.streaming:
+                # Streamed chunks may read the database, as the export does.
+                parts = iter(response)
+                while (part := await run(next, parts, _DONE)) is not _DONE:
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+                await send({'type': 'http.response.body'})
+            else:
+                for chunk, last in self.chunk_bytes(response.content):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': not last,
+                    })
+        finally:
+            # Sends request_finished, which closes the thread's connection,
+            # also when the client went away or the stream failed.
+            await run(response.close)
+
+
+def get_asgi_application():
+    """Set up Django and return the ASGI application."""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
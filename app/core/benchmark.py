@@ -0,0 +1,147 @@
+"""
+Helpers shared by the benchmark management commands
+"""
+
+import math
+import re
+import statistics
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test.utils import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.counts import rebuild_recipe_counts
+
+
+BENCH_EMAIL = 'bench@example.com'
+
+
+def without_throttles():
+    """Return settings lifting every throttle rate, for load generators."""
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': dict.fromkeys(
+            settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+        ),
+    })
+
+
+def get_bench_user(email=BENCH_EMAIL):
+    """Return a fresh user to own the benchmark data."""
+    get_user_model().objects.filter(email=email).delete()
+    return get_user_model().objects.create_user(email, 'benchpass123')
+
+
+def get_bench_users(count):
+    """Return count fresh benchmark users."""
+    return [
+        get_bench_user(f'bench{i}@example.com') if i else get_bench_user()
+        for i in range(count)
+    ]
+
+
+def seed_recipes(user, count, tags=0, ingredients=0, per_recipe=3,
+                 batch_size=5000):
+    """Bulk create recipes, tags and ingredients for a user.
+
+    Every recipe is linked to ``per_recipe`` tags and ingredients picked
+    round-robin from the seeded ones.
+    """
+    tag_objs = Tag.objects.bulk_create(
+        [Tag(user=user, name=f'Tag {i}') for i in range(tags)],
+        batch_size=batch_size,
+    )
+    ingredient_objs = Ingredient.objects.bulk_create(
+        [Ingredient(user=user, name=f'Ingredient {i}')
+         for i in range(ingredients)],
+        batch_size=batch_size,
+    )
+
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title=f'Recipe {created + i}',
+                description=f'Description of recipe {created + i}',
+                time_minutes=(created + i) % 120 + 1,
+                price=Decimal('5.00'),
+            )
+            for i in range(size)
+        ])
+        _link(recipes, tag_objs, Recipe.tags.through, 'tag_id', per_recipe)
+        _link(
+            recipes,
+            ingredient_objs,
+            Recipe.ingredients.through,
+            'ingredient_id',
+            per_recipe,
+        )
+        created += size
+    # Bulk inserts send no signals.
+    rebuild_recipe_counts(Tag, Tag.objects.filter(user=user))
+    rebuild_recipe_counts(Ingredient, Ingredient.objects.filter(user=user))
+    return created
+
+
+def _link(recipes, objs, through, field, per_recipe):
+    """Bulk insert M2M rows between recipes and tags or ingredients."""
+    if not objs:
+        return
+    rows = []
+    for recipe in recipes:
+        picked = {objs[(recipe.id + n) % len(objs)].id
+                  for n in range(per_recipe)}
+        rows.extend(
+            through(recipe_id=recipe.id, **{field: obj_id})
+            for obj_id in picked
+        )
+    through.objects.bulk_create(rows, batch_size=5000)
+
+
+def time_it(func, repeat=5):
+    """Call func repeatedly and return timing stats in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'min': round(min(timings), 3),
+        'median': round(statistics.median(timings), 3),
+        'max': round(max(timings), 3),
+    }
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def view_queryset(viewset_class, user, action='list', params=None):
+    """Return the queryset a viewset builds for a request."""
+    request = Request(APIRequestFactory().get('/', params or {}))
+    request.user = user
+    view = viewset_class(action=action, request=request, format_kwarg=None)
+    return view.filter_queryset(view.get_queryset())
+
+
+def explain(queryset, analyze=False):
+    """Return the Postgres plan of a queryset."""
+    return queryset.explain(analyze=analyze)
+
+
+def seq_scanned_tables(plan, tables):
+    """Return the given tables that a plan reads with a sequential scan."""
+    return [
+        table for table in tables
+        if re.search(rf'Seq Scan on {table}\b', plan)
+    ]
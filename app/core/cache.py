@@ -0,0 +1,56 @@
+"""
+In-process caches
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread safe LRU cache whose entries expire after a TTL.
+
+    Implements the subset of Django's cache API used in this project
+    (``get``, ``set``, ``delete``, ``clear``) so either can be plugged in.
+    """
+
+    def __init__(self, max_size=1000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """Store a value, evicting the least recently used if full."""
+        ttl = self.ttl if timeout is None else timeout
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,32 @@
+"""
+System checks of the deployment settings
+"""
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+# Backends whose incr is atomic. The local memory cache is atomic within
+# one process only, which is enough for development and tests.
+ATOMIC_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.memcached.MemcachedCache',
+    'django_redis.cache.RedisCache',
+)
+
+
+@register()
+def check_throttle_cache(app_configs, **kwargs):
+    """Refuse a throttle cache losing concurrent counts."""
+    alias = settings.THROTTLE_CACHE_ALIAS
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in ATOMIC_CACHE_BACKENDS:
+        return []
+    return [Error(
+        f'The throttle cache {alias!r} uses {backend}, whose incr is not '
+        f'atomic, so concurrent requests would be undercounted.',
+        hint='Point THROTTLE_CACHE_ALIAS at a Memcached or Redis cache.',
+        id='core.E001',
+    )]
@@ -0,0 +1,213 @@
+"""
+Password hashers running on a bounded thread pool
+
+Hashing a password is deliberately slow. The hashers below hand that
+work to a small pool of threads per worker, so a burst of logins or
+signups can use at most HASHING_WORKERS threads while the other request
+threads keep serving reads. Callers wait up to HASHING_QUEUE_TIMEOUT for
+one of the HASHING_WORKERS + HASHING_QUEUE slots, then get a 503.
+"""
+
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_noop as _
+from rest_framework.exceptions import APIException
+
+
+POOL_SETTINGS = {'HASHING_WORKERS', 'HASHING_QUEUE'}
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+class HashingBusy(APIException):
+    """Every hashing slot of this worker stayed taken for too long."""
+    status_code = 503
+    default_detail = 'Too many logins at once, try again shortly.'
+    default_code = 'hashing_busy'
+    wait = 1
+
+
+def _get_pool():
+    """Return the executor and slot semaphore, creating them on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = settings.HASHING_WORKERS
+            _pool = (
+                ThreadPoolExecutor(workers, thread_name_prefix='hashing'),
+                threading.BoundedSemaphore(workers + settings.HASHING_QUEUE),
+            )
+        return _pool
+
+
+@receiver(setting_changed)
+def reset_pool(*, setting, **kwargs):
+    """Resize the pool when its settings change, as in tests."""
+    global _pool
+    if setting in POOL_SETTINGS:
+        with _pool_lock:
+            if _pool is not None:
+                _pool[0].shutdown(wait=False)
+            _pool = None
+
+
+def _run_in_pool(func, args):
+    _local.pooled = True
+    try:
+        return func(*args)
+    finally:
+        _local.pooled = False
+
+
+def run_hashing(func, *args):
+    """Call func on the hashing pool and return its result.
+
+    Runs inline when the pool is disabled, and for calls made from the
+    pool itself, such as ``verify`` encoding the password again.
+    """
+    if settings.HASHING_WORKERS <= 0 or getattr(_local, 'pooled', False):
+        return func(*args)
+    executor, slots = _get_pool()
+    if not slots.acquire(timeout=settings.HASHING_QUEUE_TIMEOUT):
+        raise HashingBusy()
+    try:
+        return executor.submit(_run_in_pool, func, args).result()
+    finally:
+        slots.release()
+
+
+class PooledHasherMixin:
+    """Run encode and verify of a hasher on the hashing pool."""
+
+    def encode(self, *args):
+        return run_hashing(super().encode, *args)
+
+    def verify(self, password, encoded):
+        return run_hashing(super().verify, password, encoded)
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin, hashers.PBKDF2PasswordHasher):
+    """Django's default hasher, run on the pool."""
+
+    @property
+    def iterations(self):
+        return settings.PBKDF2_ITERATIONS
+
+
+class Argon2PasswordHasher(PooledHasherMixin, hashers.Argon2PasswordHasher):
+    """Argon2 with costs from the settings. Requires argon2-cffi."""
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class ScryptPasswordHasher(hashers.BasePasswordHasher):
+    """Memory hard scrypt from the standard library.
+
+    Uses the hash format of the scrypt hasher Django ships from 4.0, so
+    stored hashes stay valid after an upgrade. Only ``encode`` runs on
+    the pool, ``verify`` calls it.
+    """
+    algorithm = 'scrypt'
+
+    @property
+    def work_factor(self):
+        return settings.SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        return settings.SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self):
+        return settings.SCRYPT_PARALLELISM
+
+    def _encode(self, password, salt, n=None, r=None, p=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            # Memory OpenSSL needs for these parameters.
+            maxmem=128 * r * (n + p + 2),
+            dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        return run_hashing(self._encode, password, salt, n, r, p)
+
+    def decode(self, encoded):
+        algorithm, work_factor, salt, block_size, parallelism, hash_ = (
+            encoded.split('$', 6)
+        )
+        assert algorithm == self.algorithm
+        return {
+            'algorithm': algorithm,
+            'work_factor': int(work_factor),
+            'salt': salt,
+            'block_size': int(block_size),
+            'parallelism': int(parallelism),
+            'hash': hash_,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(
+            password,
+            decoded['salt'],
+            decoded['work_factor'],
+            decoded['block_size'],
+            decoded['parallelism'],
+        )
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            _('algorithm'): decoded['algorithm'],
+            _('work factor'): decoded['work_factor'],
+            _('block size'): decoded['block_size'],
+            _('parallelism'): decoded['parallelism'],
+            _('salt'): hashers.mask_hash(decoded['salt']),
+            _('hash'): hashers.mask_hash(decoded['hash']),
+        }
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return (
+            decoded['work_factor'] != self.work_factor
+            or decoded['block_size'] != self.block_size
+            or decoded['parallelism'] != self.parallelism
+        )
+
+    def harden_runtime(self, password, encoded):
+        # Like Django's scrypt hasher: the runtime depends on three
+        # parameters, too many to pad sensibly.
+        pass
@@ -0,0 +1,332 @@
+"""
+Django command benchmarking every endpoint of the user and recipe APIs
+"""
+
+import io
+import itertools
+import json
+import random
+import statistics
+import subprocess
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core.benchmark import (
+    get_bench_users, percentile, seed_recipes, without_throttles
+)
+from core.models import Recipe, Tag, Ingredient
+from recipe import images
+from recipe.search import update_search_vectors
+
+
+SIGNUP_EMAIL = 'bench-signup-{}@example.com'
+BENCH_PASSWORD = 'benchpass123'
+
+
+def _git_commit():
+    """Return the commit of the working tree, if git is available."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _jpeg():
+    """Return a small JPEG upload."""
+    buffer = io.BytesIO()
+    Image.effect_noise((400, 300), 64).convert('RGB').save(buffer, 'JPEG')
+    buffer.name = 'bench.jpg'
+    buffer.seek(0)
+    return buffer
+
+
+class Command(BaseCommand):
+    """Time each API endpoint and count its queries and response bytes.
+
+    Results are printed as a table and can be written as JSON, and a
+    previous JSON file can be given to compare against.
+    """
+    help = 'Report p50/p95 latency, queries and bytes of every endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument('--recipes', type=int, default=1000,
+                            help='Recipes seeded per user.')
+        parser.add_argument('--tags', type=int, default=20)
+        parser.add_argument('--ingredients', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Requests timed per endpoint.')
+        parser.add_argument(
+            '--endpoints',
+            help='Comma separated endpoints to run, all by default.',
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Disable the response cache of the list endpoints.',
+        )
+        parser.add_argument('--output', help='Write the results as JSON.')
+        parser.add_argument(
+            '--compare',
+            help='JSON results of an earlier run to compare against.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of deleting it.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        endpoints = self._endpoints()
+        if options['endpoints']:
+            names = options['endpoints'].split(',')
+            unknown = set(names) - set(endpoints)
+            if unknown:
+                raise CommandError(
+                    f"Unknown endpoints: {', '.join(sorted(unknown))}"
+                )
+            endpoints = {name: endpoints[name] for name in names}
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)['endpoints']
+
+        self.random = random.Random(options['seed'])
+        self.signups = itertools.count()
+        users = get_bench_users(options['users'])
+        for user in users:
+            seed_recipes(
+                user,
+                options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+            )
+        update_search_vectors(
+            Recipe.objects.filter(user__in=users).values('pk')
+        )
+        self.user = users[0]
+        self.recipe_ids = list(
+            Recipe.objects.filter(user=self.user).values_list('id', flat=True)
+        )
+        self.tag_ids = list(
+            Tag.objects.filter(user=self.user).values_list('id', flat=True)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if options['no_cache']:
+            overrides['RESPONSE_CACHE_TIMEOUT'] = 0
+        try:
+            with override_settings(**overrides), without_throttles():
+                results = {
+                    name: self._run(build, options['requests'])
+                    for name, build in endpoints.items()
+                }
+        finally:
+            if images._executor is not None:
+                # Let pending thumbnails finish before their recipes go.
+                images._executor.shutdown()
+            if not options['keep']:
+                get_user_model().objects.filter(
+                    email__startswith=SIGNUP_EMAIL.split('{')[0]
+                ).delete()
+                for user in users:
+                    user.delete()
+
+        self._report(results, baseline)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'commit': _git_commit(),
+                    'database': connection.vendor,
+                    'options': {
+                        key: options[key] for key in (
+                            'users', 'recipes', 'tags', 'ingredients',
+                            'requests', 'no_cache', 'seed',
+                        )
+                    },
+                    'endpoints': results,
+                }, output, indent=2)
+                output.write('\n')
+
+    def _run(self, build, count):
+        """Send count requests built by build and summarize them."""
+        timings, queries, sizes, statuses = [], [], [], set()
+        for _ in range(count):
+            method, url, kwargs = build()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(self.client, method)(url, **kwargs)
+                if response.streaming:
+                    size = sum(len(chunk) for chunk in response)
+                else:
+                    size = len(response.content)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+            sizes.append(size)
+            statuses.add(response.status_code)
+        return {
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'queries': statistics.median(queries),
+            'bytes': statistics.median(sizes),
+            'status': sorted(statuses),
+        }
+
+    def _report(self, results, baseline):
+        """Print the results, with changes from the baseline if given."""
+        self.stdout.write(
+            f"{'endpoint':<24}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'queries':>9}{'bytes':>10}  status"
+        )
+        for name, result in results.items():
+            line = (
+                f"{name:<24}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                f"{result['queries']:>9g}{result['bytes']:>10g}  "
+                f"{','.join(map(str, result['status']))}"
+            )
+            before = (baseline or {}).get(name)
+            if before:
+                change = (result['p50_ms'] / before['p50_ms'] - 1) * 100
+                line += (
+                    f"  p50 {change:+.0f}%"
+                    f" queries {result['queries'] - before['queries']:+g}"
+                )
+            self.stdout.write(line)
+
+    def _endpoints(self):
+        """Return request builders by endpoint name.
+
+        Each builder prepares what its request needs, outside the timing,
+        and returns the client method, URL and keyword arguments.
+        """
+        recipes = reverse('recipe:recipe-list')
+        tags = reverse('recipe:tag-list')
+        ingredients = reverse('recipe:ingredient-list')
+
+        def recipe_detail():
+            return self._detail('recipe', self.random.choice(self.recipe_ids))
+
+        return {
+            'recipe-list': lambda: ('get', recipes, {}),
+            'recipe-list-page': lambda: (
+                'get', recipes, {'data': {'page_size': 20}},
+            ),
+            'recipe-list-filter': lambda: ('get', recipes, {'data': {
+                'tags': ','.join(map(str, self.random.sample(
+                    self.tag_ids, min(2, len(self.tag_ids))
+                ))),
+            }}),
+            'recipe-search': lambda: ('get', recipes, {'data': {
+                'search': f'recipe {self.random.randrange(100)}',
+            }}),
+            'recipe-detail': lambda: ('get', recipe_detail(), {}),
+            'recipe-batch': lambda: ('get', recipes, {'data': {
+                'ids': ','.join(map(str, self.random.sample(
+                    self.recipe_ids, min(24, len(self.recipe_ids))
+                ))),
+            }}),
+            'recipe-grid': lambda: ('get', recipes, {'data': {
+                'ids': ','.join(map(str, self.random.sample(
+                    self.recipe_ids, min(24, len(self.recipe_ids))
+                ))),
+                'fields': 'id,title,image',
+            }}),
+            'recipe-create': lambda: ('post', recipes, {
+                'data': self._recipe_payload(), 'format': 'json',
+            }),
+            'recipe-update': lambda: ('patch', recipe_detail(), {
+                'data': {'title': f'Renamed {self.random.random()}'},
+                'format': 'json',
+            }),
+            'recipe-delete': lambda: (
+                'delete', self._detail('recipe', self._new_recipe().id), {},
+            ),
+            'recipe-upload-image': lambda: ('post', reverse(
+                'recipe:recipe-upload-image', args=[self._new_recipe().id]
+            ), {'data': {'image': _jpeg()}, 'format': 'multipart'}),
+            'recipe-import': lambda: ('post', reverse(
+                'recipe:recipe-bulk-import'
+            ), {
+                'data': [self._recipe_payload() for _ in range(10)],
+                'format': 'json',
+            }),
+            'recipe-export': lambda: (
+                'get', reverse('recipe:recipe-export'),
+                {'HTTP_ACCEPT': 'application/x-ndjson'},
+            ),
+            'tag-list': lambda: ('get', tags, {}),
+            'tag-list-assigned': lambda: (
+                'get', tags, {'data': {'assigned_only': 1}},
+            ),
+            'tag-update': lambda: ('patch', self._detail(
+                'tag', self._new_attr(Tag).id
+            ), {'data': {'name': self._name()}, 'format': 'json'}),
+            'tag-delete': lambda: ('delete', self._detail(
+                'tag', self._new_attr(Tag).id
+            ), {}),
+            'ingredient-list': lambda: ('get', ingredients, {}),
+            'ingredient-update': lambda: ('patch', self._detail(
+                'ingredient', self._new_attr(Ingredient).id
+            ), {'data': {'name': self._name()}, 'format': 'json'}),
+            'ingredient-delete': lambda: ('delete', self._detail(
+                'ingredient', self._new_attr(Ingredient).id
+            ), {}),
+            'user-create': lambda: ('post', reverse('user:create'), {'data': {
+                'email': SIGNUP_EMAIL.format(next(self.signups)),
+                'password': BENCH_PASSWORD,
+                'name': 'Bench',
+            }}),
+            'user-token': lambda: ('post', reverse('user:token'), {'data': {
+                'email': self.user.email, 'password': BENCH_PASSWORD,
+            }}),
+            'user-me': lambda: ('get', reverse('user:me'), {}),
+            'user-me-update': lambda: ('patch', reverse('user:me'), {
+                'data': {'name': self._name()}, 'format': 'json',
+            }),
+        }
+
+    def _detail(self, basename, pk):
+        return reverse(f'recipe:{basename}-detail', args=[pk])
+
+    def _name(self):
+        return f'Bench {self.random.random()}'
+
+    def _new_recipe(self):
+        return Recipe.objects.create(
+            user=self.user,
+            title='Bench',
+            time_minutes=1,
+            price=Decimal('1.00'),
+        )
+
+    def _new_attr(self, model):
+        return model.objects.create(user=self.user, name=self._name())
+
+    def _recipe_payload(self):
+        return {
+            'title': self._name(),
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': [{'name': f'Tag {self.random.randrange(40)}'}],
+            'ingredients': [
+                {'name': f'Ingredient {self.random.randrange(200)}'},
+            ],
+        }
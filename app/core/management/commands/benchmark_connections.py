@@ -0,0 +1,119 @@
+"""
+Django command measuring database connection setup in request latency
+"""
+
+import statistics
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import (
+    get_bench_user, percentile, seed_recipes, without_throttles
+)
+from core.models import Recipe
+
+
+CASES = (
+    ('per-request', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}),
+    ('persistent', {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': False}),
+    ('persistent+checks', {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True}),
+)
+
+
+class Command(BaseCommand):
+    """Time recipe reads through the full request handler.
+
+    Requests go through Django's WSGI handler rather than the test client,
+    which keeps connections open regardless of CONN_MAX_AGE. Each case
+    is also run against a pooler when one is given.
+    """
+    help = 'Report request latency and connections opened per setting.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--pooler',
+            metavar='HOST:PORT',
+            help='Also run every case through this pooler, e.g. pgbouncer.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        targets = [('', {})]
+        if options['pooler']:
+            host, _, port = options['pooler'].rpartition(':')
+            if not host or not port.isdigit():
+                raise CommandError('--pooler must be HOST:PORT.')
+            targets.append(('pooled ', {'HOST': host, 'PORT': port}))
+
+        user = get_bench_user()
+        seed_recipes(user, 50, tags=5, ingredients=10)
+        token = Token.objects.create(user=user).key
+        recipe_ids = list(
+            Recipe.objects.filter(user=user).values_list('id', flat=True)
+        )
+        self.application = WSGIHandler()
+        original = dict(connection.settings_dict)
+        try:
+            with without_throttles(), override_settings(
+                ALLOWED_HOSTS=['localhost']
+            ):
+                for prefix, target in targets:
+                    for label, case in CASES:
+                        connection.close()
+                        connection.settings_dict.update(target, **case)
+                        timings, connects = self._run(
+                            token, recipe_ids, options['requests']
+                        )
+                        self.stdout.write(
+                            f'{prefix + label:>24}: '
+                            f'mean={statistics.mean(timings):6.2f}ms '
+                            f'p50={percentile(timings, 50):6.2f}ms '
+                            f'p95={percentile(timings, 95):6.2f}ms '
+                            f'connections={connects}'
+                        )
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
+            user.delete()
+
+    def _run(self, token, recipe_ids, count):
+        """Send count reads and return their timings and new connections."""
+        connects = []
+
+        def count_connect(**kwargs):
+            connects.append(1)
+
+        connection_created.connect(count_connect, weak=False)
+        try:
+            timings = []
+            for index in range(count):
+                environ = {
+                    'PATH_INFO': reverse(
+                        'recipe:recipe-detail',
+                        args=[recipe_ids[index % len(recipe_ids)]],
+                    ),
+                    'HTTP_AUTHORIZATION': f'Token {token}',
+                    'HTTP_HOST': 'localhost',
+                }
+                setup_testing_defaults(environ)
+                start = time.perf_counter()
+                response = self.application(environ, lambda *args: None)
+                b''.join(response)
+                # Sends request_finished, as the server would.
+                response.close()
+                timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(
+                        f'Reads failed with {response.status_code}.'
+                    )
+        finally:
+            connection_created.disconnect(count_connect)
+        return timings, len(connects)
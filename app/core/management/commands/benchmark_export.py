@@ -0,0 +1,59 @@
+"""
+Django command measuring memory used to export recipes
+"""
+
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from core.benchmark import get_bench_user, seed_recipes
+from core.models import Recipe
+from recipe.bulk import export_recipe_rows, iter_ndjson
+from recipe.serializers import RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    """Compare streaming export with serializing the full list."""
+    help = 'Measure peak memory of streaming vs materialized recipe export.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of deleting it.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        user = get_bench_user()
+        self.stdout.write(f"Seeding {options['recipes']} recipes")
+        seed_recipes(user, options['recipes'], tags=50, ingredients=500)
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+
+        try:
+            self._measure('streaming', lambda: sum(
+                len(line) for line in iter_ndjson(export_recipe_rows(queryset))
+            ))
+            self._measure('materialized', lambda: len(
+                RecipeDetailSerializer(
+                    queryset.prefetch_related('tags', 'ingredients'),
+                    many=True,
+                ).data
+            ))
+        finally:
+            if not options['keep']:
+                user.delete()
+
+    def _measure(self, label, func):
+        """Run func and report its duration and peak traced memory."""
+        tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{label:>12}: {elapsed:8.2f}s peak={peak / 1024 / 1024:8.1f}MiB'
+        )
@@ -0,0 +1,124 @@
+"""
+Django command measuring login throughput and read latency during a storm
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.benchmark import (
+    get_bench_user, percentile, seed_recipes, without_throttles
+)
+
+
+BENCH_PASSWORD = 'benchpass123'
+
+
+def _hashers(policy):
+    """Return PASSWORD_HASHERS with the hasher of a policy first."""
+    return sorted(
+        settings.PASSWORD_HASHERS, key=lambda path: policy not in path.lower()
+    )
+
+
+class Command(BaseCommand):
+    """Hammer the token endpoint while timing recipe reads."""
+    help = 'Measure logins per second and read latency per hasher policy.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=8,
+                            help='Threads logging in continuously.')
+        parser.add_argument('--readers', type=int, default=2,
+                            help='Threads reading recipes meanwhile.')
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Hashing threads of the pooled runs.')
+        parser.add_argument(
+            '--policies',
+            default='pbkdf2,scrypt',
+            help='Comma separated hashers to compare.',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of deleting it.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        self.user = get_bench_user()
+        seed_recipes(self.user, 100, tags=10, ingredients=30)
+        try:
+            for policy in options['policies'].split(','):
+                for workers in (0, options['workers']):
+                    self._run(policy, workers, options)
+        finally:
+            if not options['keep']:
+                self.user.delete()
+
+    def _run(self, policy, workers, options):
+        """Run one storm and print its throughput and read latency."""
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            PASSWORD_HASHERS=_hashers(policy),
+            HASHING_WORKERS=workers,
+        ), without_throttles():
+            self.user.set_password(BENCH_PASSWORD)
+            self.user.save()
+            logins, reads, statuses = [], [], {}
+            deadline = time.perf_counter() + options['seconds']
+            threads = [
+                threading.Thread(
+                    target=self._login, args=(deadline, logins, statuses)
+                )
+                for _ in range(options['logins'])
+            ] + [
+                threading.Thread(target=self._read, args=(deadline, reads))
+                for _ in range(options['readers'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        mode = f'pool of {workers}' if workers else 'inline'
+        self.stdout.write(
+            f'{policy:>7} {mode:>10}: '
+            f"{len(logins) / options['seconds']:7.1f} logins/s "
+            f'read p50={percentile(reads, 50):7.2f}ms '
+            f'p95={percentile(reads, 95):7.2f}ms '
+            f'statuses={statuses}'
+        )
+
+    def _login(self, deadline, logins, statuses):
+        """Log in until the deadline, recording each successful login."""
+        client = APIClient()
+        payload = {'email': self.user.email, 'password': BENCH_PASSWORD}
+        try:
+            while time.perf_counter() < deadline:
+                res = client.post(reverse('user:token'), payload)
+                status = res.status_code
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    logins.append(1)
+        finally:
+            connection.close()
+
+    def _read(self, deadline, reads):
+        """Read a recipe page until the deadline, recording latencies."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('recipe:recipe-list')
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                client.get(url, {'page_size': 20})
+                reads.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.close()
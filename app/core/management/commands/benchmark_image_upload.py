@@ -0,0 +1,88 @@
+"""
+Django command measuring image upload latency by image size
+"""
+
+import io
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core.benchmark import get_bench_user, time_it
+from core.models import Recipe
+from recipe import images
+
+
+class Command(BaseCommand):
+    """Compare inline and pooled thumbnail rendering."""
+    help = 'Measure upload latency with inline vs background derivatives.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='500,1000,2000,4000',
+            help='Comma separated image widths in pixels.',
+        )
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        user = get_bench_user()
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            try:
+                for width in [int(w) for w in options['sizes'].split(',')]:
+                    self._run(user, width, options)
+                if images._executor is not None:
+                    images._executor.shutdown()
+            finally:
+                self._cleanup(user)
+                user.delete()
+
+    def _run(self, user, width, options):
+        """Time uploads of one image size in both modes."""
+        buffer = io.BytesIO()
+        Image.effect_noise((width, width * 3 // 4), 64).convert('RGB').save(
+            buffer, 'JPEG', quality=90
+        )
+        content = buffer.getvalue()
+
+        timings = {}
+        for label, workers in (('inline', 0), ('pooled', options['workers'])):
+            with override_settings(IMAGE_WORKERS=workers):
+                timings[label] = time_it(
+                    lambda: self._upload(user, content), options['repeat']
+                )['median']
+        self.stdout.write(
+            f'{width:>5}px {len(content) / 1024:>8.0f}KiB '
+            f"inline={timings['inline']:>9.3f}ms "
+            f"pooled={timings['pooled']:>9.3f}ms"
+        )
+
+    def _upload(self, user, content):
+        """Upload an image to a new recipe."""
+        recipe = Recipe.objects.create(
+            user=user, title='Bench', time_minutes=1, price=Decimal('1.00')
+        )
+        image_file = io.BytesIO(content)
+        image_file.name = 'bench.jpg'
+        self.client.post(
+            reverse('recipe:recipe-upload-image', args=[recipe.id]),
+            {'image': image_file},
+            format='multipart',
+        )
+
+    def _cleanup(self, user):
+        """Delete the uploaded images and their derivatives."""
+        for recipe in Recipe.objects.filter(user=user):
+            for formats in recipe.image_derivatives.values():
+                for name in formats.values():
+                    default_storage.delete(name)
+            recipe.image.delete(save=False)
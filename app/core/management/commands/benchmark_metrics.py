@@ -0,0 +1,105 @@
+"""
+Django command measuring the overhead of the metrics middleware
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.benchmark import (
+    get_bench_user, seed_recipes, time_it, without_throttles
+)
+
+
+MIDDLEWARE = 'core.middleware.MetricsMiddleware'
+
+
+class Command(BaseCommand):
+    """Compare request latency without the middleware and per sample rate.
+
+    Reports the fastest of the alternating rounds of each case.
+    """
+    help = 'Measure the latency the metrics middleware adds to requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=7)
+        parser.add_argument(
+            '--rates',
+            default='0,0.1,1',
+            help='Comma separated sample rates to measure.',
+        )
+        parser.add_argument(
+            '--budget',
+            type=float,
+            default=2.0,
+            help='Overhead in percent a rate may add to stay within budget.',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of deleting it.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        user = get_bench_user()
+        seed_recipes(user, options['recipes'], tags=10, ingredients=30)
+        without = [m for m in settings.MIDDLEWARE if m != MIDDLEWARE]
+        cases = [('off', without, 0)] + [
+            (f'rate={rate:g}', settings.MIDDLEWARE, rate)
+            for rate in map(float, options['rates'].split(','))
+        ]
+
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=['testserver'], RESPONSE_CACHE_TIMEOUT=0
+            ), without_throttles():
+                clients = {
+                    label: self._client(user, middleware, rate)
+                    for label, middleware, rate in cases
+                }
+                # Alternate the cases so drift affects them all alike.
+                timings = {label: [] for label in clients}
+                for _ in range(options['repeat']):
+                    for label, (client, overrides) in clients.items():
+                        with override_settings(**overrides):
+                            timings[label].append(
+                                self._time(client, options['requests'])
+                            )
+        finally:
+            metrics.registry.clear()
+            if not options['keep']:
+                user.delete()
+
+        timings = {label: min(values) for label, values in timings.items()}
+        baseline = timings['off']
+        for label, per_request in timings.items():
+            overhead = (per_request - baseline) / baseline * 100
+            verdict = 'ok' if overhead <= options['budget'] else 'over budget'
+            self.stdout.write(
+                f'{label:>10}: {per_request * 1000:8.1f}us/request '
+                f'{overhead:+6.2f}% {verdict if label != "off" else ""}'
+            )
+
+    def _client(self, user, middleware, rate):
+        """Return a client and the settings to run one case with."""
+        overrides = {'MIDDLEWARE': middleware, 'METRICS_SAMPLE_RATE': rate}
+        with override_settings(**overrides):
+            client = APIClient()
+            client.force_authenticate(user)
+            # Load the middleware chain of this case.
+            client.get(reverse('recipe:recipe-list'))
+        return client, overrides
+
+    def _time(self, client, requests):
+        """Return the time of one list request in milliseconds."""
+        url = reverse('recipe:recipe-list')
+        timing = time_it(
+            lambda: [client.get(url) for _ in range(requests)], repeat=1
+        )
+        return timing['min'] / requests
@@ -0,0 +1,91 @@
+"""
+Django command comparing cursor and offset pagination of recipes
+"""
+
+from base64 import b64encode
+from urllib import parse
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import get_bench_user, seed_recipes, time_it
+from core.models import Recipe
+from recipe.pagination import RecipeCursorPagination
+
+
+class Command(BaseCommand):
+    """Benchmark fetching pages at increasing depths."""
+    help = 'Compare cursor and offset pagination on a seeded dataset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument(
+            '--depths',
+            default='0,1000,10000,50000,90000',
+            help='Comma separated row offsets to fetch pages at.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of deleting it.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        user = get_bench_user()
+        self.stdout.write(f"Seeding {options['recipes']} recipes")
+        seed_recipes(user, options['recipes'])
+
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+        ids = list(queryset.values_list('id', flat=True))
+
+        # Paginators build absolute URLs from the fake request's host.
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            try:
+                self._run(queryset, ids, options)
+            finally:
+                if not options['keep']:
+                    user.delete()
+
+    def _run(self, queryset, ids, options):
+        """Time both paginators at every requested depth."""
+        factory = APIRequestFactory()
+        page_size = options['page_size']
+        for depth in [int(d) for d in options['depths'].split(',')]:
+            if depth >= len(ids):
+                continue
+            offset_request = Request(factory.get(
+                '/', {'limit': page_size, 'offset': depth}
+            ))
+            cursor_params = {'page_size': page_size}
+            if depth:
+                cursor_params['cursor'] = self._cursor(ids[depth - 1])
+            cursor_request = Request(factory.get('/', cursor_params))
+
+            offset = time_it(
+                lambda: LimitOffsetPagination().paginate_queryset(
+                    queryset, offset_request
+                ),
+                options['repeat'],
+            )
+            cursor = time_it(
+                lambda: RecipeCursorPagination().paginate_queryset(
+                    queryset, cursor_request
+                ),
+                options['repeat'],
+            )
+            self.stdout.write(
+                f"depth={depth:>8} "
+                f"offset={offset['median']:>9.3f}ms "
+                f"cursor={cursor['median']:>9.3f}ms"
+            )
+
+    def _cursor(self, position):
+        """Encode a cursor pointing just after the given recipe id."""
+        querystring = parse.urlencode({'p': position}, doseq=True)
+        return b64encode(querystring.encode('ascii')).decode('ascii')
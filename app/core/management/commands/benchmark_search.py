@@ -0,0 +1,76 @@
+"""
+Django command measuring recipe search latency
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from core.benchmark import get_bench_user, seed_recipes, time_it
+from core.models import Recipe
+from recipe.search import (
+    has_trigram,
+    search_recipes,
+    update_search_vectors,
+    MODE_FUZZY,
+)
+
+
+QUERIES = ('recipe 4242', 'ingredient 17', 'description recipe')
+
+
+class Command(BaseCommand):
+    """Compare the search vector with a naive substring scan."""
+    help = 'Measure full-text and fuzzy search latency on a seeded corpus.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of deleting it.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        user = get_bench_user()
+        self.stdout.write(f"Seeding {options['recipes']} recipes")
+        seed_recipes(user, options['recipes'], tags=50, ingredients=500)
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+        update_search_vectors(queryset.values('pk'))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_recipe')
+
+        try:
+            for text in QUERIES:
+                self._run(queryset, text, options)
+        finally:
+            if not options['keep']:
+                user.delete()
+
+    def _run(self, queryset, text, options):
+        """Time one query with every available strategy."""
+        page = slice(0, options['page_size'])
+        naive = queryset
+        for word in text.split():
+            naive = naive.filter(
+                Q(title__icontains=word)
+                | Q(description__icontains=word)
+                | Q(ingredients__name__icontains=word)
+            )
+        strategies = [
+            ('icontains', lambda: list(naive.distinct()[page])),
+            ('vector', lambda: list(search_recipes(queryset, text)[page])),
+        ]
+        if has_trigram():
+            strategies.append(('trigram', lambda: list(
+                search_recipes(queryset, text, MODE_FUZZY)[page]
+            )))
+
+        timings = ' '.join(
+            f"{label}={time_it(func, options['repeat'])['median']:>9.3f}ms"
+            for label, func in strategies
+        )
+        self.stdout.write(f'{text!r:>22} {timings}')
@@ -0,0 +1,60 @@
+"""
+Django command measuring per-row cost of the recipe list serialization
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.benchmark import get_bench_user, seed_recipes, time_it
+from core.models import Recipe
+from recipe.rows import build_recipe_rows, value_columns
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Compare RecipeSerializer with the fast values() based rows."""
+    help = 'Measure per-row cost of serializing the recipe list.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of deleting it.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        user = get_bench_user()
+        count = options['recipes']
+        seed_recipes(user, count, tags=20, ingredients=100)
+        queryset = Recipe.objects.filter(user=user).order_by('-id')
+        fields = RecipeSerializer.Meta.fields
+
+        try:
+            results = {
+                'serializer': time_it(
+                    lambda: RecipeSerializer(
+                        queryset.prefetch_related('tags', 'ingredients'),
+                        many=True,
+                    ).data,
+                    options['repeat'],
+                ),
+                'values rows': time_it(
+                    lambda: build_recipe_rows(
+                        list(queryset.values(*value_columns(fields))),
+                        fields,
+                    ),
+                    options['repeat'],
+                ),
+            }
+        finally:
+            if not options['keep']:
+                user.delete()
+
+        for label, timing in results.items():
+            per_row = timing['median'] * 1000 / count
+            self.stdout.write(
+                f"{label:>12}: {timing['median']:9.1f}ms "
+                f"{per_row:7.1f}us/row"
+            )
@@ -0,0 +1,238 @@
+"""
+Django command load testing the uWSGI and ASGI servers with mixed traffic
+"""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import get_bench_user, percentile, seed_recipes
+from core.models import Recipe
+
+
+BENCH_PASSWORD = 'benchpass123'
+SLOW_UPLOAD_PARTS = 20
+
+
+def _server_command(server, port, threads):
+    """Return the command starting one server with one worker process."""
+    if server == 'uwsgi':
+        return [
+            'uwsgi', '--http-socket', f':{port}', '--master',
+            '--workers', '1', '--threads', str(threads), '--enable-threads',
+            '--module', 'app.wsgi', '--disable-logging', '--die-on-term',
+        ]
+    uvicorn = [
+        sys.executable, '-m', 'uvicorn', '--port', str(port),
+        '--workers', '1', '--no-access-log', '--log-level', 'warning',
+    ]
+    if server == 'asgi-django':
+        # Django's own handler, for reference.
+        return uvicorn + [
+            '--factory', 'django.core.asgi:get_asgi_application'
+        ]
+    return uvicorn + ['app.asgi:application']
+
+
+class Command(BaseCommand):
+    """Compare the app servers under fast reads mixed with slow requests.
+
+    Each server runs one worker process with the same number of threads.
+    Slow traffic is logins, which wait for password hashing, and clients
+    sending their request body slowly. Servers are reached directly, as
+    the proxy would otherwise buffer slow bodies for uWSGI.
+    """
+    help = 'Report fast read latency and throughput per app server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--servers',
+            default='uwsgi,asgi-django,asgi',
+            help='Comma separated servers: uwsgi, asgi-django, asgi.',
+        )
+        parser.add_argument('--threads', type=int, default=4,
+                            help='uWSGI threads, and ASGI_THREADS.')
+        parser.add_argument('--readers', type=int, default=8,
+                            help='Clients reading recipes continuously.')
+        parser.add_argument('--logins', type=int, default=2,
+                            help='Clients logging in continuously.')
+        parser.add_argument('--uploaders', type=int, default=4,
+                            help='Clients sending bodies slowly.')
+        parser.add_argument('--upload-seconds', type=float, default=1,
+                            help='Time each slow client takes to send.')
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--port', type=int, default=9100)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of deleting it.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        servers = options['servers'].split(',')
+        unknown = set(servers) - {'uwsgi', 'asgi-django', 'asgi'}
+        if unknown:
+            raise CommandError(f"Unknown servers: {', '.join(unknown)}")
+
+        self.user = get_bench_user()
+        seed_recipes(self.user, 200, tags=10, ingredients=30)
+        self.token = Token.objects.create(user=self.user).key
+        self.recipe_ids = list(
+            Recipe.objects.filter(user=self.user).values_list('id', flat=True)
+        )
+        try:
+            for server in servers:
+                self._run(server, options)
+        finally:
+            if not options['keep']:
+                self.user.delete()
+
+    def _run(self, server, options):
+        """Start a server, send mixed traffic and print the results."""
+        env = {
+            **os.environ,
+            'ASGI_THREADS': str(options['threads']),
+            'ALLOWED_HOSTS': 'localhost',
+            # Lift every throttle, the clients share one address.
+            **{
+                f'THROTTLE_{scope.upper()}': ''
+                for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+            },
+        }
+        if self._accepts(options['port']):
+            raise CommandError(f"Port {options['port']} is already in use.")
+        process = subprocess.Popen(
+            _server_command(server, options['port'], options['threads']),
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self._wait_until_up(options['port'], process)
+            results = self._load(options)
+        finally:
+            process.terminate()
+            process.wait()
+
+        seconds = options['seconds']
+        reads = results['read']
+        self.stdout.write(
+            f'{server:>11}: reads {len(reads) / seconds:7.1f}/s '
+            f'p50={percentile(reads, 50):7.1f}ms '
+            f'p95={percentile(reads, 95):7.1f}ms  '
+            f"logins {len(results['login']) / seconds:5.1f}/s  "
+            f"uploads {len(results['upload']) / seconds:5.1f}/s  "
+            f"errors {results['errors']}"
+        )
+
+    def _accepts(self, port):
+        """Return whether something listens on the port."""
+        try:
+            socket.create_connection(('localhost', port), 1).close()
+        except OSError:
+            return False
+        return True
+
+    def _wait_until_up(self, port, process, timeout=30):
+        """Wait until the server accepts connections."""
+        deadline = time.monotonic() + timeout
+        while not self._accepts(port):
+            if process.poll() is not None:
+                raise CommandError('The server exited on startup.')
+            if time.monotonic() > deadline:
+                raise CommandError('The server did not start in time.')
+            time.sleep(0.2)
+
+    def _load(self, options):
+        """Run every client until the deadline and collect latencies."""
+        results = {'read': [], 'login': [], 'upload': [], 'errors': 0}
+        deadline = time.perf_counter() + options['seconds']
+        clients = (
+            [self._read] * options['readers']
+            + [self._login] * options['logins']
+            + [self._upload] * options['uploaders']
+        )
+        threads = [
+            threading.Thread(
+                target=self._loop, args=(client, deadline, results, options)
+            )
+            for client in clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _loop(self, client, deadline, results, options):
+        """Send requests of one kind until the deadline."""
+        kind = client.__name__.strip('_')
+        index = 0
+        while time.perf_counter() < deadline:
+            index += 1
+            connection = http.client.HTTPConnection(
+                'localhost', options['port'], timeout=60
+            )
+            start = time.perf_counter()
+            try:
+                status = client(connection, index, options)
+            except OSError:
+                status = None
+            finally:
+                connection.close()
+            if status != 200:
+                results['errors'] += 1
+            elif time.perf_counter() < deadline:
+                results[kind].append((time.perf_counter() - start) * 1000)
+
+    def _auth(self):
+        return {'Authorization': f'Token {self.token}'}
+
+    def _read(self, connection, index, options):
+        """Read one recipe."""
+        recipe_id = self.recipe_ids[index % len(self.recipe_ids)]
+        connection.request(
+            'GET',
+            reverse('recipe:recipe-detail', args=[recipe_id]),
+            headers=self._auth(),
+        )
+        return connection.getresponse().status
+
+    def _login(self, connection, index, options):
+        """Log in, which waits for the password hash."""
+        connection.request(
+            'POST',
+            reverse('user:token'),
+            body=json.dumps(
+                {'email': self.user.email, 'password': BENCH_PASSWORD}
+            ),
+            headers={'Content-Type': 'application/json'},
+        )
+        return connection.getresponse().status
+
+    def _upload(self, connection, index, options):
+        """Update the user name, sending the body in slow parts."""
+        body = json.dumps({'name': f'Bench {index:0200d}'}).encode()
+        connection.putrequest('PATCH', reverse('user:me'))
+        for header, value in {
+            **self._auth(),
+            'Content-Type': 'application/json',
+            'Content-Length': str(len(body)),
+        }.items():
+            connection.putheader(header, value)
+        connection.endheaders()
+        part = -(-len(body) // SLOW_UPLOAD_PARTS)
+        for offset in range(0, len(body), part):
+            connection.send(body[offset:offset + part])
+            time.sleep(options['upload_seconds'] / SLOW_UPLOAD_PARTS)
+        return connection.getresponse().status
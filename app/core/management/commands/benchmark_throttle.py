@@ -0,0 +1,85 @@
+"""
+Django command measuring the overhead of a throttle check
+"""
+
+import pickle
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework import throttling
+
+from core.benchmark import time_it
+from core.throttling import UserRateThrottle
+
+
+BATCH = 100
+
+
+class Command(BaseCommand):
+    """Compare the sliding window counters with DRF's request history."""
+    help = 'Measure time per throttle check and cache bytes per client.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--checks',
+            default='100,1000,5000',
+            help='Comma separated numbers of requests already counted.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        view = SimpleNamespace(throttle_scope='bench')
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        self.stdout.write(f'Cache: {cache.__class__.__name__}')
+
+        for checks in map(int, options['checks'].split(',')):
+            # High enough that no check is refused.
+            rate = f"{checks + BATCH * (options['repeat'] + 1)}/hour"
+            history = type(
+                'HistoryThrottle', (throttling.UserRateThrottle,),
+                {'rate': rate, 'cache': cache},
+            )()
+            window = UserRateThrottle()
+            with override_settings(REST_FRAMEWORK={
+                **settings.REST_FRAMEWORK,
+                'DEFAULT_THROTTLE_RATES': {'bench_user': rate},
+            }):
+                for label, throttle in (('history', history),
+                                        ('window', window)):
+                    # A client of its own, so nothing else in the cache is
+                    # touched.
+                    request = SimpleNamespace(META={}, user=SimpleNamespace(
+                        pk=f'bench-{label}-{checks}', is_authenticated=True,
+                    ))
+                    # Fill the store, then time the next checks.
+                    for _ in range(checks):
+                        throttle.allow_request(request, view)
+                    timing = time_it(
+                        lambda: [
+                            throttle.allow_request(request, view)
+                            for _ in range(BATCH)
+                        ],
+                        options['repeat'],
+                    )
+                    keys = self._keys(throttle)
+                    stored = sum(
+                        len(pickle.dumps(value))
+                        for value in cache.get_many(keys).values()
+                    )
+                    cache.delete_many(keys)
+                    self.stdout.write(
+                        f'{checks:>6} counted {label:>8}: '
+                        f"{timing['median'] * 1000 / BATCH:8.1f}us/check "
+                        f'{stored:>8} bytes/client'
+                    )
+
+    def _keys(self, throttle):
+        """Return the cache keys holding the state of one client."""
+        if isinstance(throttle, UserRateThrottle):
+            window = int(throttle.timer() // throttle.duration)
+            return [f'{throttle.key}:{window - 1}', f'{throttle.key}:{window}']
+        return [throttle.key]
@@ -0,0 +1,117 @@
+"""
+Django command measuring memory used by concurrent image uploads
+"""
+
+import io
+import struct
+import threading
+import time
+import tracemalloc
+import zlib
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.management.base import BaseCommand
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, RequestFactory
+from django.test.client import encode_multipart
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import MultiPartParser
+from rest_framework.request import Request
+
+from recipe.parsers import ImageUploadParser
+
+
+def _noise_jpeg(megabytes):
+    """Return a JPEG of roughly the given size."""
+    side = int((megabytes * 1024 * 1024 / 1.2) ** 0.5)
+    buffer = io.BytesIO()
+    Image.effect_noise((side, side), 64).convert('RGB').save(
+        buffer, 'JPEG', quality=95
+    )
+    return buffer.getvalue()
+
+
+def _bomb_png(padding):
+    """Return a PNG claiming 30000x30000 pixels followed by padding."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (1, 1)).save(buffer, 'PNG')
+    data = buffer.getvalue()
+    ihdr = struct.pack('>II', 30000, 30000) + data[24:29]
+    crc = struct.pack('>I', zlib.crc32(b'IHDR' + ihdr))
+    return data[:16] + ihdr + crc + data[33:] + b'\0' * padding
+
+
+class Command(BaseCommand):
+    """Compare Django's upload handlers with the streaming image handler."""
+    help = 'Measure peak memory and time of concurrent image uploads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--megabytes', type=float, default=2)
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        size = options['megabytes']
+        cases = [
+            (f'{size:g}MB jpeg', _noise_jpeg(size)),
+            (f'{size:g}MB bomb', _bomb_png(int(size * 1024 * 1024))),
+        ]
+        parsers = [('default', MultiPartParser), ('streaming', ImageUploadParser)]
+        for label, content in cases:
+            body = encode_multipart(BOUNDARY, {'image': _named(content)})
+            for parser_label, parser_class in parsers:
+                peak, elapsed, outcome = self._measure(
+                    body, parser_class, options['concurrency']
+                )
+                # Each fake request holds its own copy of the body.
+                extra = peak / options['concurrency'] - len(body)
+                self.stdout.write(
+                    f'{label:>14} {parser_label:>9}: {elapsed * 1000:8.1f}ms '
+                    f'beyond body/upload={extra / 1024:8.0f}KiB {outcome}'
+                )
+
+    def _measure(self, body, parser_class, concurrency):
+        """Run concurrent uploads and return peak memory, time and result."""
+        outcomes = []
+        threads = [
+            threading.Thread(
+                target=lambda: outcomes.append(_upload(body, parser_class))
+            )
+            for _ in range(concurrency)
+        ]
+        tracemalloc.start()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak, elapsed, outcomes[0]
+
+
+def _named(content):
+    """Wrap content in a named file for the multipart encoder."""
+    image_file = io.BytesIO(content)
+    image_file.name = 'upload.png'
+    return image_file
+
+
+def _upload(body, parser_class):
+    """Parse and validate one multipart upload, return the outcome."""
+    request = Request(
+        RequestFactory().generic(
+            'POST', '/', body, content_type=MULTIPART_CONTENT
+        ),
+        parsers=[parser_class()],
+    )
+    try:
+        image = request.FILES['image']
+        serializers.ImageField().run_validation(image)
+    except APIException as exc:
+        return f'rejected: {exc.detail}'
+    except DjangoValidationError as exc:
+        return f'rejected: {exc.messages}'
+    return 'accepted'
@@ -0,0 +1,71 @@
+"""
+Django command deleting recipe image files no recipe references
+"""
+
+import posixpath
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Recipe, RECIPE_IMAGE_DIR
+
+
+def _walk(storage, path):
+    """Yield the names of every file below a storage directory."""
+    if not storage.exists(path):
+        return
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from _walk(storage, posixpath.join(path, directory))
+
+
+class Command(BaseCommand):
+    """Garbage collect orphaned images and derivatives."""
+    help = 'Delete stored recipe images and derivatives no recipe uses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-seconds',
+            type=int,
+            default=settings.IMAGE_GRACE_SECONDS,
+            help='Keep files modified more recently, uploads may be in flight.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the files that would be deleted.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        referenced = set()
+        images = Recipe.objects.exclude(image='').exclude(image__isnull=True)
+        rows = images.values_list('image', 'image_derivatives').iterator()
+        for image, derivatives in rows:
+            referenced.add(image)
+            for formats in derivatives.values():
+                referenced.update(formats.values())
+
+        cutoff = timezone.now() - timedelta(seconds=options['grace_seconds'])
+        deleted, freed = 0, 0
+        for name in _walk(default_storage, RECIPE_IMAGE_DIR):
+            if name in referenced:
+                continue
+            if default_storage.get_modified_time(name) > cutoff:
+                continue
+            freed += default_storage.size(name)
+            deleted += 1
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                default_storage.delete(name)
+
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {deleted} files, {freed} bytes.'
+        ))
@@ -0,0 +1,103 @@
+"""
+Django command checking the list queries use indexes on large data
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmark import (
+    explain,
+    get_bench_users,
+    seed_recipes,
+    seq_scanned_tables,
+    view_queryset,
+)
+from recipe.pagination import RecipeAttrCursorPagination, RecipeCursorPagination
+from recipe.rows import value_columns
+from recipe.serializers import RecipeSerializer
+from recipe.views import RecipeViewSet, TagViewSet, IngredientViewSet
+
+
+TABLES = ('core_recipe', 'core_tag', 'core_ingredient')
+
+
+class Command(BaseCommand):
+    """Seed many users and EXPLAIN the per-user list queries."""
+    help = 'Assert the recipe, tag and ingredient lists use index scans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE and print timings.',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded data instead of deleting it.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN checks require PostgreSQL.')
+
+        users = get_bench_users(options['users'])
+        per_user = options['recipes'] // len(users)
+        self.stdout.write(f"Seeding {per_user} recipes for {len(users)} users")
+        for user in users:
+            seed_recipes(user, per_user, tags=50, ingredients=200)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        try:
+            failures = self._check(users[0], options)
+        finally:
+            if not options['keep']:
+                for user in users:
+                    user.delete()
+
+        if failures:
+            raise CommandError(f"Sequential scans in: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('All list queries use indexes.'))
+
+    def _queries(self, user, page_size):
+        """Return the list queries as (label, queryset) pairs."""
+        fields = RecipeSerializer.Meta.fields
+        recipes = view_queryset(RecipeViewSet, user).values(
+            *value_columns(fields)
+        )
+        last_id = recipes.values_list('id', flat=True)[page_size * 10]
+        tag_id = view_queryset(TagViewSet, user).values_list('id', flat=True)[0]
+        attr_ordering = RecipeAttrCursorPagination.ordering
+        return [
+            ('recipes first page', recipes.order_by(
+                *RecipeCursorPagination.ordering)[:page_size + 1]),
+            ('recipes deep page', recipes.filter(id__lt=last_id).order_by(
+                *RecipeCursorPagination.ordering)[:page_size + 1]),
+            ('recipes by tag', view_queryset(
+                RecipeViewSet, user, params={'tags': str(tag_id)}
+            ).values('id')[:page_size + 1]),
+            ('tags page', view_queryset(TagViewSet, user).order_by(
+                *attr_ordering)[:page_size + 1]),
+            ('ingredients page', view_queryset(IngredientViewSet, user)
+                .order_by(*attr_ordering)[:page_size + 1]),
+            ('assigned tags page', view_queryset(
+                TagViewSet, user, params={'assigned_only': '1'}
+            ).order_by(*attr_ordering)[:page_size + 1]),
+        ]
+
+    def _check(self, user, options):
+        """Explain every query and return the labels using seq scans."""
+        failures = []
+        for label, queryset in self._queries(user, options['page_size']):
+            plan = explain(queryset, analyze=options['analyze'])
+            scanned = seq_scanned_tables(plan, TABLES)
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(plan)
+            if scanned:
+                failures.append(label)
+        return failures
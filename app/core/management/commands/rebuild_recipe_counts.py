@@ -0,0 +1,41 @@
+"""
+Django command recomputing the recipe counts of tags and ingredients
+"""
+
+from django.core.management.base import BaseCommand
+
+from recipe.cache import invalidate_user
+from recipe.counts import (
+    COUNTED_MODELS, rebuild_recipe_counts, stale_recipe_counts
+)
+
+
+class Command(BaseCommand):
+    """Repair counters that drifted, e.g. after raw SQL or a restore."""
+    help = 'Recompute recipe_count of every tag and ingredient.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='Only rebuild the counters of this user ID.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command."""
+        for model in COUNTED_MODELS:
+            queryset = model.objects.all()
+            if options['user'] is not None:
+                queryset = queryset.filter(user_id=options['user'])
+            owners = set(
+                stale_recipe_counts(model, queryset).values_list(
+                    'user_id', flat=True
+                )
+            )
+            fixed = rebuild_recipe_counts(model, queryset)
+            # Cached lists of the owners show the old counts.
+            for user_id in owners:
+                invalidate_user(user_id)
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed {fixed} {model._meta.verbose_name_plural}.'
+            ))
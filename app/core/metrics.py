@@ -0,0 +1,340 @@
+"""
+In-process request metrics
+
+Histograms are kept per view in the memory of each worker and rendered
+in the Prometheus text format. Every series carries a ``worker`` label
+holding the process id.
+
+A scrape reaches one worker only, picked by uWSGI or uvicorn, so on its
+own a worker can only render its own series; the series of the others
+would be missing from that scrape and go stale. With METRICS_DIR set,
+each worker writes a snapshot of its metrics there at most every
+METRICS_SHARE_SECONDS, and a scrape renders its own series along with
+the last snapshots of the other live workers.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(9))
+
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Wall time of sampled requests.', LATENCY_BUCKETS,
+    ),
+    'request_db_queries': (
+        'Database queries run by sampled requests.', QUERY_BUCKETS,
+    ),
+    'request_db_duration_seconds': (
+        'Time sampled requests spent in database queries.', LATENCY_BUCKETS,
+    ),
+    'request_serialize_duration_seconds': (
+        'Time sampled requests spent in serializers and renderers.',
+        LATENCY_BUCKETS,
+    ),
+    'response_size_bytes': (
+        'Body size of sampled non streaming responses.', SIZE_BUCKETS,
+    ),
+}
+REQUESTS_TOTAL = 'requests_total'
+PREFIX = 'app_'
+
+_sample = contextvars.ContextVar('metrics_sample', default=None)
+
+
+class Histogram:
+    """Bucketed counts of observed values."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Return (upper bound, count) pairs including the +Inf bucket."""
+        return _cumulative(self.buckets, self.counts)
+
+
+def _cumulative(buckets, counts):
+    total = 0
+    for bound, count in zip(buckets + ('+Inf',), counts):
+        total += count
+        yield bound, total
+
+
+class MetricsRegistry:
+    """Thread safe store of per view histograms and request counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._requests = {}
+        self._counters = {}
+
+    def add_counter(self, name, help_text, label, read):
+        """Render a counter kept elsewhere, read again on every scrape.
+
+        ``read`` returns a mapping of ``label`` value to count.
+        """
+        self._counters[name] = (help_text, label, read)
+
+    def count(self, view, status):
+        """Count a request, sampled or not."""
+        key = (view, status)
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def observe(self, view, values):
+        """Record a mapping of histogram name to value for one request."""
+        with self._lock:
+            for name, value in values.items():
+                histogram = self._histograms.get((name, view))
+                if histogram is None:
+                    histogram = Histogram(HISTOGRAMS[name][1])
+                    self._histograms[(name, view)] = histogram
+                histogram.observe(value)
+
+    def get(self, name, view):
+        """Return the histogram of a view, or None if nothing was recorded."""
+        return self._histograms.get((name, view))
+
+    def requests(self, view, status):
+        return self._requests.get((view, status), 0)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+
+    def snapshot(self):
+        """Return the metrics of this worker as JSON serializable data."""
+        with self._lock:
+            requests = [
+                [view, status, value]
+                for (view, status), value in self._requests.items()
+            ]
+            histograms = [
+                [name, view, list(histogram.counts), histogram.sum,
+                 histogram.count]
+                for (name, view), histogram in self._histograms.items()
+            ]
+        counters = {
+            name: dict(read())
+            for name, (_, _, read) in self._counters.items()
+        }
+        return {
+            'worker': str(os.getpid()),
+            'requests': requests,
+            'histograms': histograms,
+            'counters': counters,
+        }
+
+    def render(self, snapshots=None):
+        """Return metrics in the Prometheus text format.
+
+        Renders the given worker snapshots, by default this worker's.
+        """
+        if snapshots is None:
+            snapshots = [self.snapshot()]
+        lines = []
+        name = PREFIX + REQUESTS_TOTAL
+        lines.append(f'# HELP {name} Requests handled by view and status.')
+        lines.append(f'# TYPE {name} counter')
+        for snapshot in snapshots:
+            worker = snapshot['worker']
+            for view, status, value in sorted(snapshot['requests']):
+                labels = _labels(worker=worker, view=view, status=status)
+                lines.append(f'{name}{labels} {value}')
+
+        for short_name, (help_text, buckets) in HISTOGRAMS.items():
+            name = PREFIX + short_name
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for snapshot in snapshots:
+                worker = snapshot['worker']
+                for hist_name, view, counts, total, count in sorted(
+                    snapshot['histograms'], key=lambda row: row[:2]
+                ):
+                    if hist_name != short_name:
+                        continue
+                    for bound, cumulative in _cumulative(buckets, counts):
+                        labels = _labels(worker=worker, view=view, le=bound)
+                        lines.append(f'{name}_bucket{labels} {cumulative}')
+                    labels = _labels(worker=worker, view=view)
+                    lines.append(f'{name}_sum{labels} {total:g}')
+                    lines.append(f'{name}_count{labels} {count}')
+
+        for short_name, (help_text, label, _) in self._counters.items():
+            name = PREFIX + short_name
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for snapshot in snapshots:
+                counts = snapshot['counters'].get(short_name, {})
+                for value, count in sorted(counts.items()):
+                    labels = _labels(
+                        worker=snapshot['worker'], **{label: value}
+                    )
+                    lines.append(f'{name}{labels} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    """Format label values, escaping them as Prometheus expects."""
+    pairs = (
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in labels.items()
+    )
+    return '{' + ','.join(pairs) + '}'
+
+
+registry = MetricsRegistry()
+
+_shared_at = None
+_share_lock = threading.Lock()
+
+
+def share_snapshot(directory, interval=0):
+    """Write the snapshot of this worker to directory.
+
+    Skipped when written less than interval seconds ago, or while
+    another thread is writing it.
+    """
+    global _shared_at
+    if not _share_lock.acquire(blocking=False):
+        return
+    try:
+        now = time.monotonic()
+        if _shared_at is not None and now - _shared_at < interval:
+            return
+        _shared_at = now
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as snapshot_file:
+            json.dump(registry.snapshot(), snapshot_file)
+        os.replace(f'{path}.tmp', path)
+    finally:
+        _share_lock.release()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def shared_snapshots(directory):
+    """Return this worker's snapshot and the last ones of the others.
+
+    Snapshots of workers that exited are deleted.
+    """
+    own = registry.snapshot()
+    snapshots = [own]
+    for file_name in sorted(os.listdir(directory)):
+        worker, extension = os.path.splitext(file_name)
+        if extension != '.json' or worker == own['worker']:
+            continue
+        path = os.path.join(directory, file_name)
+        try:
+            alive = _alive(int(worker))
+        except ValueError:
+            continue
+        if not alive:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            continue
+        try:
+            with open(path) as snapshot_file:
+                snapshots.append(json.load(snapshot_file))
+        except (FileNotFoundError, ValueError):
+            # Removed since it was listed, or not a snapshot.
+            continue
+    return snapshots
+
+
+class RequestSample:
+    """Phase timings collected while one sampled request runs."""
+
+    __slots__ = ('queries', 'db_time', 'phases', '_open')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.phases = {}
+        self._open = set()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper counting and timing queries."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def start_sample():
+    """Start collecting phase timings for the current request."""
+    sample = RequestSample()
+    return sample, _sample.set(sample)
+
+
+def end_sample(token):
+    _sample.reset(token)
+
+
+def current_sample():
+    """Return the sample of the running request, if it is sampled."""
+    return _sample.get()
+
+
+@contextlib.contextmanager
+def timed(phase):
+    """Add the time spent in the block to a phase of the current sample.
+
+    Does nothing outside sampled requests. Nested blocks of the same
+    phase are only counted once, by the outermost one.
+    """
+    sample = _sample.get()
+    if sample is None or phase in sample._open:
+        yield
+        return
+    sample._open.add(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.add(phase, time.perf_counter() - start)
+        sample._open.discard(phase)
+
+
+class TimedRepresentationMixin:
+    """Record the time spent in to_representation as serializer time."""
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
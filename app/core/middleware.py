@@ -0,0 +1,99 @@
+"""
+Middleware of the project
+"""
+
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core import metrics
+
+
+logger = logging.getLogger(__name__)
+
+def view_name(view_func, method):
+    """Return a name like RecipeViewSet.list for a resolved view."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__qualname__', 'unknown')
+    method = method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+class MetricsMiddleware:
+    """Record per view latency, query and response size metrics.
+
+    Every request is counted. A fraction of them, set by
+    METRICS_SAMPLE_RATE, is timed in detail: wall time, number and time
+    of database queries, time in serializers and renderers and the size
+    of the body. Streaming responses are timed until their first byte.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self._record(request)
+        if settings.METRICS_DIR:
+            try:
+                metrics.share_snapshot(
+                    settings.METRICS_DIR, settings.METRICS_SHARE_SECONDS
+                )
+            except OSError:
+                logger.exception('Sharing the metrics snapshot failed')
+        return response
+
+    def _record(self, request):
+        rate = settings.METRICS_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            response = self.get_response(request)
+            metrics.registry.count(
+                getattr(request, 'metrics_view', 'unresolved'),
+                response.status_code,
+            )
+            return response
+
+        sample, token = metrics.start_sample()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample))
+                response = self.get_response(request)
+        finally:
+            metrics.end_sample(token)
+        elapsed = time.perf_counter() - start
+
+        view = getattr(request, 'metrics_view', 'unresolved')
+        values = {
+            'request_duration_seconds': elapsed,
+            'request_db_queries': sample.queries,
+            'request_db_duration_seconds': sample.db_time,
+            'request_serialize_duration_seconds':
+                sample.phases.get('serialize', 0.0),
+        }
+        if not response.streaming:
+            values['response_size_bytes'] = len(response.content)
+        metrics.registry.count(view, response.status_code)
+        metrics.registry.observe(view, values)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_name(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        """Time rendering, which Django runs right after this hook."""
+        sample = metrics.current_sample()
+        if sample is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: sample.add(
+                    'serialize', time.perf_counter() - start
+                )
+            )
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:59
+
+from django.db import migrations
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags and ingredients sharing a name for the same user.
+
+    Recipes linked to a duplicate are relinked to the oldest row with
+    that name before the duplicates are deleted.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        column = getattr(Recipe, field).field.m2m_reverse_name()
+        keep = {}
+        for obj in model.objects.order_by('id').only('id', 'user_id', 'name'):
+            key = (obj.user_id, obj.name)
+            if key not in keep:
+                keep[key] = obj.id
+                continue
+            linked = through.objects.filter(**{column: obj.id})
+            already = set(
+                through.objects.filter(**{column: keep[key]})
+                .values_list('recipe_id', flat=True)
+            )
+            linked.exclude(recipe_id__in=already).update(**{column: keep[key]})
+            obj.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_merge_duplicate_attr_names'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(blank=True, related_name='recipes', to='core.Ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_ingredient_name_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_name_per_user'),
+        ),
+    ]
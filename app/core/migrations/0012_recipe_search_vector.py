@@ -0,0 +1,67 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:18
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_search_vectors(apps, schema_editor):
+    """Fill the search vector of existing recipes."""
+    Recipe = apps.get_model('core', 'Recipe')
+    names = Recipe.ingredients.through.objects.filter(
+        recipe_id=OuterRef('pk')
+    ).values('recipe_id').annotate(
+        names=StringAgg('ingredient__name', ' ')
+    ).values('names')
+    Recipe.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('description', weight='B', config='english')
+        + SearchVector(Subquery(names), weight='C', config='english')
+    ))
+
+
+def create_trigram_index(apps, schema_editor):
+    """Install pg_trgm and index titles for fuzzy search when available.
+
+    Fuzzy search is optional, so servers without the contrib extensions
+    still migrate.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS recipe_title_trgm_idx '
+            'ON core_recipe USING gin (title gin_trgm_ops)'
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS recipe_title_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_per_user_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
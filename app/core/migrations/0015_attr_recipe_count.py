@@ -0,0 +1,45 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_recipe_counts(apps, schema_editor):
+    """Count the recipes linked to existing tags and ingredients."""
+    for name in ('Tag', 'Ingredient'):
+        model = apps.get_model('core', name)
+        through = model.recipes.through
+        column = model.recipes.field.m2m_reverse_name()
+        counts = through.objects.filter(**{column: OuterRef('pk')}).order_by(
+        ).values(column).annotate(n=Count('pk')).values('n')
+        model.objects.update(recipe_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_recipe_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(condition=models.Q(('recipe_count__gt', 0)), fields=['user', '-name', '-id'], name='ingredient_user_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(condition=models.Q(('recipe_count__gt', 0)), fields=['user', '-name', '-id'], name='tag_user_assigned_idx'),
+        ),
+    ]
@@ -7,21 +7,50 @@ Return: return_description
 """
 
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin
 )
 from django.conf import settings
+import hashlib
 import uuid
 import os
 
+from core.storage import ContentAddressedStorage
+
+
+RECIPE_IMAGE_DIR = os.path.join('uploads', 'recipe')
+
+
+def _content_hash(instance):
+    """Return the SHA-256 of a recipe image being uploaded, if any."""
+    image = getattr(instance, 'image', None)
+    if not image or image._committed:
+        return None
+    digest = hashlib.sha256()
+    for chunk in image.chunks():
+        digest.update(chunk)
+    image.seek(0)
+    return digest.hexdigest()
+
 
 def recipe_image_file_path(instance, file_name):
-    """Gerating the file path for new recipe"""
-    ext = os.path.splitext(file_name)[1]
-    filename = f'{uuid.uuid4()}{ext}'
-    return os.path.join('uploads','recipe',filename)
+    """Gerating the file path for new recipe
+
+    Images are named after the hash of their content, so identical
+    uploads share one file. A random name is used when the content is
+    not available.
+    """
+    ext = os.path.splitext(file_name)[1].lower()
+    digest = _content_hash(instance)
+    if digest is None:
+        return os.path.join(RECIPE_IMAGE_DIR, f'{uuid.uuid4()}{ext}')
+    return os.path.join(
+        RECIPE_IMAGE_DIR, digest[:2], digest[2:4], f'{digest}{ext}'
+    )
 
 
 class UserManager(BaseUserManager):
@@ -60,7 +89,8 @@ class User(AbstractBaseUser, PermissionsMixin):
 class Recipe(models.Model):
     '''Recipe Objects'''
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
-                             on_delete=models.CASCADE)
+                             on_delete=models.CASCADE,
+                             db_index=False)
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     time_minutes = models.IntegerField()
@@ -68,7 +98,24 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag', related_name='recipes', blank=True)
     ingredients = models.ManyToManyField('Ingredient', related_name='recipes', blank=True)
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=ContentAddressedStorage(),
+    )
+    # Storage names of resized copies, filled by recipe.images workers.
+    image_derivatives = models.JSONField(default=dict, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Kept up to date by recipe.search; covers ingredient names too.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # Every list filters by user and pages on -id, so the composite
+        # index replaces the default single column index on user.
+        indexes = [
+            models.Index(fields=['user', '-id'], name='recipe_user_id_desc_idx'),
+            GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -78,7 +125,27 @@ class Tag(models.Model):
     '''Tag Objects'''
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
-                             on_delete=models.CASCADE)
+                             on_delete=models.CASCADE,
+                             db_index=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of linked recipes, kept up to date by recipe.counts.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_tag_name_per_user',
+            ),
+        ]
+        # Lists of assigned tags scan only the tags in use.
+        indexes = [
+            models.Index(
+                fields=['user', '-name', '-id'],
+                condition=models.Q(recipe_count__gt=0),
+                name='tag_user_assigned_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -89,7 +156,26 @@ class Ingredient(models.Model):
     """Ingredient Objects"""
 
     name = models.CharField(max_length=255)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete= models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete= models.CASCADE,
+                             db_index=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of linked recipes, kept up to date by recipe.counts.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_name_per_user',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-name', '-id'],
+                condition=models.Q(recipe_count__gt=0),
+                name='ingredient_user_assigned_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+Database router sending API reads to read replicas
+
+Reads go to the primary unless a view opts in with ``ReplicaReadMixin``,
+which routes the GET requests of its ``replica_actions`` to one of
+REPLICA_DATABASES. A user whose request changed data is pinned to the
+primary for REPLICA_PIN_SECONDS afterwards, so they read their own
+writes while the replicas catch up; keep it above the usual replica lag.
+The pins live in the cache named by REPLICA_PIN_CACHE_ALIAS, which must
+be shared by the workers.
+"""
+
+import contextlib
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+@contextlib.contextmanager
+def replica_reads(enabled=True):
+    """Route the reads made inside the block to the replicas, or not."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def reading_replicas():
+    """Return whether reads are routed to the replicas right now."""
+    return _replica_reads.get()
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send the reads of a user to the primary for a while."""
+    if settings.REPLICA_PIN_SECONDS:
+        caches[settings.REPLICA_PIN_CACHE_ALIAS].set(
+            _pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS
+        )
+
+
+def is_pinned(user_id):
+    """Return whether a user recently wrote and must read the primary."""
+    return bool(
+        caches[settings.REPLICA_PIN_CACHE_ALIAS].get(_pin_key(user_id))
+    )
+
+
+class ReplicaRouter:
+    """Read from a random replica when enabled, write to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if not settings.REPLICA_DATABASES or not reading_replicas():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # A transaction reads what it wrote.
+            return None
+        return random.choice(settings.REPLICA_DATABASES)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReplicaReadMixin:
+    """Serve the safe requests of some actions from the replicas.
+
+    Requests changing data pin their user to the primary, see
+    ``pin_to_primary``.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(False):
+            response = super().dispatch(request, *args, **kwargs)
+        user = getattr(self.request, 'user', None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user.pk)
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication and throttling read the primary.
+        super().initial(request, *args, **kwargs)
+        if (
+            request.method in SAFE_METHODS
+            and self.action in self.replica_actions
+            and not is_pinned(request.user.pk)
+        ):
+            _replica_reads.set(True)
@@ -0,0 +1,25 @@
+"""
+Signal handlers checking persistent database connections.
+"""
+
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    """Drop kept connections that stopped working before a request.
+
+    Runs after Django's own handler closed the connections that are past
+    CONN_MAX_AGE, for databases with CONN_HEALTH_CHECKS set. A server
+    restart or a pooler closing idle clients then costs a reconnect
+    instead of failing the request.
+    """
+    for conn in connections.all():
+        if (
+            conn.connection is not None
+            and conn.settings_dict.get('CONN_HEALTH_CHECKS')
+            and not conn.is_usable()
+        ):
+            conn.close()
@@ -0,0 +1,30 @@
+"""
+File storage for content addressed uploads
+"""
+
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage keeping a single copy of each file.
+
+    Names derived from the file content are reused as they are: saving a
+    file under a name that already exists refreshes its modification
+    time and returns that name without writing anything, so cleanups
+    going by age see the file as in use again.
+    """
+
+    def touch(self, name):
+        """Refresh the modification time of a file, if it exists."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self, name, content, max_length=None):
+        if name is not None and self.touch(name):
+            return name
+        return super().save(name, content, max_length=max_length)
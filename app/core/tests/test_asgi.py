@@ -0,0 +1,161 @@
+"""
+Tests for the ASGI handler
+"""
+
+import asyncio
+import threading
+import time
+
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db import connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import TransactionTestCase, override_settings
+from django.urls import path
+
+from core.asgi import ASGIHandler
+
+
+barrier = threading.Barrier(2)
+running = {'now': 0, 'peak': 0}
+running_lock = threading.Lock()
+
+
+def meet(request):
+    """Wait for a second request, which needs two threads."""
+    barrier.wait(timeout=5)
+    return HttpResponse(threading.get_ident())
+
+
+def slow(request):
+    with running_lock:
+        running['now'] += 1
+        running['peak'] = max(running['peak'], running['now'])
+    time.sleep(0.1)
+    with running_lock:
+        running['now'] -= 1
+    return HttpResponse()
+
+
+def stream(request):
+    """Stream rows read from the database while iterating."""
+    def rows():
+        yield 'users:'
+        yield str(get_user_model().objects.count())
+    return StreamingHttpResponse(rows())
+
+
+def broken_stream(request):
+    """Stream a first chunk, then fail as an export error would."""
+    def rows():
+        yield 'users:'
+        raise RuntimeError('Export failed.')
+    return StreamingHttpResponse(rows())
+
+
+urlpatterns = [
+    path('meet/', meet),
+    path('slow/', slow),
+    path('stream/', stream),
+    path('broken-stream/', broken_stream),
+]
+
+
+@override_settings(ROOT_URLCONF='core.tests.test_asgi', ALLOWED_HOSTS=['*'])
+class ASGIHandlerTests(TransactionTestCase):
+    """Test requests run on threads of their own"""
+
+    def setUp(self):
+        self.applications = []
+
+    def tearDown(self):
+        # Pool threads keep their connections, which would block dropping
+        # the test database.
+        for application in self.applications:
+            threads = application._threads
+            while threads is not None and not threads.empty():
+                executor = threads.get_nowait()
+                executor.submit(connections.close_all).result()
+                executor.shutdown()
+
+    def _application(self):
+        application = ASGIHandler()
+        self.applications.append(application)
+        return application
+
+    async def _request(self, application, url):
+        """Send a GET request and return its communicator."""
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'method': 'GET',
+            'path': url,
+            'query_string': b'',
+            'headers': [],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        return communicator
+
+    async def _get(self, application, url):
+        communicator = await self._request(application, url)
+        start = await communicator.receive_output(10)
+        body = b''
+        while True:
+            message = await communicator.receive_output(10)
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        # The response is closed after its last chunk is sent.
+        await communicator.wait(10)
+        return start['status'], body
+
+    async def test_requests_run_concurrently(self):
+        """Test two requests meet, each on its own thread"""
+        application = self._application()
+        barrier.reset()
+
+        results = await asyncio.gather(
+            self._get(application, '/meet/'),
+            self._get(application, '/meet/'),
+        )
+
+        self.assertEqual([status for status, _ in results], [200, 200])
+        self.assertNotEqual(results[0][1], results[1][1])
+
+    @override_settings(ASGI_THREADS=2)
+    async def test_running_views_bounded(self):
+        """Test at most ASGI_THREADS views run at once"""
+        application = self._application()
+        running['peak'] = 0
+
+        results = await asyncio.gather(
+            *(self._get(application, '/slow/') for _ in range(5))
+        )
+
+        self.assertEqual({status for status, _ in results}, {200})
+        self.assertEqual(running['peak'], 2)
+
+    async def test_streaming_reads_database(self):
+        """Test streamed chunks may query the database"""
+        status, body = await self._get(self._application(), '/stream/')
+
+        self.assertEqual((status, body), (200, b'users:0'))
+
+    async def test_response_closed_when_stream_fails(self):
+        """Test a response failing while streamed is still closed"""
+        finished = []
+
+        def on_finished(**kwargs):
+            finished.append(kwargs)
+
+        request_finished.connect(on_finished)
+        self.addCleanup(request_finished.disconnect, on_finished)
+        communicator = await self._request(
+            self._application(), '/broken-stream/'
+        )
+        await communicator.receive_output(10)
+        await communicator.receive_output(10)
+
+        with self.assertRaises(RuntimeError):
+            await communicator.wait(10)
+        self.assertEqual(len(finished), 1)
@@ -0,0 +1,47 @@
+"""
+Tests for the in-process caches
+"""
+
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.cache import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+    """Test the LRU cache"""
+
+    def test_get_and_set(self):
+        """Test a stored value is returned until deleted"""
+        cache = LRUCache()
+        cache.set('a', 1)
+
+        self.assertEqual(cache.get('a'), 1)
+        cache.delete('a')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('a', 'default'), 'default')
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently used key is evicted when full"""
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    @patch('core.cache.time.monotonic')
+    def test_entries_expire(self, patched_monotonic):
+        """Test entries expire after the TTL"""
+        patched_monotonic.return_value = 100
+        cache = LRUCache(ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2, timeout=30)
+
+        patched_monotonic.return_value = 111
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 2)
@@ -6,11 +6,20 @@ argument -- description
 Return: return_description
 """
 
+import io
+import json
+import tempfile
+from decimal import Decimal
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2Error
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from core.benchmark import percentile
+from core.models import Recipe, Tag
 
 @patch('core.management.commands.wait_for_db.Command.check')
 class CommandTest(SimpleTestCase):
@@ -35,3 +44,70 @@ class CommandTest(SimpleTestCase):
 
 
 
+
+
+class BenchmarkApiCommandTest(TestCase):
+    """Test the API benchmark suite"""
+
+    def test_writes_results_as_json(self):
+        """Test each endpoint reports latency, queries and bytes"""
+        with tempfile.NamedTemporaryFile('r', suffix='.json') as output:
+            call_command(
+                'benchmark_api',
+                recipes=5,
+                requests=2,
+                endpoints='recipe-list,recipe-detail,user-me',
+                output=output.name,
+                stdout=io.StringIO(),
+            )
+            results = json.load(output)
+
+        self.assertEqual(
+            list(results['endpoints']),
+            ['recipe-list', 'recipe-detail', 'user-me'],
+        )
+        detail = results['endpoints']['recipe-detail']
+        self.assertEqual(detail['status'], [200])
+        self.assertGreater(detail['queries'], 0)
+        self.assertGreater(detail['bytes'], 0)
+        self.assertLessEqual(detail['p50_ms'], detail['p95_ms'])
+
+    def test_unknown_endpoint(self):
+        """Test a misspelled endpoint is reported before seeding"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', endpoints='recipe-lst')
+
+    def test_percentile(self):
+        """Test percentiles use the nearest rank"""
+        values = list(range(1, 21))
+
+        self.assertEqual(percentile(values, 50), 10)
+        self.assertEqual(percentile(values, 95), 19)
+        self.assertEqual(percentile([3], 95), 3)
+
+
+class RebuildRecipeCountsCommandTest(TestCase):
+    """Test rebuilding the recipe counts of tags and ingredients"""
+
+    def test_fixes_drifted_counts(self):
+        """Test counters are recomputed from the recipe links"""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        recipe = Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price=Decimal('1')
+        )
+        tag = Tag.objects.create(user=user, name='Vegan')
+        unused = Tag.objects.create(user=user, name='Quick')
+        # Links inserted without signals, as by raw SQL.
+        Recipe.tags.through.objects.create(recipe=recipe, tag=tag)
+        Tag.objects.filter(pk=unused.pk).update(recipe_count=4)
+        out = io.StringIO()
+
+        call_command('rebuild_recipe_counts', stdout=out)
+
+        tag.refresh_from_db()
+        unused.refresh_from_db()
+        self.assertEqual((tag.recipe_count, unused.recipe_count), (1, 0))
+        self.assertIn('Fixed 2 tags.', out.getvalue())
+        self.assertIn('Fixed 0 ingredients.', out.getvalue())
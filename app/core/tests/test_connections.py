@@ -0,0 +1,43 @@
+"""
+Tests for the health checks of persistent database connections
+"""
+
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+
+from core.signals import check_persistent_connections
+
+
+class ConnectionHealthCheckTests(TestCase):
+    """Test kept connections are checked when a request starts"""
+
+    def _start_request(self, usable, checks=True):
+        with patch.dict(connection.settings_dict,
+                        CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=checks), \
+                patch.object(connection, 'is_usable',
+                             return_value=usable) as is_usable, \
+                patch.object(connection, 'close') as close:
+            check_persistent_connections(sender=self.__class__)
+        return is_usable, close
+
+    def test_broken_connection_closed(self):
+        """Test a connection failing its check is closed"""
+        _, close = self._start_request(usable=False)
+
+        close.assert_called_once_with()
+
+    def test_working_connection_kept(self):
+        """Test a connection passing its check is kept"""
+        is_usable, close = self._start_request(usable=True)
+
+        is_usable.assert_called_once_with()
+        close.assert_not_called()
+
+    def test_checks_disabled(self):
+        """Test connections are not checked with health checks off"""
+        is_usable, close = self._start_request(usable=False, checks=False)
+
+        is_usable.assert_not_called()
+        close.assert_not_called()
@@ -0,0 +1,49 @@
+"""
+Tests for the pooled password hashers
+"""
+
+from django.contrib.auth.hashers import (
+    check_password,
+    get_hasher,
+    make_password,
+)
+from django.test import SimpleTestCase, override_settings
+
+from core import hashers
+
+
+@override_settings(SCRYPT_WORK_FACTOR=2 ** 10)
+class ScryptPasswordHasherTests(SimpleTestCase):
+    """Test the scrypt hasher"""
+
+    def test_new_passwords_use_scrypt(self):
+        """Test scrypt is the default hasher"""
+        encoded = make_password('secret')
+
+        self.assertTrue(encoded.startswith('scrypt$1024$'))
+        self.assertTrue(check_password('secret', encoded))
+        self.assertFalse(check_password('wrong', encoded))
+
+    def test_must_update_when_parameters_change(self):
+        """Test hashes with other parameters are rehashed"""
+        encoded = make_password('secret')
+        hasher = get_hasher('scrypt')
+
+        self.assertFalse(hasher.must_update(encoded))
+        with override_settings(SCRYPT_WORK_FACTOR=2 ** 11):
+            self.assertTrue(hasher.must_update(encoded))
+            # Old hashes still verify with their own parameters.
+            self.assertTrue(check_password('secret', encoded))
+
+    @override_settings(HASHING_WORKERS=1, HASHING_QUEUE=0)
+    def test_nested_hashing_does_not_wait_for_pool(self):
+        """Test verify encoding again on a single thread pool completes"""
+        encoded = make_password('secret', hasher='pbkdf2_sha256')
+
+        self.assertTrue(check_password('secret', encoded))
+
+    @override_settings(HASHING_WORKERS=0)
+    def test_hashing_inline_without_pool(self):
+        """Test a pool of 0 threads hashes in the calling thread"""
+        self.assertTrue(check_password('secret', make_password('secret')))
+        self.assertIsNone(hashers._pool)
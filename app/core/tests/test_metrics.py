@@ -0,0 +1,236 @@
+"""
+Tests for the request metrics
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+METRICS_URL = reverse('metrics')
+
+
+class HistogramTests(SimpleTestCase):
+    """Test the histogram store"""
+
+    def test_cumulative_buckets(self):
+        """Test bucket counts include every smaller bucket"""
+        histogram = metrics.Histogram((1, 5))
+        for value in (0.5, 1, 3, 7):
+            histogram.observe(value)
+
+        self.assertEqual(
+            list(histogram.cumulative()), [(1, 2), (5, 3), ('+Inf', 4)]
+        )
+        self.assertEqual(histogram.sum, 11.5)
+
+    def test_render_prometheus_text(self):
+        """Test histograms render as Prometheus buckets, sum and count"""
+        registry = metrics.MetricsRegistry()
+        registry.count('View.list', 200)
+        registry.observe('View.list', {'request_db_queries': 3})
+
+        text = registry.render()
+
+        self.assertIn('# TYPE app_request_db_queries histogram', text)
+        self.assertRegex(
+            text,
+            r'app_request_db_queries_bucket\{worker="\d+",view="View.list",'
+            r'le="3"\} 1',
+        )
+        self.assertIn('view="View.list",le="+Inf"} 1', text)
+        self.assertRegex(
+            text, r'app_requests_total\{worker="\d+",view="View.list",'
+            r'status="200"\} 1',
+        )
+
+    def test_render_counters_read_on_scrape(self):
+        """Test counters kept elsewhere are read when rendering"""
+        registry = metrics.MetricsRegistry()
+        counts = {'hit': 1}
+        registry.add_counter('lookups_total', 'Lookups.', 'outcome',
+                             lambda: counts)
+        counts['hit'] = 4
+
+        text = registry.render()
+
+        self.assertIn('# TYPE app_lookups_total counter', text)
+        self.assertRegex(
+            text, r'app_lookups_total\{worker="\d+",outcome="hit"\} 4'
+        )
+
+    def test_nested_timers_count_once(self):
+        """Test a phase nested in itself is only timed by the outer block"""
+        sample, token = metrics.start_sample()
+        try:
+            with metrics.timed('serialize'):
+                with metrics.timed('serialize'):
+                    pass
+        finally:
+            metrics.end_sample(token)
+
+        self.assertEqual(list(sample.phases), ['serialize'])
+        self.assertIsNone(metrics.current_sample())
+
+
+class MetricsMiddlewareTests(TestCase):
+    """Test requests are recorded per view"""
+
+    def setUp(self):
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client = APIClient()
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_sampled_request_records_phases(self):
+        """Test a sampled list records time, queries, serializer and size"""
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=Decimal('1')
+        )
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        view = 'RecipeViewSet.list'
+        self.assertEqual(metrics.registry.requests(view, 200), 1)
+        queries = metrics.registry.get('request_db_queries', view)
+        self.assertEqual(queries.count, 1)
+        self.assertGreater(queries.sum, 0)
+        serialize = metrics.registry.get(
+            'request_serialize_duration_seconds', view
+        )
+        self.assertGreater(serialize.sum, 0)
+        size = metrics.registry.get('response_size_bytes', view)
+        self.assertEqual(size.sum, len(res.content))
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_api_view_named_after_method(self):
+        """Test plain API views are named by class and method"""
+        self.client.post(TOKEN_URL, {'email': 'user@example.com'})
+
+        self.assertEqual(
+            metrics.registry.requests('CreateTokenView.post', 400), 1
+        )
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_request_only_counted(self):
+        """Test requests outside the sample are counted but not timed"""
+        self.client.force_authenticate(self.user)
+
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            metrics.registry.requests('RecipeViewSet.list', 200), 1
+        )
+        self.assertIsNone(metrics.registry.get(
+            'request_duration_seconds', 'RecipeViewSet.list'
+        ))
+
+
+class MetricsViewTests(TestCase):
+    """Test the Prometheus endpoint"""
+
+    def test_metrics_served_as_text(self):
+        """Test the endpoint returns the Prometheus text format"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'# TYPE app_requests_total counter', res.content)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_limited_to_allowed_addresses(self):
+        """Test other addresses are refused"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 403)
+
+    def test_response_cache_outcomes_served(self):
+        """Test the recipe response cache hits and misses are published"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertRegex(
+            res.content.decode(),
+            r'app_response_cache_requests_total\{worker="\d+",'
+            r'outcome="miss"\} \d+',
+        )
+
+
+class SharedMetricsTests(TestCase):
+    """Test scrapes render every worker sharing METRICS_DIR"""
+
+    def setUp(self):
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(
+            METRICS_DIR=self.directory, METRICS_SHARE_SECONDS=0
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _write_snapshot(self, worker):
+        snapshot = {
+            'worker': str(worker),
+            'requests': [['View.list', 200, 5]],
+            'histograms': [['request_db_queries', 'View.list',
+                            [0, 0, 0, 2] + [0] * 9, 6, 2]],
+            'counters': {},
+        }
+        path = os.path.join(self.directory, f'{worker}.json')
+        with open(path, 'w') as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+        return path
+
+    def test_requests_share_snapshot(self):
+        """Test a request writes the snapshot of its worker"""
+        self.client.get(RECIPES_URL)
+
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with open(path) as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        self.assertEqual(snapshot['worker'], str(os.getpid()))
+        self.assertIn(
+            ['RecipeViewSet.list', 401, 1], snapshot['requests']
+        )
+
+    def test_scrape_renders_live_workers(self):
+        """Test a scrape shows other live workers and drops exited ones"""
+        other = os.getppid()
+        self._write_snapshot(other)
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        exited_path = self._write_snapshot(exited.pid)
+
+        text = self.client.get(METRICS_URL).content.decode()
+
+        self.assertIn(
+            f'app_requests_total{{worker="{other}",view="View.list",'
+            f'status="200"}} 5',
+            text,
+        )
+        self.assertIn(
+            f'app_request_db_queries_bucket{{worker="{other}",'
+            f'view="View.list",le="3"}} 2',
+            text,
+        )
+        self.assertNotIn(f'worker="{exited.pid}"', text)
+        self.assertFalse(os.path.exists(exited_path))
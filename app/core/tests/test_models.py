@@ -1,9 +1,12 @@
 """
 Tests for Models Creating
 """
+import hashlib
 from decimal import Decimal
 
 from unittest.mock import patch
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from core import models
@@ -94,6 +97,17 @@ class ModelTest(TestCase):
         self.assertEqual(str(ingredient), ingredient.name)
 
 
+    def test_tag_name_unique_per_user(self):
+        """Testing a user cannot have two tags with the same name"""
+        user = create_user()
+        other = create_user('other@example.com', 'test123')
+        models.Tag.objects.create(user = user, name = 'Vegan')
+        models.Tag.objects.create(user = other, name = 'Vegan')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user = user, name = 'Vegan')
+
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """testing generating image path."""
@@ -102,3 +116,16 @@ class ModelTest(TestCase):
         file_path = models.recipe_image_file_path(None, 'example.jpg')
 
         self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
+
+    def test_recipe_file_name_content_hash(self):
+        """testing identical images get the same hashed path."""
+        first = models.Recipe(image=SimpleUploadedFile('a.JPG', b'photo'))
+        second = models.Recipe(image=SimpleUploadedFile('b.jpg', b'photo'))
+        digest = hashlib.sha256(b'photo').hexdigest()
+
+        path = models.recipe_image_file_path(first, 'a.JPG')
+
+        self.assertEqual(
+            path, f'uploads/recipe/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        self.assertEqual(path, models.recipe_image_file_path(second, 'b.jpg'))
@@ -0,0 +1,58 @@
+"""
+Tests for the read replica router
+"""
+
+from unittest.mock import patch
+
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from core.models import Recipe
+from core.routers import (
+    ReplicaRouter, is_pinned, pin_to_primary, replica_reads
+)
+
+
+@override_settings(REPLICA_DATABASES=['replica_0'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test reads only go to replicas when enabled"""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_primary_by_default(self):
+        """Test reads outside replica_reads use the primary"""
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_replica_reads(self):
+        """Test reads inside replica_reads use a replica"""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica_0')
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas(self):
+        """Test reads use the primary when no replica is configured"""
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_transaction_reads_primary(self):
+        """Test reads inside a transaction use the primary"""
+        with replica_reads(), patch.object(
+            connections['default'], 'in_atomic_block', True
+        ):
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_no_migrations_on_replicas(self):
+        """Test migrations only run on the primary"""
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'core'))
+
+    @override_settings(REPLICA_PIN_SECONDS=5)
+    def test_pin_to_primary(self):
+        """Test pinning a user"""
+        self.assertFalse(is_pinned('pinned-user'))
+
+        pin_to_primary('pinned-user')
+
+        self.assertTrue(is_pinned('pinned-user'))
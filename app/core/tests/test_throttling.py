@@ -0,0 +1,176 @@
+"""
+Tests for the sliding window throttles
+"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.checks import check_throttle_cache
+from core.models import Recipe
+from core.throttling import UserRateThrottle
+
+
+TOKEN_URL = reverse('user:token')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def rates(**overrides):
+    """Return settings overriding some throttle rates."""
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+            **overrides,
+        },
+    })
+
+
+class ThrottleTestCase(TestCase):
+    """Start every test with empty throttle counters"""
+
+    def setUp(self):
+        self.addCleanup(caches[settings.THROTTLE_CACHE_ALIAS].clear)
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+
+
+@rates(recipe_user='3/min')
+class SlidingWindowTests(ThrottleTestCase):
+    """Test the sliding window counter"""
+
+    def _allow(self, throttle, now):
+        request = type('Request', (), {'user': self.user})()
+        view = type('View', (), {'throttle_scope': 'recipe'})()
+        with patch.object(throttle, 'timer', return_value=now):
+            return throttle.allow_request(request, view)
+
+    def test_previous_window_weighted_by_overlap(self):
+        """Test the previous window counts by the share still covered"""
+        throttle = UserRateThrottle()
+        start = 600.0
+
+        self.assertEqual(
+            [self._allow(throttle, start + i) for i in range(4)],
+            [True, True, True, False],
+        )
+        # Half way into the next window: 4 * 0.5 + 1 requests, then the
+        # previous window must fade by one more request, a quarter of it.
+        self.assertTrue(self._allow(throttle, start + 90))
+        self.assertFalse(self._allow(throttle, start + 90))
+        self.assertAlmostEqual(throttle.wait(), 15)
+
+    def test_keeps_two_counters_per_client(self):
+        """Test memory stays fixed however many requests are made"""
+        throttle = UserRateThrottle()
+        for i in range(40):
+            self._allow(throttle, 600.0 + i * 3)
+
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        key = f'throttle:recipe_user:{self.user.pk}'
+        keys = [f'{key}:{window}' for window in (10, 11)]
+        self.assertEqual(cache.get_many(keys), {keys[0]: 20, keys[1]: 20})
+
+
+class LoginThrottleTests(ThrottleTestCase):
+    """Test the token endpoint is throttled per email and address"""
+
+    def _login(self, email='user@example.com', address='10.0.0.1'):
+        return APIClient().post(
+            TOKEN_URL,
+            {'email': email, 'password': 'wrong'},
+            REMOTE_ADDR=address,
+        )
+
+    @rates(login_email='2/min')
+    def test_throttled_per_email(self):
+        """Test an email is locked out whatever address tries it"""
+        self._login(address='10.0.0.1')
+        self._login(address='10.0.0.2')
+
+        res = self._login(address='10.0.0.3')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        other = self._login(email='other@example.com', address='10.0.0.3')
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @rates(login_ip='2/min')
+    def test_throttled_per_address(self):
+        """Test an address is locked out whatever emails it tries"""
+        self._login(email='a@example.com')
+        self._login(email='b@example.com')
+
+        res = self._login(email='c@example.com')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        other = self._login(email='c@example.com', address='10.0.0.2')
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @rates(login_ip='2/min')
+    def test_forwarded_for_ignored(self):
+        """Test a client cannot pick its address with X-Forwarded-For"""
+        for index in range(3):
+            res = APIClient().post(
+                TOKEN_URL,
+                {'email': f'{index}@example.com', 'password': 'wrong'},
+                REMOTE_ADDR='10.0.0.1',
+                HTTP_X_FORWARDED_FOR=f'192.168.0.{index}',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+@rates(recipe_user='2/min')
+class RecipeThrottleTests(ThrottleTestCase):
+    """Test the recipe API is throttled per user"""
+
+    def test_throttled_per_user(self):
+        """Test one user's requests do not use up another's"""
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=Decimal('1')
+        )
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get(RECIPES_URL)
+        client.get(RECIPES_URL)
+
+        res = client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(
+            'other@example.com', 'testpass123'
+        ))
+        self.assertEqual(
+            other.get(RECIPES_URL).status_code, status.HTTP_200_OK
+        )
+
+
+class ThrottleCacheCheckTests(SimpleTestCase):
+    """Test the throttle cache must count atomically"""
+
+    def test_atomic_backend_accepted(self):
+        """Test a Memcached throttle cache passes"""
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        }}):
+            self.assertEqual(check_throttle_cache(None), [])
+
+    def test_file_backend_refused(self):
+        """Test a file based throttle cache is an error"""
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/tmp/cache',
+        }}):
+            errors = check_throttle_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
@@ -0,0 +1,137 @@
+"""
+Sliding window rate throttles
+
+DRF's throttles store the time of every request in the cache, so their
+memory grows with the rate. These keep two counters per client instead,
+for the current and the previous fixed window, and weight the previous
+one by how much of it the sliding window still covers. Counters are
+raised with ``incr`` of the cache named by THROTTLE_CACHE_ALIAS, which
+must be shared by the workers and atomic (Memcached, or a Redis backend)
+for limits to hold across them; core.checks refuses other backends.
+
+Clients are identified by REMOTE_ADDR as set by the server, never by a
+header of the request. The proxy passes its own ``$remote_addr`` and
+uvicorn only takes X-Forwarded-For from FORWARDED_ALLOW_IPS.
+
+Rejected requests are counted too, so a client that keeps hammering
+stays throttled until it slows down.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """Limit requests per client with a sliding window counter."""
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    @property
+    def THROTTLE_RATES(self):
+        return api_settings.DEFAULT_THROTTLE_RATES
+
+    def get_ident(self, request):
+        # DRF's get_ident trusts X-Forwarded-For unless NUM_PROXIES is set.
+        return request.META.get('REMOTE_ADDR')
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        window, offset = divmod(self.timer(), self.duration)
+        window = int(window)
+        current = self._incr(f'{self.key}:{window}')
+        previous = self.cache.get(f'{self.key}:{window - 1}', 0)
+        self.weight = 1 - offset / self.duration
+        self.counts = (previous, current)
+        return previous * self.weight + current <= self.num_requests
+
+    def _incr(self, key):
+        """Add one to a window counter, creating it if needed."""
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Kept until the window stops being the previous one.
+            if self.cache.add(key, 1, 2 * self.duration):
+                return 1
+            return self.cache.incr(key)
+
+    def wait(self):
+        """Return the seconds until the window has room again."""
+        previous, current = self.counts
+        remaining = self.weight * self.duration
+        if current > self.num_requests or not previous:
+            return remaining
+        # The previous window fades out linearly over the current one.
+        excess = previous * self.weight + current - self.num_requests
+        return min(remaining, excess / previous * self.duration)
+
+
+class ScopedSlidingWindowThrottle(SlidingWindowRateThrottle):
+    """Take the scope from the view's ``throttle_scope`` and a suffix.
+
+    A view with ``throttle_scope = 'login'`` is limited by the
+    ``login_ip`` rate with ``IPRateThrottle``.
+    """
+    suffix = None
+
+    def __init__(self):
+        # The rate depends on the view, see allow_request.
+        pass
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        self.scope = f'{scope}_{self.suffix}'
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+
+class IPRateThrottle(ScopedSlidingWindowThrottle):
+    """Limit requests per client address."""
+    suffix = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class EmailRateThrottle(ScopedSlidingWindowThrottle):
+    """Limit requests per email address posted, whatever the client."""
+    suffix = 'email'
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        # Hashed to keep cache keys short and free of odd characters.
+        ident = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class UserRateThrottle(ScopedSlidingWindowThrottle):
+    """Limit requests per authenticated user, or per address if anonymous."""
+    suffix = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -0,0 +1,29 @@
+"""
+Views of the core app
+"""
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from core import metrics
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@require_GET
+def metrics_view(request):
+    """Expose the metrics of the workers to Prometheus.
+
+    Only this worker's without METRICS_DIR, see core.metrics.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    snapshots = None
+    if settings.METRICS_DIR:
+        snapshots = metrics.shared_snapshots(settings.METRICS_DIR)
+    return HttpResponse(
+        metrics.registry.render(snapshots),
+        content_type=PROMETHEUS_CONTENT_TYPE,
+    )
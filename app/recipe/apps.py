@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class RecipeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe'
+
+    def ready(self):
+        from core.metrics import registry
+        from recipe import signals  # noqa: F401
+        from recipe.cache import cache_outcomes
+
+        registry.add_counter(
+            'response_cache_requests_total',
+            'Response cache lookups of the recipe lists by outcome.',
+            'outcome',
+            cache_outcomes,
+        )
@@ -0,0 +1,105 @@
+"""
+Bulk import and export of recipes.
+"""
+
+import csv
+import io
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+from .cache import invalidate_user
+from .rows import chunked, iter_recipe_rows
+from .serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+IMPORT_CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+CSV_LIST_SEPARATOR = ';'
+
+
+def _validate(data, context):
+    """Return (validated_data, errors) for one imported recipe."""
+    if isinstance(data, ParseError):
+        return None, {'non_field_errors': [str(data.detail)]}
+    if not isinstance(data, dict):
+        return None, {'non_field_errors': ['Expected a JSON object.']}
+
+    serializer = RecipeSerializer(data=data, context=context)
+    if not serializer.is_valid():
+        return None, serializer.errors
+    return serializer.validated_data, None
+
+
+def import_recipes(rows, context, chunk_size=None):
+    """Validate and create recipes from ``(line_number, data)`` pairs.
+
+    Rows are consumed lazily in chunks of ``chunk_size`` (default
+    ``IMPORT_CHUNK_SIZE``); each chunk is inserted in its own transaction
+    so a large import never holds one long transaction or the whole
+    upload in memory. Invalid rows are skipped and reported with their
+    line number.
+    """
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    user = context['request'].user
+    list_serializer = RecipeSerializer(many=True, context=context)
+    result = {'created': 0, 'failed': 0, 'errors': []}
+
+    for chunk in chunked(rows, chunk_size):
+        valid = []
+        for line_number, data in chunk:
+            validated_data, errors = _validate(data, context)
+            if errors is None:
+                valid.append({**validated_data, 'user': user})
+                continue
+            result['failed'] += 1
+            if len(result['errors']) < MAX_REPORTED_ERRORS:
+                result['errors'].append({'line': line_number, 'errors': errors})
+
+        if valid:
+            list_serializer.create(valid)
+            invalidate_user(user.pk)
+            result['created'] += len(valid)
+
+    return result
+
+
+def export_recipe_rows(queryset, request=None, chunk_size=None):
+    """Yield recipes as dicts shaped like RecipeDetailSerializer output.
+
+    Tags and ingredients are fetched with one query per relation and
+    chunk of ``chunk_size`` recipes (default ``EXPORT_CHUNK_SIZE``).
+    """
+    return iter_recipe_rows(
+        queryset,
+        RecipeDetailSerializer.Meta.fields,
+        request,
+        chunk_size or EXPORT_CHUNK_SIZE,
+    )
+
+
+def iter_ndjson(rows):
+    """Encode rows as NDJSON lines."""
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder) + '\n'
+
+
+def iter_csv(rows):
+    """Encode rows as CSV, joining tag and ingredient names."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    fields = RecipeDetailSerializer.Meta.fields
+    writer.writerow(fields)
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        for field in ('tags', 'ingredients'):
+            row[field] = CSV_LIST_SEPARATOR.join(
+                item['name'] for item in row[field]
+            )
+        row['image_derivatives'] = json.dumps(row['image_derivatives'])
+        writer.writerow([row[field] for field in fields])
+        yield buffer.getvalue()
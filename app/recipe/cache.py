@@ -0,0 +1,144 @@
+"""
+Response cache for the recipe list endpoints.
+
+Cached responses are keyed by a per-user version number. Any change to
+one of the user's recipes, tags or ingredients bumps the version, which
+makes every cached response of that user unreachable at once.
+"""
+
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+
+CACHED_PARAMS = (
+    'tags', 'ingredients', 'match', 'assigned_only', 'page_size', 'cursor',
+    'search', 'search_mode', 'ids', 'fields', 'expand',
+)
+ID_LIST_PARAMS = ('tags', 'ingredients', 'ids')
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the Django cache holding the responses."""
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'recipe-cache-version:{user_id}'
+
+
+def _new_version():
+    """Return a version that cannot collide with one evicted earlier."""
+    return time.time_ns()
+
+
+def get_user_version(user_id):
+    """Return the current cache version of a user."""
+    cache = get_response_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), _new_version(), None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def _bump(user_id):
+    cache = get_response_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _new_version(), None)
+
+
+def invalidate_user(user_id):
+    """Invalidate every cached response of a user.
+
+    The version is bumped right away and again on commit, so a response
+    computed from data read before the commit cannot stay cached.
+    """
+    _bump(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(user_id))
+
+
+def _normalize(name, value):
+    """Normalize a query param so equivalent requests share a key."""
+    if name in ID_LIST_PARAMS:
+        try:
+            ids = sorted({int(v) for v in value.split(',')})
+        except ValueError:
+            return value
+        return ','.join(str(i) for i in ids)
+    return value
+
+
+def response_cache_key(view, request):
+    """Build the cache key of a list request."""
+    params = sorted(
+        (name, _normalize(name, request.query_params[name]))
+        for name in CACHED_PARAMS if name in request.query_params
+    )
+    digest = hashlib.sha1(
+        repr((request.get_host(), params)).encode('utf-8')
+    ).hexdigest()
+    return ':'.join([
+        'recipe-response',
+        str(request.user.pk),
+        str(get_user_version(request.user.pk)),
+        view.basename,
+        view.action,
+        digest,
+    ])
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cache_stats():
+    """Return the hit and miss counts of this process."""
+    with _stats_lock:
+        return {'hits': _stats['hit'], 'misses': _stats['miss']}
+
+
+def cache_outcomes():
+    """Return the lookups of this process by outcome, for /metrics."""
+    stats = cache_stats()
+    return {'hit': stats['hits'], 'miss': stats['misses']}
+
+
+def cache_response(view_func):
+    """Cache successful responses of a viewset list method."""
+    @wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_TIMEOUT:
+            return view_func(self, request, *args, **kwargs)
+
+        cache = get_response_cache()
+        key = response_cache_key(self, request)
+        data = cache.get(key)
+        if data is not None:
+            _record('hit')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _record('miss')
+        response = view_func(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
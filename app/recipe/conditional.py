@@ -0,0 +1,167 @@
+"""
+Conditional requests (ETag, If-None-Match, If-Match) for the recipe API.
+
+Recipe ETags are derived from the ``updated_at`` markers of the recipe
+and of its tags and ingredients, so they can be checked with a single
+query before any serializer runs. They read
+``<version>.<representation>``: If-None-Match compares both, If-Match
+only the stored version, so an ETag read with ``?fields=`` still guards
+a write. List ETags reuse the per-user version of the response cache and
+need no query at all.
+"""
+
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+
+from core.models import Recipe
+from .cache import response_cache_key
+
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def _hash(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def _is_pk(pk):
+    """Return whether a URL pk can be a recipe id.
+
+    ASCII digits only: ``str.isdigit`` also accepts digits such as '²',
+    which the database lookup then rejects with a ValueError.
+    """
+    return re.fullmatch(r'[0-9]+', str(pk)) is not None
+
+
+def _relation_marker(field):
+    """Subqueries giving the link count and newest change of a relation."""
+    through = getattr(Recipe, field).through
+    target = getattr(Recipe, field).field.m2m_reverse_field_name()
+    links = through.objects.filter(recipe_id=OuterRef('pk')).order_by()
+    count = links.values('recipe_id').annotate(n=Count('pk')).values('n')
+    last = links.values('recipe_id').annotate(
+        last=Max(f'{target}__updated_at')
+    ).values('last')
+    return Coalesce(Subquery(count), 0), Subquery(last)
+
+
+def recipe_etag(view, request, pk=None, **kwargs):
+    """Return the ETag of one recipe, or None if it does not exist."""
+    if not _is_pk(pk):
+        return None
+    tag_count, tag_last = _relation_marker('tags')
+    ingredient_count, ingredient_last = _relation_marker('ingredients')
+    marker = Recipe.objects.filter(pk=pk, user=request.user).annotate(
+        tag_count=tag_count,
+        tag_last=tag_last,
+        ingredient_count=ingredient_count,
+        ingredient_last=ingredient_last,
+    ).values_list(
+        'updated_at',
+        'tag_count',
+        'tag_last',
+        'ingredient_count',
+        'ingredient_last',
+    ).first()
+    if marker is None:
+        return None
+    version = _hash('recipe', pk, marker)
+    representation = _hash(
+        request.accepted_renderer.format,
+        # Sparse fieldsets change the representation.
+        request.query_params.get('fields'),
+        request.query_params.get('expand'),
+    )
+    return f'{version}.{representation}'
+
+
+def lock_recipe(view, request, pk=None, **kwargs):
+    """Lock the row of a recipe until the transaction ends."""
+    if _is_pk(pk):
+        list(Recipe.objects.select_for_update().filter(
+            pk=pk, user=request.user
+        ).values_list('pk', flat=True))
+
+
+def recipe_list_etag(view, request, **kwargs):
+    """Return the ETag of a recipe list without querying the database.
+
+    The response cache key already changes whenever any of the user's
+    recipes, tags or ingredients change, through the per-user version.
+    Lists get no ETag while the response cache is disabled.
+    """
+    if not settings.RESPONSE_CACHE_TIMEOUT:
+        return None
+    return _hash(
+        response_cache_key(view, request), request.accepted_renderer.format
+    )
+
+
+def _if_match_etag(request, etag):
+    """Return the ETag an unsafe request is checked against.
+
+    That is the If-Match ETag naming the same stored version as etag,
+    whatever representation it was read with, or else etag itself.
+    """
+    version = etag.partition('.')[0]
+    for candidate in parse_etags(request.META.get('HTTP_IF_MATCH', '')):
+        if candidate.startswith('"') and (
+            candidate[1:-1].partition('.')[0] == version
+        ):
+            return candidate
+    return quote_etag(etag)
+
+
+def conditional(etag_func, lock=None):
+    """Answer conditional requests of a viewset method using etag_func.
+
+    Safe requests matching ``If-None-Match`` get a 304 without running
+    the view; unsafe requests failing ``If-Match`` get a 412. With
+    ``lock``, unsafe requests sending ``If-Match`` check it and write in
+    one transaction holding the lock, so two clients sending the same
+    ETag cannot both succeed.
+    """
+    def decorator(view_func):
+        def respond(self, request, *args, **kwargs):
+            etag = etag_func(self, request, *args, **kwargs)
+            if etag is not None:
+                if request.method in SAFE_METHODS:
+                    etag = quote_etag(etag)
+                else:
+                    etag = _if_match_etag(request, etag)
+                response = get_conditional_response(request, etag=etag)
+                if response is not None:
+                    return response
+
+            response = view_func(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            if request.method not in SAFE_METHODS:
+                etag = etag_func(self, request, *args, **kwargs)
+                etag = quote_etag(etag) if etag is not None else None
+            if etag is not None:
+                response['ETag'] = etag
+            return response
+
+        @wraps(view_func)
+        def wrapper(self, request, *args, **kwargs):
+            if (
+                lock is None
+                or request.method in SAFE_METHODS
+                or 'HTTP_IF_MATCH' not in request.META
+            ):
+                return respond(self, request, *args, **kwargs)
+            with transaction.atomic():
+                lock(self, request, *args, **kwargs)
+                return respond(self, request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,104 @@
+"""
+Denormalized recipe counts of tags and ingredients.
+
+``recipe_count`` is adjusted with relative updates whenever recipe links
+are added or removed, so concurrent changes do not overwrite each other.
+The signal handlers in recipe.signals cover the related managers and
+recipe deletion; bulk inserts call ``count_links`` themselves.
+``rebuild_recipe_counts`` recomputes the counters from the links.
+"""
+
+from collections import Counter, defaultdict
+
+from django.db.models import (
+    Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from core.models import Recipe, Tag, Ingredient
+
+
+COUNTED_MODELS = (Tag, Ingredient)
+
+
+def _column(model):
+    """Return the through table column pointing at a tag or ingredient."""
+    return model.recipes.field.m2m_reverse_name()
+
+
+def add_recipe_counts(model, counts):
+    """Add ``{pk: delta}`` to the recipe counts of a model in one update.
+
+    Counters never go below zero, even if they drifted from the links.
+    """
+    by_delta = defaultdict(list)
+    for pk, delta in counts.items():
+        if delta:
+            by_delta[delta].append(pk)
+    if not by_delta:
+        return
+    delta = Case(
+        *(When(pk__in=pks, then=Value(delta))
+          for delta, pks in by_delta.items()),
+        output_field=IntegerField(),
+    )
+    model.objects.filter(
+        pk__in=[pk for pks in by_delta.values() for pk in pks]
+    ).update(recipe_count=Greatest(F('recipe_count') + delta, 0))
+
+
+def linked_ids(model, recipe_ids=None, obj_ids=None):
+    """Return the ``(recipe_id, obj_id)`` links of a relation.
+
+    Limited to the given recipes and tags or ingredients when passed.
+    """
+    column = _column(model)
+    links = model.recipes.through.objects.all()
+    if recipe_ids is not None:
+        links = links.filter(recipe_id__in=recipe_ids)
+    if obj_ids is not None:
+        links = links.filter(**{f'{column}__in': obj_ids})
+    return list(links.values_list('recipe_id', column))
+
+
+def count_links(model, links, sign=1):
+    """Add the ``(recipe_id, obj_id)`` links to the recipe counts."""
+    add_recipe_counts(model, {
+        obj_id: sign * count
+        for obj_id, count in Counter(obj_id for _, obj_id in links).items()
+    })
+
+
+def _actual_count(model):
+    """Expression counting the recipes linked to a tag or ingredient."""
+    column = _column(model)
+    return Coalesce(Subquery(
+        model.recipes.through.objects.filter(
+            **{column: OuterRef('pk')}
+        ).order_by().values(column).annotate(n=Count('pk')).values('n')
+    ), 0)
+
+
+def stale_recipe_counts(model, queryset=None):
+    """Return the objects whose recipe count differs from their links."""
+    queryset = model.objects.all() if queryset is None else queryset
+    return queryset.annotate(actual=_actual_count(model)).exclude(
+        recipe_count=F('actual')
+    )
+
+
+def rebuild_recipe_counts(model, queryset=None):
+    """Recompute the recipe counts of a model from the links.
+
+    Only counters that drifted are written; returns how many were fixed.
+    """
+    return stale_recipe_counts(model, queryset).update(
+        recipe_count=_actual_count(model)
+    )
+
+
+def counted_model(sender):
+    """Return the tag or ingredient model of a recipe through table."""
+    if sender is Recipe.tags.through:
+        return Tag
+    return Ingredient
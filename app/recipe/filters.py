@@ -0,0 +1,71 @@
+"""
+Filters for the recipe APIs.
+"""
+
+import re
+
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MAX_BATCH_IDS = 100
+
+
+def parse_ids(value, param):
+    """Return the IDs of a comma separated query parameter.
+
+    Anything but ASCII digits is rejected as a bad request on ``param``;
+    ``str.isdigit`` would let digits such as '²' through to ``int``.
+    """
+    ids = value.split(',')
+    if not all(re.fullmatch(r'[0-9]+', obj_id.strip()) for obj_id in ids):
+        raise ValidationError({param: 'Must be comma separated IDs.'})
+    return [int(obj_id) for obj_id in ids]
+
+
+def filter_by_related(queryset, field, ids, match=MATCH_ANY):
+    """Filter recipes linked to the given tag or ingredient IDs.
+
+    Each condition is a correlated EXISTS on the M2M through table, so
+    recipes are never duplicated by a join and no DISTINCT is needed.
+    ``field`` is the M2M field name on Recipe, e.g. ``'tags'``, and
+    names the query parameter in errors. At most MAX_BATCH_IDS IDs are
+    taken, as "all" adds one EXISTS per ID.
+    """
+    if match not in (MATCH_ANY, MATCH_ALL):
+        raise ValidationError({'match': f'Must be "{MATCH_ANY}" or "{MATCH_ALL}".'})
+    if len(set(ids)) > MAX_BATCH_IDS:
+        raise ValidationError(
+            {field: f'At most {MAX_BATCH_IDS} IDs can be filtered on at once.'}
+        )
+
+    through = getattr(Recipe, field).through
+    target = getattr(Recipe, field).field.m2m_reverse_name()
+    links = through.objects.filter(recipe_id=OuterRef('pk'))
+
+    if match == MATCH_ANY:
+        return queryset.filter(
+            Exists(links.filter(**{f'{target}__in': ids}))
+        )
+
+    for obj_id in set(ids):
+        queryset = queryset.filter(Exists(links.filter(**{target: obj_id})))
+    return queryset
+
+
+def filter_by_ids(queryset, value):
+    """Filter recipes by a comma separated list of IDs, for batch reads.
+
+    IDs that do not exist or belong to another user are simply missing
+    from the result.
+    """
+    ids = parse_ids(value, 'ids')
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValidationError(
+            {'ids': f'At most {MAX_BATCH_IDS} IDs can be requested at once.'}
+        )
+    return queryset.filter(pk__in=set(ids))
@@ -0,0 +1,240 @@
+"""
+Resized derivatives of recipe images.
+
+Uploads are stored as-is and answered right away. Thumbnails are rendered
+after the transaction commits, by a pool of worker processes standing in
+for a task queue, and their storage names are saved on the recipe once
+ready. With ``IMAGE_WORKERS = 0`` they are rendered inline instead.
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.storage import ContentAddressedStorage
+
+from .cache import invalidate_user
+
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_SIZES = {'thumbnail': 200, 'medium': 800}
+DERIVATIVE_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+DERIVATIVE_QUALITY = 80
+
+_storage = ContentAddressedStorage()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def image_url(name, request=None):
+    """Return the URL of a stored file the same way DRF's ImageField does."""
+    if not name:
+        return None
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def derivative_urls(derivatives, request=None):
+    """Map the stored derivative names of a recipe to URLs."""
+    return {
+        size: {fmt: image_url(name, request) for fmt, name in formats.items()}
+        for size, formats in derivatives.items()
+    }
+
+
+def derivative_name(image_name, size, fmt):
+    """Return the storage name of one derivative of an image."""
+    root = os.path.splitext(image_name)[0]
+    return f'{root}/{size}.{fmt}'
+
+
+def _encode(image, fmt):
+    """Encode an image in one of DERIVATIVE_FORMATS."""
+    if DERIVATIVE_FORMATS[fmt] == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, DERIVATIVE_FORMATS[fmt], quality=DERIVATIVE_QUALITY)
+    return buffer.getvalue()
+
+
+def render_derivatives(image_name):
+    """Write every derivative of a stored image and return their names.
+
+    Image names are content hashes, so derivatives already stored for
+    the same image are reused, refreshing their modification time. Runs
+    in a worker process and touches only the storage, never the database.
+    """
+    with default_storage.open(image_name) as image_file:
+        image = ImageOps.exif_transpose(Image.open(image_file))
+        image.load()
+
+    derivatives = {}
+    for size, pixels in DERIVATIVE_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((pixels, pixels), Image.LANCZOS)
+        for fmt in DERIVATIVE_FORMATS:
+            name = derivative_name(image_name, size, fmt)
+            if not _storage.touch(name):
+                name = _storage.save(
+                    name, ContentFile(_encode(resized, fmt))
+                )
+            derivatives.setdefault(size, {})[fmt] = name
+    return derivatives
+
+
+def store_derivatives(recipe_id, image_name, derivatives):
+    """Save derivative names unless the recipe image changed meanwhile."""
+    # Imported here so workers can load this module before Django is set up.
+    from core.models import Recipe
+
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image_name)
+    user_id = recipe.values_list('user_id', flat=True).first()
+    if user_id is None:
+        return
+    recipe.update(image_derivatives=derivatives, updated_at=timezone.now())
+    invalidate_user(user_id)
+
+
+def _init_worker():
+    """Set up Django in a freshly spawned worker process."""
+    import django
+    django.setup()
+
+
+def _python_executable():
+    """Return the interpreter to start workers with.
+
+    uWSGI sets ``sys.executable`` to its own binary unless started with
+    ``--py-sys-executable``, so fall back to the one of the environment.
+    """
+    if os.path.basename(sys.executable).startswith('python'):
+        return sys.executable
+    return os.path.join(sys.exec_prefix, 'bin', 'python3')
+
+
+def get_executor():
+    """Return the worker pool of this process, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned rather than forked, as the server may run threads.
+            context = multiprocessing.get_context('spawn')
+            context.set_executable(_python_executable())
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=context,
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def discard_executor(executor):
+    """Drop a broken pool so the next upload starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _on_rendered(recipe_id, image_name, executor, future):
+    """Store the result of a worker, in the pool's result thread."""
+    try:
+        store_derivatives(recipe_id, image_name, future.result())
+    except BrokenProcessPool:
+        logger.exception('Rendering derivatives of %s failed', image_name)
+        discard_executor(executor)
+    except Exception:
+        logger.exception('Rendering derivatives of %s failed', image_name)
+    finally:
+        connection.close()
+
+
+def submit_derivatives(recipe_id, image_name):
+    """Render the derivatives of an image, in the pool when enabled.
+
+    Derivatives of the same image stored for another recipe are reused
+    without rendering. Returns the worker future, or None when nothing
+    was sent to the pool.
+    """
+    from core.models import Recipe
+
+    shared = Recipe.objects.filter(image=image_name).exclude(
+        image_derivatives={}
+    ).values_list('image_derivatives', flat=True).first()
+    if shared:
+        store_derivatives(recipe_id, image_name, shared)
+        return None
+    if not settings.IMAGE_WORKERS:
+        store_derivatives(
+            recipe_id, image_name, render_derivatives(image_name)
+        )
+        return None
+    executor = get_executor()
+    try:
+        future = executor.submit(render_derivatives, image_name)
+    except BrokenProcessPool:
+        # A worker died since the last upload; retry on a fresh pool.
+        discard_executor(executor)
+        executor = get_executor()
+        future = executor.submit(render_derivatives, image_name)
+    future.add_done_callback(
+        partial(_on_rendered, recipe_id, image_name, executor)
+    )
+    return future
+
+
+def _submit_or_log(recipe_id, image_name):
+    """Submit the derivatives, never failing the upload that asked."""
+    try:
+        submit_derivatives(recipe_id, image_name)
+    except Exception:
+        logger.exception('Scheduling derivatives of %s failed', image_name)
+
+
+def schedule_derivatives(recipe):
+    """Render the derivatives of a recipe image once the upload commits."""
+    transaction.on_commit(
+        partial(_submit_or_log, recipe.pk, recipe.image.name)
+    )
+
+
+def release_image(image_name, derivatives=None):
+    """Delete an image and the stored derivatives once no recipe uses it.
+
+    An image modified within IMAGE_GRACE_SECONDS is kept with its
+    derivatives: an identical upload refreshed it and may still be
+    committing. collect_recipe_images deletes it later if it stays unused.
+    """
+    from core.models import Recipe
+
+    if not image_name or Recipe.objects.filter(image=image_name).exists():
+        return
+    cutoff = timezone.now() - timedelta(seconds=settings.IMAGE_GRACE_SECONDS)
+    try:
+        if default_storage.get_modified_time(image_name) > cutoff:
+            return
+    except FileNotFoundError:
+        pass
+    for formats in (derivatives or {}).values():
+        for name in formats.values():
+            default_storage.delete(name)
+    default_storage.delete(image_name)
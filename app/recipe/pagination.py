@@ -0,0 +1,30 @@
+"""
+Pagination for the recipe APIs.
+"""
+
+from rest_framework.pagination import CursorPagination
+
+from .search import SEARCH_ORDERING
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination for recipes, newest first.
+
+    Pagination is opt-in: lists are only paginated when the client
+    passes ``page_size``, so existing clients keep receiving a plain list.
+    """
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-id',)
+
+    def get_ordering(self, request, queryset, view):
+        """Page search results by rank instead of by id."""
+        if request.query_params.get('search'):
+            return SEARCH_ORDERING
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """Keyset pagination for tags and ingredients, ordered by name."""
+    ordering = ('-name', '-id')
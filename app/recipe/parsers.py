@@ -0,0 +1,45 @@
+"""
+Parsers for the recipe APIs.
+"""
+
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, MultiPartParser
+
+from .uploads import ImageUploadHandler
+
+
+class NDJSONParser(BaseParser):
+    """Lazily parse newline delimited JSON.
+
+    Returns a generator of ``(line_number, value)`` pairs so the body is
+    read one line at a time. Lines that are not valid JSON yield a
+    ``ParseError`` as value instead of aborting the whole upload.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self._iter_lines(stream, encoding)
+
+    def _iter_lines(self, stream, encoding):
+        """Yield each non-blank line of the stream decoded as JSON."""
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line.decode(encoding))
+            except ValueError as exc:
+                yield line_number, ParseError(f'Invalid JSON: {exc}')
+
+
+class ImageUploadParser(MultiPartParser):
+    """Multipart parser validating image files while they stream in."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return super().parse(stream, media_type, parser_context)
@@ -0,0 +1,24 @@
+"""
+Renderers for the recipe export API.
+"""
+
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Select NDJSON export; also renders error responses as one line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=JSONEncoder).encode(self.charset) + b'\n'
+
+
+class CSVRenderer(NDJSONRenderer):
+    """Select CSV export; error responses are rendered as JSON."""
+    media_type = 'text/csv'
+    format = 'csv'
@@ -0,0 +1,137 @@
+"""
+Fast read path building recipe responses from database values.
+
+Produces the same output as ``RecipeSerializer`` and
+``RecipeDetailSerializer`` without instantiating model objects or nested
+serializers, for endpoints returning many recipes. Clients can ask for
+fewer fields with ``fields`` and ``expand``, which trims the columns
+selected as well as the output.
+"""
+
+from itertools import islice
+
+from rest_framework.exceptions import ValidationError
+
+from core.metrics import timed
+from core.models import Recipe
+from .images import derivative_urls, image_url
+from .serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+RELATION_FIELDS = ('tags', 'ingredients')
+SPARSE_FIELDS = tuple(RecipeDetailSerializer.Meta.fields)
+
+_price_field = RecipeSerializer().fields['price']
+
+
+def chunked(iterable, size):
+    """Yield lists of at most size items from an iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def value_columns(fields):
+    """Return the model columns to select for the given output fields."""
+    return [field for field in fields if field not in RELATION_FIELDS]
+
+
+def _requested(query_params, name, allowed):
+    """Return the names listed in a comma separated param, or None."""
+    value = query_params.get(name)
+    if value is None:
+        return None
+    names = [item.strip() for item in value.split(',') if item.strip()]
+    unknown = [item for item in names if item not in allowed]
+    if unknown:
+        raise ValidationError(
+            {name: f"Unknown fields: {', '.join(unknown)}."}
+        )
+    return names
+
+
+def sparse_fieldset(query_params, default):
+    """Return the fields and expanded relations a request asks for.
+
+    ``fields`` lists the output fields, out of the detail fields, and
+    ``expand`` the relations to render as ``{'id', 'name'}`` items. Once
+    either is given, relations that are not expanded are rendered as
+    lists of IDs, read without joining the related table. Without them
+    the ``default`` fields are returned with every relation expanded.
+    ``id`` is always included so rows of a batch can be told apart.
+    """
+    fields = _requested(query_params, 'fields', SPARSE_FIELDS)
+    expand = _requested(query_params, 'expand', RELATION_FIELDS)
+    if fields is None and expand is None:
+        return list(default), RELATION_FIELDS
+
+    expand = tuple(expand or ())
+    wanted = {'id', *(default if fields is None else fields), *expand}
+    return [field for field in SPARSE_FIELDS if field in wanted], expand
+
+
+def _related_items(recipe_ids, field, expand=True):
+    """Map recipe id to its items for one relation.
+
+    Items are ``{'id', 'name'}`` dicts when expanded, plain IDs otherwise.
+    """
+    through = getattr(Recipe, field).through
+    target = getattr(Recipe, field).field.m2m_reverse_field_name()
+    columns = ['recipe_id', f'{target}_id']
+    if expand:
+        columns.append(f'{target}__name')
+    links = through.objects.filter(recipe_id__in=recipe_ids).values_list(
+        *columns
+    ).order_by(f'{target}_id')
+
+    items = {}
+    for recipe_id, obj_id, *name in links:
+        item = {'id': obj_id, 'name': name[0]} if expand else obj_id
+        items.setdefault(recipe_id, []).append(item)
+    return items
+
+
+@timed('serialize')
+def build_recipe_rows(rows, fields, request=None, expand=RELATION_FIELDS):
+    """Turn ``values()`` rows into serializer shaped dicts.
+
+    ``rows`` must contain the ``value_columns(fields)``; tags and
+    ingredients are fetched with one query per relation for all rows,
+    as IDs only unless listed in ``expand``.
+    """
+    ids = [row['id'] for row in rows]
+    related = {
+        field: _related_items(ids, field, field in expand) if ids else {}
+        for field in RELATION_FIELDS if field in fields
+    }
+
+    results = []
+    for row in rows:
+        if 'price' in row:
+            row['price'] = _price_field.to_representation(row['price'])
+        if 'image' in row:
+            row['image'] = image_url(row['image'], request)
+        if 'image_derivatives' in row:
+            row['image_derivatives'] = derivative_urls(
+                row['image_derivatives'], request
+            )
+        for field, items in related.items():
+            row[field] = items.get(row['id'], [])
+        results.append({field: row[field] for field in fields})
+    return results
+
+
+def iter_recipe_rows(queryset, fields, request=None, chunk_size=1000):
+    """Yield serializer shaped dicts for a whole queryset.
+
+    Recipes are read through a server-side cursor and built per chunk,
+    so memory stays bounded by ``chunk_size``.
+    """
+    rows = queryset.values(*value_columns(fields)).iterator(
+        chunk_size=chunk_size
+    )
+    for chunk in chunked(rows, chunk_size):
+        yield from build_recipe_rows(chunk, fields, request)
@@ -0,0 +1,99 @@
+"""
+Full-text search over recipes.
+
+Every recipe stores a weighted search vector of its title, description
+and ingredient names, indexed with GIN. The vector is refreshed by the
+signal handlers in ``recipe.signals`` and explicitly after bulk inserts.
+"""
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import F, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+
+
+SEARCH_CONFIG = 'english'
+MODE_TEXT = 'text'
+MODE_FUZZY = 'fuzzy'
+SEARCH_ORDERING = ('-rank', '-id')
+
+_has_trigram = None
+
+
+def _ingredient_names():
+    """Subquery joining the ingredient names of the outer recipe."""
+    return Subquery(
+        Recipe.ingredients.through.objects.filter(recipe_id=OuterRef('pk'))
+        .values('recipe_id')
+        .annotate(names=StringAgg('ingredient__name', ' '))
+        .values('names')
+    )
+
+
+def search_vector():
+    """Return the expression computing the search vector of a recipe."""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(_ingredient_names(), weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Recompute the search vector of the given recipes in one UPDATE.
+
+    ``recipe_ids`` may be a list or a subquery of recipe IDs.
+    """
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        search_vector=search_vector()
+    )
+
+
+def has_trigram():
+    """Return whether the pg_trgm extension is installed."""
+    global _has_trigram
+    if _has_trigram is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _has_trigram = cursor.fetchone() is not None
+    return _has_trigram
+
+
+def search_recipes(queryset, text, mode=MODE_TEXT):
+    """Filter recipes matching text, annotated and ordered by ``rank``.
+
+    ``text`` mode matches words against the search vector using web
+    search syntax (quotes, ``or``, ``-word``). ``fuzzy`` mode compares
+    the title by trigram similarity, so misspelt words still match.
+
+    Ranks are cast to double precision so cursor positions round-trip
+    exactly.
+    """
+    if mode == MODE_TEXT:
+        query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+        rank = SearchRank(F('search_vector'), query)
+        queryset = queryset.filter(search_vector=query)
+    elif mode == MODE_FUZZY:
+        if not has_trigram():
+            raise ValidationError(
+                {'search_mode': 'Fuzzy search is not available.'}
+            )
+        rank = TrigramSimilarity('title', text)
+        queryset = queryset.filter(title__trigram_similar=text)
+    else:
+        raise ValidationError(
+            {'search_mode': f'Must be "{MODE_TEXT}" or "{MODE_FUZZY}".'}
+        )
+
+    return queryset.annotate(
+        rank=Cast(rank, FloatField())
+    ).order_by(*SEARCH_ORDERING)
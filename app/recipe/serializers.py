@@ -1,25 +1,120 @@
 ''' Serializer for Recipe API '''
 
+from django.db import transaction
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
+from core.metrics import TimedRepresentationMixin
 from core.models import Recipe, Tag, Ingredient
-
-
-class IngredientSerializer(serializers.ModelSerializer):
+from .counts import count_links
+from .images import derivative_urls
+from .search import update_search_vectors
+
+
+class UniqueNameMixin:
+    """Reject renaming a tag or ingredient to a name the user already has."""
+
+    def validate_name(self, value):
+        """Check the new name is free for the owner of the object."""
+        if self.instance is not None:
+            duplicate = self.Meta.model.objects.filter(
+                user=self.instance.user,
+                name=value,
+            ).exclude(pk=self.instance.pk)
+            if duplicate.exists():
+                raise serializers.ValidationError(
+                    f'{self.Meta.model.__name__} with this name already exists.'
+                )
+        return value
+
+
+class IngredientSerializer(TimedRepresentationMixin, UniqueNameMixin,
+                           serializers.ModelSerializer):
     '''Serializers for Ingredeints'''
     class Meta:
         model = Ingredient
         fields = ['id','name']
         read_only_field = ['id']
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedRepresentationMixin, UniqueNameMixin,
+                    serializers.ModelSerializer):
     '''Serializers for Tags'''
     class Meta:
         model = Tag
         fields = ['id','name']
         read_only_field = ['id']
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeCountMixin:
+    '''Update attributes without writing their recipe_count back
+
+    The count is kept by relative updates (see recipe.counts), which a
+    full-row save would overwrite with the value read before it.
+    '''
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+class IngredientDetailSerializer(RecipeCountMixin, IngredientSerializer):
+    '''Ingredient with the number of recipes using it'''
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+
+class TagDetailSerializer(RecipeCountMixin, TagSerializer):
+    '''Tag with the number of recipes using it'''
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+
+class RecipeListSerializer(serializers.ListSerializer):
+    '''Create many recipes with batched inserts'''
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Insert recipes, their tags and ingredients in bulk.
+
+        Costs one insert for the recipes plus, per relation, the batched
+        get-or-create of the names, one insert into the through table and
+        one update per distinct change of the recipe counts, and one
+        update of the search vectors.
+        """
+        relations = [
+            ('tags', Tag, [item.pop('tags', []) for item in validated_data]),
+            (
+                'ingredients',
+                Ingredient,
+                [item.pop('ingredients', []) for item in validated_data],
+            ),
+        ]
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(**item) for item in validated_data]
+        )
+
+        for field, model, items_per_recipe in relations:
+            objs = {
+                obj.name: obj
+                for obj in self.child._get_or_create_attrs(
+                    model,
+                    [item for items in items_per_recipe for item in items],
+                )
+            }
+            through = getattr(Recipe, field).through
+            column = getattr(Recipe, field).field.m2m_reverse_name()
+            links = through.objects.bulk_create([
+                through(recipe_id=recipe.id, **{column: objs[name].id})
+                for recipe, items in zip(recipes, items_per_recipe)
+                for name in dict.fromkeys(item['name'] for item in items)
+            ])
+            count_links(model, [
+                (link.recipe_id, getattr(link, column)) for link in links
+            ])
+        # Bulk inserts send no signals, so index and count the recipes
+        # explicitly.
+        update_search_vectors([recipe.id for recipe in recipes])
+        return recipes
+
+
+class RecipeSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     '''Serializer for Recipe'''
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required = False)
@@ -27,21 +122,66 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ['id','title','time_minutes','price','link','tags', 'ingredients']
         read_only_field = ['id']
+        list_serializer_class = RecipeListSerializer
+
+    def _get_or_create_attrs(self, model, items):
+        """Return the user's objects for the given names, creating missing ones.
+
+        Costs one lookup and, when some names are new, one bulk insert and
+        one re-read. Conflicting concurrent inserts are ignored thanks to the
+        unique (user, name) constraint and picked up by the re-read.
+        """
+        auth_user = self.context['request'].user
+        names = list(dict.fromkeys(item['name'] for item in items))
+        if not names:
+            return []
+
+        existing = {
+            obj.name: obj
+            for obj in model.objects.filter(user=auth_user, name__in=names)
+        }
+        missing = [name for name in names if name not in existing]
+        if missing:
+            model.objects.bulk_create(
+                [model(user=auth_user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            existing.update(
+                (obj.name, obj)
+                for obj in model.objects.filter(user=auth_user, name__in=missing)
+            )
+        return [existing[name] for name in names]
 
     def _get_or_create_tags(self,tags,recipe):
         """Handle the getting or creating tags as needed."""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(user =auth_user,**tag)
-            recipe.tags.add(tag_obj)
+        recipe.tags.add(*self._get_or_create_attrs(Tag, tags))
 
     def _get_or_create_ingredients(self, ingredients, recipe):
-        """Handle the getting or creating tags as needed"""
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(user = auth_user, **ingredient)
-            recipe.ingredients.add(ingredient_obj)
-
+        """Handle the getting or creating ingredients as needed"""
+        recipe.ingredients.add(
+            *self._get_or_create_attrs(Ingredient, ingredients)
+        )
+
+    def _update_attrs(self, manager, model, items):
+        """Sync a recipe relation to the given names, touching only changes.
+
+        Current links come from the prefetch cache when available, so a
+        no-op update does not query the relation at all.
+        """
+        current = {obj.name: obj for obj in manager.all()}
+        names = list(dict.fromkeys(item['name'] for item in items))
+
+        to_remove = [obj for name, obj in current.items() if name not in names]
+        to_add = self._get_or_create_attrs(
+            model,
+            [{'name': name} for name in names if name not in current],
+        )
+        if to_remove:
+            manager.remove(*to_remove)
+        if to_add:
+            manager.add(*to_add)
+
+    @transaction.atomic
     def create(self,validated_data):
         """Create a recipe"""
         tags = validated_data.pop('tags', [])
@@ -51,31 +191,49 @@ class RecipeSerializer(serializers.ModelSerializer):
         self._get_or_create_ingredients(ingredients, recipe)
         return recipe
 
-
+    @transaction.atomic
     def update(self,instance, validated_data):
         """Upading the existing object with validated data """
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._update_attrs(instance.tags, Tag, tags)
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._update_attrs(instance.ingredients, Ingredient, ingredients)
 
         for attr,value in validated_data.items():
             setattr(instance, attr,value)
 
-        instance.save()
+        # Only the given columns: the image, its derivatives and the
+        # search vector are written concurrently with queryset updates.
+        instance.save(update_fields=[*validated_data, 'updated_at'])
         return instance
 
 class RecipeDetailSerializer(RecipeSerializer):
     '''Detail Serailzer for one Recipe'''
-    class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+    image_derivatives = serializers.SerializerMethodField()
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_derivatives',
+        ]
+
+    @extend_schema_field({
+        'type': 'object',
+        'additionalProperties': {
+            'type': 'object',
+            'additionalProperties': {'type': 'string', 'format': 'uri'},
+        },
+    })
+    def get_image_derivatives(self, obj):
+        """URLs of the resized images by size and format, once rendered."""
+        return derivative_urls(
+            obj.image_derivatives, self.context.get('request')
+        )
+
+class RecipeImageSerializer(TimedRepresentationMixin,
+                            serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ['id','image']
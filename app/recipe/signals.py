@@ -0,0 +1,172 @@
+"""
+Signal handlers keeping cached responses, change markers, search vectors,
+recipe counts and stored images in sync.
+"""
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import invalidate_user
+from recipe.counts import (
+    COUNTED_MODELS, count_links, counted_model, linked_ids
+)
+from recipe.images import release_image
+from recipe.search import update_search_vectors
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_owner(sender, instance, **kwargs):
+    """Invalidate the owner's responses when an object changes."""
+    invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_relation_owner(sender, instance, action, **kwargs):
+    """Invalidate the owner's responses when recipe links change."""
+    if action.startswith('post_'):
+        invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_relinked_recipes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Mark recipes as changed when their tags or ingredients change."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.objects.filter(pk=instance.pk).update(
+                updated_at=timezone.now()
+            )
+    elif action in ('post_add', 'post_remove'):
+        Recipe.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+    elif action == 'pre_clear':
+        # Cleared links are no longer known once the clear has happened.
+        instance.recipes.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_relinked_recipes(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Keep the recipe counts of tags and ingredients in step with links."""
+    model = counted_model(sender)
+    if action == 'post_add':
+        # Django only reports the links it actually inserted.
+        if reverse:
+            count_links(model, [(pk, instance.pk) for pk in pk_set])
+        else:
+            count_links(model, [(instance.pk, pk) for pk in pk_set])
+    elif action in ('pre_remove', 'pre_clear'):
+        # Removing links that do not exist is allowed, so look them up.
+        if reverse:
+            instance._unlinked = linked_ids(model, pk_set, [instance.pk])
+        else:
+            instance._unlinked = linked_ids(model, [instance.pk], pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        count_links(model, instance._unlinked, -1)
+
+
+@receiver(pre_delete, sender=Recipe)
+def uncount_deleted_recipe(sender, instance, **kwargs):
+    """Drop a deleted recipe from the counts, its links go with it."""
+    for model in COUNTED_MODELS:
+        count_links(model, linked_ids(model, [instance.pk]), -1)
+
+
+@receiver(post_save, sender=Recipe)
+def reindex_recipe(sender, instance, update_fields=None, **kwargs):
+    """Refresh the search vector when the title or description is saved."""
+    if update_fields is None or {'title', 'description'} & set(update_fields):
+        update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def reindex_relinked_recipes(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Refresh the search vector when a recipe's ingredients change."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_search_vectors([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        update_search_vectors(pk_set)
+    elif action == 'pre_clear':
+        instance._cleared_recipe_ids = list(
+            instance.recipes.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        update_search_vectors(instance._cleared_recipe_ids)
+
+
+def _linked_recipe_ids(ingredient):
+    """Subquery of the IDs of the recipes using an ingredient."""
+    return Recipe.ingredients.through.objects.filter(
+        ingredient_id=ingredient.pk
+    ).values('recipe_id')
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_renamed_ingredient(sender, instance, created, **kwargs):
+    """Refresh the search vector of recipes using a renamed ingredient."""
+    if not created:
+        update_search_vectors(_linked_recipe_ids(instance))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def remember_ingredient_recipes(sender, instance, **kwargs):
+    """Keep the recipes of an ingredient, its links are deleted with it."""
+    instance._linked_recipe_ids = list(
+        _linked_recipe_ids(instance).values_list('recipe_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Ingredient)
+def reindex_deleted_ingredient(sender, instance, **kwargs):
+    """Drop a deleted ingredient from the search vectors of its recipes."""
+    update_search_vectors(instance._linked_recipe_ids)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(sender, instance, **kwargs):
+    """Remember the stored image name to notice when it is replaced."""
+    if 'image' in instance.__dict__:
+        image = instance.__dict__['image']
+        instance._stored_image = getattr(image, 'name', image)
+        instance._stored_derivatives = instance.__dict__.get(
+            'image_derivatives'
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_image(sender, instance, **kwargs):
+    """Drop the previous image file when no other recipe shares it."""
+    previous = getattr(instance, '_stored_image', None)
+    derivatives = getattr(instance, '_stored_derivatives', None)
+    instance._stored_image = instance.image.name
+    instance._stored_derivatives = instance.image_derivatives
+    if previous and previous != instance.image.name:
+        transaction.on_commit(lambda: release_image(previous, derivatives))
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_image(sender, instance, **kwargs):
+    """Drop the image of a deleted recipe when no other recipe shares it."""
+    if instance.image:
+        image_name = instance.image.name
+        derivatives = instance.image_derivatives
+        transaction.on_commit(
+            lambda: release_image(image_name, derivatives)
+        )
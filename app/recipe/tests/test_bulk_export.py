@@ -0,0 +1,119 @@
+"""Tests for the recipe export API"""
+
+import csv
+import io
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def detail_url(recipe_id):
+    """Create and return the detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, i):
+    """Create a recipe with a tag and two ingredients."""
+    recipe = Recipe.objects.create(
+        user=user,
+        title=f'Recipe {i}',
+        description=f'Description, with "quotes" {i}',
+        time_minutes=10 + i,
+        price=Decimal('4.5'),
+    )
+    recipe.tags.add(Tag.objects.create(user=user, name=f'Tag {i}'))
+    recipe.ingredients.add(
+        Ingredient.objects.create(user=user, name=f'Salt {i}'),
+        Ingredient.objects.create(user=user, name=f'Pepper {i}'),
+    )
+    return recipe
+
+
+class RecipeExportTests(TestCase):
+    """Test exporting recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _content(self, res):
+        return b''.join(res.streaming_content).decode('utf-8')
+
+    def test_auth_required(self):
+        """Test exporting requires authentication."""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_ndjson_matches_detail(self):
+        """Test each exported line matches the recipe detail response."""
+        recipes = [create_recipe(self.user, i) for i in range(3)]
+        other = get_user_model().objects.create_user('o@example.com', 'pass1234')
+        create_recipe(other, 9)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = self._content(res).splitlines()
+        self.assertEqual(len(lines), 3)
+        for line, recipe in zip(lines, reversed(recipes)):
+            expected = self.client.get(detail_url(recipe.id)).json()
+            exported = json.loads(line)
+            exported['tags'].sort(key=lambda item: item['id'])
+            exported['ingredients'].sort(key=lambda item: item['id'])
+            expected['tags'].sort(key=lambda item: item['id'])
+            expected['ingredients'].sort(key=lambda item: item['id'])
+            self.assertEqual(exported, expected)
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV."""
+        create_recipe(self.user, 1)
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('recipes.csv', res['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(self._content(res))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['description'], 'Description, with "quotes" 1')
+        self.assertEqual(rows[0]['price'], '4.50')
+        self.assertEqual(rows[0]['tags'], 'Tag 1')
+        self.assertEqual(rows[0]['ingredients'], 'Salt 1;Pepper 1')
+
+    def test_export_csv_without_recipes_has_header(self):
+        """Test an empty CSV export still has the header row."""
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertTrue(self._content(res).startswith('id,title'))
+
+    def test_export_query_count_is_constant(self):
+        """Test exporting does not issue queries per recipe."""
+        create_recipe(self.user, 1)
+        with CaptureQueriesContext(connection) as small:
+            self._content(self.client.get(EXPORT_URL))
+
+        for i in range(2, 20):
+            create_recipe(self.user, i)
+        with CaptureQueriesContext(connection) as large:
+            self._content(self.client.get(EXPORT_URL))
+
+        self.assertEqual(
+            len(small.captured_queries), len(large.captured_queries)
+        )
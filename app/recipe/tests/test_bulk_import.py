@@ -0,0 +1,149 @@
+"""Tests for the recipe bulk import API"""
+
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+IMPORT_URL = reverse('recipe:recipe-bulk-import')
+
+
+def recipe_line(i, **params):
+    """Return one sample recipe as a JSON object."""
+    recipe = {
+        'title': f'Recipe {i}',
+        'time_minutes': 10,
+        'price': '2.50',
+        'tags': [{'name': 'Dinner'}, {'name': f'Tag {i % 3}'}],
+        'ingredients': [{'name': 'Salt'}, {'name': f'Ingredient {i}'}],
+    }
+    recipe.update(params)
+    return recipe
+
+
+def ndjson(lines):
+    """Encode a list of lines as an NDJSON body."""
+    return '\n'.join(
+        line if isinstance(line, str) else json.dumps(line) for line in lines
+    ).encode('utf-8')
+
+
+class BulkImportTests(TestCase):
+    """Test importing recipes in bulk."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _post_ndjson(self, lines):
+        return self.client.post(
+            IMPORT_URL,
+            ndjson(lines),
+            content_type='application/x-ndjson',
+        )
+
+    def test_auth_required(self):
+        """Test importing requires authentication."""
+        res = APIClient().post(
+            IMPORT_URL, ndjson([recipe_line(1)]),
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_import_ndjson(self):
+        """Test importing recipes with shared tags and ingredients."""
+        Tag.objects.create(user=self.user, name='Dinner')
+
+        res = self._post_ndjson([recipe_line(i) for i in range(5)])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 5)
+        self.assertEqual(res.data['errors'], [])
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 6
+        )
+        recipe = recipes.get(title='Recipe 4')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Dinner', 'Tag 1'],
+        )
+
+    def test_import_json_array(self):
+        """Test importing recipes sent as a JSON array."""
+        payload = [recipe_line(i) for i in range(3)]
+
+        res = self.client.post(IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+
+    def test_import_reports_line_errors(self):
+        """Test invalid lines are skipped and reported by line number."""
+        lines = [
+            recipe_line(1),
+            '{not json',
+            '',
+            recipe_line(2, price='free'),
+            '[1, 2]',
+            recipe_line(3),
+        ]
+
+        res = self._post_ndjson(lines)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['failed'], 3)
+        self.assertEqual(
+            [error['line'] for error in res.data['errors']], [2, 4, 5]
+        )
+        self.assertIn('price', res.data['errors'][1]['errors'])
+
+    def test_import_nothing_valid_returns_error(self):
+        """Test an import without valid recipes is a bad request."""
+        res = self._post_ndjson(['{not json'])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['created'], 0)
+
+    def test_import_query_count_is_constant(self):
+        """Test the queries per chunk do not depend on its size."""
+        with CaptureQueriesContext(connection) as small:
+            self._post_ndjson([recipe_line(i) for i in range(2)])
+        Recipe.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as large:
+            self._post_ndjson([recipe_line(i) for i in range(50)])
+
+        self.assertEqual(
+            len(small.captured_queries), len(large.captured_queries)
+        )
+
+    @patch('recipe.bulk.IMPORT_CHUNK_SIZE', 2)
+    def test_import_in_chunks(self):
+        """Test recipes are inserted in one transaction per chunk."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self._post_ndjson([recipe_line(i) for i in range(5)])
+
+        self.assertEqual(res.data['created'], 5)
+        savepoints = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith('SAVEPOINT')
+        ]
+        self.assertEqual(len(savepoints), 3)
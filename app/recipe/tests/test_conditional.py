@@ -0,0 +1,219 @@
+"""Tests for conditional requests on the recipe API"""
+
+import threading
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Create and return the detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalRequestTests(TestCase):
+    """Test ETag, If-None-Match and If-Match handling."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Soup',
+            time_minutes=20,
+            price=Decimal('3.00'),
+        )
+        self.url = detail_url(self.recipe.id)
+
+    def test_detail_not_modified(self):
+        """Test a matching If-None-Match returns 304 with one query."""
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_detail_etag_changes_on_update(self):
+        """Test updating a recipe changes its ETag."""
+        etag = self.client.get(self.url)['ETag']
+        self.recipe.title = 'Stew'
+        self.recipe.save()
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_etag_changes_on_tag_changes(self):
+        """Test linking, renaming and deleting tags change the ETag."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etags = [self.client.get(self.url)['ETag']]
+
+        tag.recipes.add(self.recipe)
+        etags.append(self.client.get(self.url)['ETag'])
+        tag.name = 'Vegetarian'
+        tag.save()
+        etags.append(self.client.get(self.url)['ETag'])
+        tag.delete()
+        etags.append(self.client.get(self.url)['ETag'])
+
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_if_match_allows_update(self):
+        """Test updating with the current ETag succeeds."""
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.patch(self.url, {'title': 'Stew'}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(self.client.get(self.url)['ETag'], res['ETag'])
+
+    def test_if_match_with_sparse_read_etag(self):
+        """Test the ETag of a sparse read guards a write of the recipe."""
+        etag = self.client.get(self.url, {'fields': 'id,title'})['ETag']
+        self.assertNotEqual(etag, self.client.get(self.url)['ETag'])
+
+        res = self.client.patch(self.url, {'title': 'Stew'}, HTTP_IF_MATCH=etag)
+        stale = self.client.patch(self.url, {'title': 'Chili'}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(stale.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_if_match_stale_update_rejected(self):
+        """Test updating with a stale ETag fails with 412."""
+        etag = self.client.get(self.url)['ETag']
+        self.client.patch(self.url, {'title': 'Stew'})
+
+        res = self.client.patch(self.url, {'title': 'Chili'}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Stew')
+
+    def test_if_match_stale_delete_rejected(self):
+        """Test deleting with a stale ETag fails with 412."""
+        res = self.client.delete(self.url, HTTP_IF_MATCH='"stale"')
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue(Recipe.objects.filter(id=self.recipe.id).exists())
+
+    def test_other_users_recipe_not_found(self):
+        """Test conditional headers do not leak other users' recipes."""
+        other = get_user_model().objects.create_user('o@example.com', 'pass1234')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_non_ascii_digit_id_not_found(self):
+        """Test an id of non-ASCII digits is not found rather than an error."""
+        url = detail_url('\u00b2')
+
+        responses = [
+            self.client.get(url),
+            self.client.patch(url, {'title': 'Stew'}),
+            self.client.delete(url),
+        ]
+
+        for res in responses:
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=300)
+    def test_list_not_modified(self):
+        """Test a matching list ETag returns 304 without queries."""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=300)
+    def test_list_etag_changes_on_create(self):
+        """Test creating a recipe changes the list ETag."""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=5, price=Decimal('1.00')
+        )
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_list_without_response_cache_has_no_etag(self):
+        """Test lists get no ETag while their versions are not cached."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
+
+
+class ConcurrentIfMatchTests(TransactionTestCase):
+    """Test If-Match holds when two clients write at once."""
+
+    def test_same_etag_updates_once(self):
+        """Test only one of two updates sent with one ETag succeeds."""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        recipe = Recipe.objects.create(
+            user=user, title='Soup', time_minutes=20, price=Decimal('3.00'),
+        )
+        url = detail_url(recipe.id)
+        client = APIClient()
+        client.force_authenticate(user)
+        etag = client.get(url)['ETag']
+        perform_update = RecipeViewSet.perform_update
+        statuses = []
+
+        def slow_update(view, serializer):
+            # Let the other request reach its precondition meanwhile.
+            time.sleep(0.3)
+            perform_update(view, serializer)
+
+        def update(title):
+            try:
+                other = APIClient()
+                other.force_authenticate(user)
+                statuses.append(other.patch(
+                    url, {'title': title}, HTTP_IF_MATCH=etag
+                ).status_code)
+            finally:
+                connection.close()
+
+        with patch.object(RecipeViewSet, 'perform_update', slow_update):
+            threads = [
+                threading.Thread(target=update, args=(title,))
+                for title in ('Stew', 'Chili')
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(statuses), [
+            status.HTTP_200_OK, status.HTTP_412_PRECONDITION_FAILED,
+        ])
@@ -0,0 +1,64 @@
+"""Tests for the recipe filters"""
+
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from core.benchmark import get_bench_user, seed_recipes
+from core.models import Recipe, Tag, Ingredient
+from recipe.filters import filter_by_related, MATCH_ALL, MATCH_ANY
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN output is Postgres specific')
+class RelatedFilterPlanTests(TestCase):
+    """Test the query plans of the tag and ingredient filters."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_bench_user()
+        seed_recipes(cls.user, 5000, tags=50, ingredients=200)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.tag_ids = list(
+            Tag.objects.filter(user=cls.user).values_list('id', flat=True)[:3]
+        )
+        cls.ingredient_ids = list(
+            Ingredient.objects.filter(user=cls.user)
+            .values_list('id', flat=True)[:3]
+        )
+
+    def _plan(self, match):
+        """Return the plan of a combined tag and ingredient filter."""
+        queryset = Recipe.objects.filter(user=self.user)
+        queryset = filter_by_related(queryset, 'tags', self.tag_ids, match)
+        queryset = filter_by_related(
+            queryset, 'ingredients', self.ingredient_ids, match
+        )
+        self.assertNotIn('DISTINCT', str(queryset.order_by('-id').query))
+        return queryset.order_by('-id').explain()
+
+    def test_match_any_has_no_duplicate_removal(self):
+        """Test match any does not sort or hash rows to deduplicate."""
+        plan = self._plan(MATCH_ANY)
+
+        self.assertNotIn('Unique', plan)
+        self.assertNotIn('HashAggregate', plan)
+        self.assertIn('Semi Join', plan)
+
+    def test_match_all_has_no_duplicate_removal(self):
+        """Test match all does not sort or hash rows to deduplicate."""
+        plan = self._plan(MATCH_ALL)
+
+        self.assertNotIn('Unique', plan)
+        self.assertNotIn('HashAggregate', plan)
+
+    def test_match_any_results_are_unique(self):
+        """Test recipes matching several IDs are returned once."""
+        queryset = filter_by_related(
+            Recipe.objects.filter(user=self.user), 'tags', self.tag_ids
+        )
+        ids = list(queryset.values_list('id', flat=True))
+
+        self.assertTrue(ids)
+        self.assertEqual(len(ids), len(set(ids)))
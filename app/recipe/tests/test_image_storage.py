@@ -0,0 +1,246 @@
+"""Tests for the content addressed recipe image storage"""
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import images
+
+
+def image_upload_url(recipe_id):
+    """Create and return the image upload URL."""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def detail_url(recipe_id):
+    """Create and return the detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def jpeg(color):
+    """Return a small JPEG filled with color."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 200), color).save(buffer, 'JPEG')
+    buffer.name = 'photo.jpg'
+    buffer.seek(0)
+    return buffer
+
+
+@override_settings(IMAGE_WORKERS=0)
+class ContentAddressedImageTests(TestCase):
+    """Test identical images are stored once and cleaned up."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _recipe(self):
+        return Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+
+    def _upload(self, recipe, color='red'):
+        """Upload an image, run the commit hooks and return the recipe."""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                image_upload_url(recipe.id),
+                {'image': jpeg(color)},
+                format='multipart',
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        return recipe
+
+    def _stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root)
+            for name in names
+        )
+
+    def _age_files(self, seconds=7200):
+        """Date every stored file back, past the grace period."""
+        old = time.time() - seconds
+        for name in self._stored_files():
+            os.utime(os.path.join(self.media_root, name), (old, old))
+
+    def test_image_named_after_content_hash(self):
+        """Test the stored file name is the hash of the stored bytes."""
+        recipe = self._upload(self._recipe())
+
+        with default_storage.open(recipe.image.name) as image_file:
+            digest = hashlib.sha256(image_file.read()).hexdigest()
+        self.assertEqual(
+            recipe.image.name,
+            f'uploads/recipe/{digest[:2]}/{digest[2:4]}/{digest}.jpg',
+        )
+
+    def test_identical_uploads_share_files(self):
+        """Test the same photo on two recipes is stored once."""
+        first = self._upload(self._recipe())
+        files = self._stored_files()
+
+        with patch('recipe.images.render_derivatives') as mock_render:
+            second = self._upload(self._recipe())
+
+        mock_render.assert_not_called()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image_derivatives, second.image_derivatives)
+        self.assertEqual(self._stored_files(), files)
+
+    def test_replaced_image_is_deleted(self):
+        """Test replacing an unshared image deletes its files."""
+        recipe = self._upload(self._recipe(), 'red')
+        old_files = self._stored_files()
+        self._age_files()
+
+        recipe = self._upload(recipe, 'blue')
+
+        self.assertEqual(len(self._stored_files()), len(old_files))
+        self.assertFalse(set(old_files) & set(self._stored_files()))
+
+    def test_shared_image_is_kept(self):
+        """Test replacing an image still used elsewhere keeps its files."""
+        shared = self._upload(self._recipe(), 'red')
+        recipe = self._upload(self._recipe(), 'red')
+
+        self._upload(recipe, 'blue')
+
+        self.assertTrue(default_storage.exists(shared.image.name))
+        for formats in shared.image_derivatives.values():
+            for name in formats.values():
+                self.assertTrue(default_storage.exists(name))
+
+    def test_collect_keeps_stored_derivative_names(self):
+        """Test the GC command keeps the derivatives a recipe points to."""
+        recipe = self._recipe()
+        image = default_storage.save(
+            'uploads/recipe/aa/bb/photo.jpg', ContentFile(b'image')
+        )
+        thumbnail = default_storage.save(
+            'uploads/recipe/aa/bb/other/thumbnail.webp', ContentFile(b'thumb')
+        )
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image=image,
+            image_derivatives={'thumbnail': {'webp': thumbnail}},
+        )
+        self._age_files()
+
+        call_command('collect_recipe_images', stdout=io.StringIO())
+
+        self.assertEqual(self._stored_files(), sorted([image, thumbnail]))
+
+    def test_deleted_recipe_releases_image(self):
+        """Test deleting the last recipe using an image deletes its files."""
+        recipe = self._upload(self._recipe())
+        self._age_files()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(detail_url(recipe.id))
+
+        self.assertEqual(self._stored_files(), [])
+
+    def test_reused_image_is_refreshed(self):
+        """Test storing an identical image renews the file's age."""
+        first = self._upload(self._recipe())
+        self._age_files()
+
+        self._upload(self._recipe())
+
+        modified = os.path.getmtime(default_storage.path(first.image.name))
+        self.assertGreater(modified, time.time() - 60)
+
+    def test_reused_derivatives_are_refreshed(self):
+        """Test rendering derivatives already stored renews their age."""
+        recipe = self._upload(self._recipe())
+        self._age_files()
+
+        images.render_derivatives(recipe.image.name)
+
+        for formats in recipe.image_derivatives.values():
+            for name in formats.values():
+                modified = os.path.getmtime(default_storage.path(name))
+                self.assertGreater(modified, time.time() - 60)
+
+    def test_recent_image_is_kept_on_release(self):
+        """Test a released image refreshed by an upload is not deleted."""
+        recipe = self._upload(self._recipe(), 'red')
+        old_files = self._stored_files()
+
+        self._upload(recipe, 'blue')
+
+        self.assertTrue(set(old_files) <= set(self._stored_files()))
+
+    def test_collect_deletes_orphans_only(self):
+        """Test the GC command keeps referenced and recent files."""
+        recipe = self._upload(self._recipe())
+        orphan = default_storage.save(
+            'uploads/recipe/orphan.jpg', ContentFile(b'old')
+        )
+        recent = default_storage.save(
+            'uploads/recipe/recent.jpg', ContentFile(b'new')
+        )
+        old = time.time() - 7200
+        os.utime(default_storage.path(orphan), (old, old))
+
+        call_command(
+            'collect_recipe_images', '--dry-run', stdout=io.StringIO()
+        )
+        self.assertTrue(default_storage.exists(orphan))
+
+        call_command('collect_recipe_images', stdout=io.StringIO())
+
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(recent))
+        self.assertTrue(default_storage.exists(recipe.image.name))
+        for formats in recipe.image_derivatives.values():
+            for name in formats.values():
+                self.assertTrue(default_storage.exists(name))
+
+    def test_collect_keeps_stored_derivative_names(self):
+        """Test the GC command keeps the derivatives a recipe points to."""
+        recipe = self._recipe()
+        image = default_storage.save(
+            'uploads/recipe/aa/bb/photo.jpg', ContentFile(b'image')
+        )
+        thumbnail = default_storage.save(
+            'uploads/recipe/aa/bb/other/thumbnail.webp', ContentFile(b'thumb')
+        )
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image=image,
+            image_derivatives={'thumbnail': {'webp': thumbnail}},
+        )
+        self._age_files()
+
+        call_command('collect_recipe_images', stdout=io.StringIO())
+
+        self.assertEqual(self._stored_files(), sorted([image, thumbnail]))
@@ -0,0 +1,207 @@
+"""Tests for the recipe image derivatives"""
+
+import io
+import os
+import tempfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import images
+
+
+def image_upload_url(recipe_id):
+    """Create and return the image upload URL."""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def detail_url(recipe_id):
+    """Create and return the detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(IMAGE_WORKERS=0)
+class ImageDerivativeTests(TestCase):
+    """Test rendering resized copies of uploaded images."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        for formats in self.recipe.image_derivatives.values():
+            for name in formats.values():
+                default_storage.delete(name)
+        self.recipe.image.delete()
+
+    def _upload(self, size=(1200, 900)):
+        """Upload a JPEG of the given size and return the response."""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', size, 'red').save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': image_file},
+                format='multipart',
+            )
+
+    def test_derivatives_rendered_after_commit(self):
+        """Test every size and format is stored once the upload commits."""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        derivatives = self.recipe.image_derivatives
+        self.assertEqual(set(derivatives), set(images.DERIVATIVE_SIZES))
+        for size, pixels in images.DERIVATIVE_SIZES.items():
+            self.assertEqual(
+                set(derivatives[size]), set(images.DERIVATIVE_FORMATS)
+            )
+            for fmt, name in derivatives[size].items():
+                with default_storage.open(name) as image_file:
+                    image = Image.open(image_file)
+                    self.assertEqual(image.format, images.DERIVATIVE_FORMATS[fmt])
+                    self.assertEqual(image.width, pixels)
+                    self.assertEqual(image.height, pixels * 3 // 4)
+
+    def test_upload_does_not_render_in_request(self):
+        """Test the upload request only schedules the rendering."""
+        with patch('recipe.images.render_derivatives') as mock_render:
+            with self.captureOnCommitCallbacks():
+                res = self._upload()
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            mock_render.assert_not_called()
+            self.assertEqual(res.data.get('image_derivatives', {}), {})
+
+    def test_detail_exposes_derivative_urls(self):
+        """Test the recipe detail returns absolute derivative URLs."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        url = res.data['image_derivatives']['thumbnail']['webp']
+        self.assertTrue(url.startswith('http://testserver/static/media/'))
+        self.assertTrue(url.endswith('/thumbnail.webp'))
+
+    def test_new_upload_resets_derivatives(self):
+        """Test replacing the image drops the derivatives of the old one."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload()
+        self.recipe.refresh_from_db()
+        old = self.recipe.image_derivatives
+        old_image = self.recipe.image.name
+
+        with self.captureOnCommitCallbacks():
+            self._upload()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_derivatives, {})
+        for formats in old.values():
+            for name in formats.values():
+                default_storage.delete(name)
+        default_storage.delete(old_image)
+
+    def test_stale_derivatives_are_not_stored(self):
+        """Test a result for a replaced image is discarded."""
+        self.recipe.image = 'uploads/recipe/current.jpg'
+        self.recipe.save()
+
+        images.store_derivatives(
+            self.recipe.id,
+            'uploads/recipe/previous.jpg',
+            {'thumbnail': {'webp': 'uploads/recipe/previous/thumbnail.webp'}},
+        )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_derivatives, {})
+
+    @override_settings(IMAGE_WORKERS=1)
+    def test_worker_pool_renders_derivatives(self):
+        """Test the worker processes render and return the names."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 400), 'blue').save(buffer, 'JPEG')
+        image_name = default_storage.save(
+            'uploads/recipe/pool.jpg', ContentFile(buffer.getvalue())
+        )
+
+        with patch('recipe.images._executor', None):
+            executor = images.get_executor()
+            try:
+                derivatives = executor.submit(
+                    images.render_derivatives, image_name
+                ).result(timeout=60)
+            finally:
+                executor.shutdown()
+
+        for formats in derivatives.values():
+            for name in formats.values():
+                self.assertTrue(default_storage.exists(name))
+                default_storage.delete(name)
+        default_storage.delete(image_name)
+
+    @override_settings(IMAGE_WORKERS=1)
+    def test_broken_pool_is_replaced(self):
+        """Test a pool whose worker died is rebuilt for the next upload."""
+        broken = MagicMock()
+        broken.submit.side_effect = BrokenProcessPool()
+        future = Future()
+        fresh = MagicMock()
+        fresh.submit.return_value = future
+
+        with patch('recipe.images._executor', broken), \
+                patch('recipe.images.ProcessPoolExecutor',
+                      return_value=fresh):
+            result = images.submit_derivatives(
+                self.recipe.id, 'uploads/recipe/broken.jpg'
+            )
+            self.assertIs(images._executor, fresh)
+
+        broken.shutdown.assert_called_once_with(wait=False)
+        self.assertIs(result, future)
+
+    @override_settings(IMAGE_WORKERS=1)
+    def test_scheduling_failure_keeps_upload(self):
+        """Test an upload succeeds when derivatives cannot be scheduled."""
+        broken = MagicMock()
+        broken.submit.side_effect = BrokenProcessPool()
+
+        with patch('recipe.images.get_executor', return_value=broken), \
+                self.assertLogs('recipe.images', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_derivatives, {})
+
+    def test_workers_spawned_with_python(self):
+        """Test workers do not start with a server binary as interpreter."""
+        with patch('recipe.images.sys.executable', '/usr/bin/uwsgi'):
+            executable = images._python_executable()
+
+        self.assertTrue(os.path.basename(executable).startswith('python'))
@@ -0,0 +1,73 @@
+"""Tests the list queries are served by the per-user indexes"""
+
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from core.benchmark import (
+    explain,
+    get_bench_users,
+    seed_recipes,
+    seq_scanned_tables,
+    view_queryset,
+)
+from recipe.pagination import RecipeAttrCursorPagination, RecipeCursorPagination
+from recipe.views import RecipeViewSet, TagViewSet, IngredientViewSet
+
+
+TABLES = ('core_recipe', 'core_tag', 'core_ingredient')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN output is Postgres specific')
+class ListIndexPlanTests(TestCase):
+    """Test the query plans of the per-user list endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = get_bench_users(10)
+        for user in cls.users:
+            seed_recipes(user, 1000, tags=50, ingredients=200)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.user = cls.users[0]
+
+    def _assert_index_plan(self, queryset, index):
+        """Assert the plan uses index and no sequential scan."""
+        plan = explain(queryset)
+
+        self.assertIn(index, plan)
+        self.assertEqual(seq_scanned_tables(plan, TABLES), [])
+
+    def test_recipe_page_uses_user_id_index(self):
+        """Test the first recipe page is read from the (user, -id) index."""
+        queryset = view_queryset(RecipeViewSet, self.user).order_by(
+            *RecipeCursorPagination.ordering
+        )[:51]
+
+        self._assert_index_plan(queryset, 'recipe_user_id_desc_idx')
+
+    def test_tag_page_uses_unique_name_index(self):
+        """Test the tag list is read from the (user, name) index."""
+        queryset = view_queryset(TagViewSet, self.user).order_by(
+            *RecipeAttrCursorPagination.ordering
+        )[:51]
+
+        self._assert_index_plan(queryset, 'unique_tag_name_per_user')
+
+    def test_ingredient_page_uses_unique_name_index(self):
+        """Test the ingredient list is read from the (user, name) index."""
+        queryset = view_queryset(IngredientViewSet, self.user).order_by(
+            *RecipeAttrCursorPagination.ordering
+        )[:51]
+
+        self._assert_index_plan(queryset, 'unique_ingredient_name_per_user')
+
+    def test_assigned_only_uses_partial_index(self):
+        """Test assigned_only reads the index of tags in use, no join."""
+        queryset = view_queryset(
+            TagViewSet, self.user, params={'assigned_only': 1}
+        ).order_by(*RecipeAttrCursorPagination.ordering)[:51]
+
+        self.assertNotIn('core_recipe_tags', str(queryset.query))
+        self._assert_index_plan(queryset, 'tag_user_assigned_idx')
@@ -11,7 +11,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Ingredient
-from recipe.serializers import IngredientSerializer
+from recipe.serializers import IngredientDetailSerializer
 
 INGREDIENT_URL  = reverse('recipe:ingredient-list')
 
@@ -47,7 +47,7 @@ class PrivateIngredientApiTest(TestCase):
 
         res = self.client.get(INGREDIENT_URL)
         ingredients = Ingredient.objects.all().order_by('-name')
-        serializer = IngredientSerializer(ingredients, many=True)
+        serializer = IngredientDetailSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(serializer.data, res.data)
 
@@ -96,8 +96,9 @@ class PrivateIngredientApiTest(TestCase):
         )
         recipe.ingredients.add(in1)
         res = self.client.get(INGREDIENT_URL, {'assigned_only' : 1})
-        s1 = IngredientSerializer(in1)
-        s2 = IngredientSerializer(in2)
+        in1.refresh_from_db()
+        s1 = IngredientDetailSerializer(in1)
+        s2 = IngredientDetailSerializer(in2)
         self.assertIn(s1.data, res.data)
         self.assertNotIn(s2.data, res.data)
 
@@ -0,0 +1,227 @@
+"""Query count regression tests for the recipe API"""
+
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Create and return the detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipes(user, count):
+    """Create recipes each with its own tags and ingredients."""
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=10,
+            price=Decimal('2.50'),
+        )
+        recipe.tags.add(
+            Tag.objects.create(user=user, name=f'Tag {recipe.id}a'),
+            Tag.objects.create(user=user, name=f'Tag {recipe.id}b'),
+        )
+        recipe.ingredients.add(
+            Ingredient.objects.create(
+                user=user, name=f'Ingredient {recipe.id}'
+            ),
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test the number of queries issued by the recipe endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _count_list_queries(self):
+        """Return the number of queries needed to list recipes."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes does not issue queries per recipe."""
+        create_recipes(self.user, 2)
+        small = self._count_list_queries()
+
+        create_recipes(self.user, 20)
+        large = self._count_list_queries()
+
+        self.assertEqual(small, large)
+
+    def test_list_query_count(self):
+        """Test listing recipes uses one query plus one per relation."""
+        create_recipes(self.user, 5)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 5)
+        self.assertEqual(len(res.data[0]['tags']), 2)
+        self.assertEqual(len(res.data[0]['ingredients']), 1)
+
+    def test_list_defers_detail_columns(self):
+        """Test the list query does not select description or image."""
+        create_recipes(self.user, 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPES_URL)
+
+        recipe_sql = ctx.captured_queries[0]['sql']
+        self.assertNotIn('"description"', recipe_sql)
+        self.assertNotIn('"image"', recipe_sql)
+
+    def test_retrieve_query_count(self):
+        """Test retrieving a recipe prefetches tags and ingredients."""
+        recipe = create_recipes(self.user, 1)[0]
+
+        # ETag marker, recipe, tags and ingredients.
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('description', res.data)
+
+    def _count_create_queries(self, ingredient_count):
+        """Return the queries needed to create a recipe with new items."""
+        payload = {
+            'title': 'Stew',
+            'time_minutes': 60,
+            'price': Decimal('9.00'),
+            'tags': [{'name': 'Dinner'}, {'name': 'Winter'}],
+            'ingredients': [
+                {'name': f'Ingredient {i}'} for i in range(ingredient_count)
+            ],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPES_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return len(ctx.captured_queries)
+
+    def test_create_query_count_is_constant(self):
+        """Test nested tags and ingredients are created in batches."""
+        small = self._count_create_queries(3)
+        Recipe.objects.all().delete()
+        Ingredient.objects.all().delete()
+        Tag.objects.all().delete()
+
+        large = self._count_create_queries(30)
+
+        self.assertEqual(small, large)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 30
+        )
+
+    def test_create_reuses_existing_items(self):
+        """Test existing items are linked instead of duplicated."""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        payload = {
+            'title': 'Stew',
+            'time_minutes': 60,
+            'price': Decimal('9.00'),
+            'tags': [{'name': 'Dinner'}, {'name': 'Dinner'}, {'name': 'Soup'}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertIn(tag, recipe.tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+
+class RecipeUpdateQueryTests(TestCase):
+    """Test updates only write the changed recipe relations."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipes(self.user, 1)[0]
+        self.tag_names = [tag.name for tag in self.recipe.tags.all()]
+
+    def _patch_tags(self, names):
+        """Patch the recipe tags and return the captured queries."""
+        payload = {'tags': [{'name': name} for name in names]}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(
+                detail_url(self.recipe.id), payload, format='json'
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [query['sql'] for query in ctx.captured_queries]
+
+    def _through_writes(self, queries, verb):
+        """Return the queries writing the recipe tags through table."""
+        table = Recipe.tags.through._meta.db_table
+        return [
+            sql for sql in queries
+            if sql.startswith(verb) and f'"{table}"' in sql
+        ]
+
+    def test_noop_update_writes_nothing(self):
+        """Test patching the same tags leaves the through table alone."""
+        queries = self._patch_tags(self.tag_names)
+
+        self.assertEqual(self._through_writes(queries, 'INSERT'), [])
+        self.assertEqual(self._through_writes(queries, 'DELETE'), [])
+        self.assertFalse(
+            [sql for sql in queries if '"core_tag"' in sql
+             and sql.startswith('INSERT')]
+        )
+
+    def test_single_add_inserts_one_row(self):
+        """Test adding a tag issues one insert and no delete."""
+        queries = self._patch_tags(self.tag_names + ['New'])
+
+        self.assertEqual(len(self._through_writes(queries, 'INSERT')), 1)
+        self.assertEqual(self._through_writes(queries, 'DELETE'), [])
+        self.assertEqual(self.recipe.tags.count(), 3)
+
+    def test_single_remove_deletes_one_row(self):
+        """Test removing a tag issues one delete and no insert."""
+        queries = self._patch_tags(self.tag_names[:1])
+
+        self.assertEqual(self._through_writes(queries, 'INSERT'), [])
+        self.assertEqual(len(self._through_writes(queries, 'DELETE')), 1)
+        self.assertEqual(
+            [tag.name for tag in self.recipe.tags.all()],
+            self.tag_names[:1],
+        )
+
+    def test_noop_update_query_count(self):
+        """Test a no-op tag update only reads and saves the recipe."""
+        payload = {'tags': [{'name': name} for name in self.tag_names]}
+
+        # If-Match marker, recipe + 2 prefetches, savepoint, UPDATE,
+        # release, 2 re-reads and the new ETag marker.
+        with self.assertNumQueries(10):
+            self.client.patch(
+                detail_url(self.recipe.id), payload, format='json'
+            )
@@ -11,6 +11,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from core.models import Recipe, Tag, Ingredient
+from recipe.filters import MAX_BATCH_IDS
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 import tempfile
 import os
@@ -134,6 +135,24 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(recipe.link, original_link)
         self.assertEqual(recipe.user, self.user)
 
+    def test_update_keeps_concurrent_image_writes(self):
+        """Test an update does not write back an image read before it"""
+        recipe = create_recipe(user=self.user)
+        stale = Recipe.objects.get(pk=recipe.pk)
+        derivatives = {'thumbnail' : {'webp' : 'uploads/recipe/a/thumbnail.webp'}}
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image='uploads/recipe/a.jpg', image_derivatives=derivatives
+        )
+
+        serializer = RecipeDetailSerializer(stale, data={'title' : 'New'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'New')
+        self.assertEqual(recipe.image.name, 'uploads/recipe/a.jpg')
+        self.assertEqual(recipe.image_derivatives, derivatives)
+
     def test_full_update(self):
         """Testing the full update for update"""
         recipe = create_recipe(user=self.user)
@@ -402,6 +421,80 @@ class PrivateRecipeAPITests(TestCase):
 
 
 
+    def test_filter_by_tags_match_all(self):
+        """Test match=all returns recipes having every given tag"""
+        tag1 = Tag.objects.create(user = self.user, name = "Vegan")
+        tag2 = Tag.objects.create(user = self.user, name = "Quick")
+        r1 = create_recipe(user = self.user, title = "Salad")
+        r2 = create_recipe(user = self.user, title = "Curry")
+        r1.tags.add(tag1, tag2)
+        r2.tags.add(tag1)
+
+        params = {'tags' : f'{tag1.id},{tag2.id}', 'match' : 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [r1.id])
+
+    def test_filter_by_tags_returns_unique_recipes(self):
+        """Test a recipe matching several tags is listed once"""
+        tag1 = Tag.objects.create(user = self.user, name = "Vegan")
+        tag2 = Tag.objects.create(user = self.user, name = "Quick")
+        recipe = create_recipe(user = self.user)
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags' : f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual([r['id'] for r in res.data], [recipe.id])
+
+    def test_filter_invalid_match_returns_error(self):
+        """Test an unknown match mode returns a bad request"""
+        res = self.client.get(RECIPES_URL, {'tags' : '1', 'match' : 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_invalid_ids_returns_error(self):
+        """Test tag or ingredient IDs that are not numbers return a bad request"""
+        too_many = ','.join(str(i) for i in range(MAX_BATCH_IDS + 1))
+        for param in ('tags', 'ingredients'):
+            for ids in ('1,abc', '\u00b2', too_many):
+                res = self.client.get(
+                    RECIPES_URL, {param : ids, 'match' : 'all'}
+                )
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(param, res.data)
+
+    def test_list_paginated_with_page_size(self):
+        """Test passing page_size returns cursor paginated results"""
+        recipes = [create_recipe(user=self.user, title=f'R{i}') for i in range(5)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipes[4].id, recipes[3].id],
+        )
+        self.assertIsNone(res.data['previous'])
+        self.assertIsNotNone(res.data['next'])
+
+    def test_list_pagination_follows_cursor(self):
+        """Test following next links returns every recipe once"""
+        recipes = [create_recipe(user=self.user, title=f'R{i}') for i in range(5)]
+
+        seen = []
+        url = f'{RECIPES_URL}?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(r['id'] for r in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(seen, [r.id for r in reversed(recipes)])
+
+
+
 class ImageUploadTests(TestCase):
     """Testing for image uploading"""
     def setUp(self):
@@ -0,0 +1,160 @@
+"""Tests for the recipe counts of tags and ingredients"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.views import TagViewSet
+
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class RecipeCountTests(TestCase):
+    """Test recipe_count follows the recipe links"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick')
+        ]
+        self.recipes = [self._recipe(f'Recipe {i}') for i in range(2)]
+
+    def _recipe(self, title):
+        return Recipe.objects.create(
+            user=self.user, title=title, time_minutes=5, price=Decimal('1')
+        )
+
+    def assertCounts(self, model, expected):
+        self.assertEqual(
+            list(model.objects.order_by('id').values_list(
+                'recipe_count', flat=True
+            )),
+            expected,
+        )
+
+    def test_add_and_remove(self):
+        """Test adding and removing tags of a recipe"""
+        self.recipes[0].tags.add(*self.tags)
+        self.recipes[1].tags.add(self.tags[0])
+        self.recipes[1].tags.add(self.tags[0])
+        self.assertCounts(Tag, [2, 1])
+
+        self.recipes[0].tags.remove(self.tags[0])
+        # Removing a link that does not exist changes nothing.
+        self.recipes[1].tags.remove(self.tags[1])
+        self.assertCounts(Tag, [1, 1])
+
+        self.recipes[0].tags.clear()
+        self.assertCounts(Tag, [1, 0])
+
+    def test_reverse_add_and_clear(self):
+        """Test linking recipes from the tag side"""
+        self.tags[0].recipes.add(*self.recipes)
+        self.assertCounts(Tag, [2, 0])
+
+        self.tags[0].recipes.remove(self.recipes[0])
+        self.assertCounts(Tag, [1, 0])
+
+        self.tags[0].recipes.clear()
+        self.assertCounts(Tag, [0, 0])
+
+    def test_recipe_delete(self):
+        """Test deleting a recipe uncounts its tags and ingredients"""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipes[0].tags.add(*self.tags)
+        self.recipes[0].ingredients.add(salt)
+        self.recipes[1].tags.add(self.tags[0])
+
+        self.recipes[0].delete()
+
+        self.assertCounts(Tag, [1, 0])
+        self.assertCounts(Ingredient, [0])
+
+    def test_bulk_import_counts(self):
+        """Test recipes imported in bulk are counted"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = [
+            {
+                'title': f'Imported {i}',
+                'time_minutes': 5,
+                'price': '1.00',
+                'tags': [{'name': 'Vegan'}, {'name': 'New'}],
+            }
+            for i in range(3)
+        ]
+
+        res = client.post(
+            reverse('recipe:recipe-bulk-import'), payload, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertCounts(Tag, [3, 0, 3])
+
+
+class AssignedOnlyTests(TestCase):
+    """Test the attribute lists expose and filter on recipe_count"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_returns_recipe_count(self):
+        """Test tags are listed with the number of recipes using them"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Quick')
+        for i in range(2):
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=5,
+                price=Decimal('1'),
+            ).tags.add(tag)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(
+            res.data, [{'id': tag.id, 'name': 'Vegan', 'recipe_count': 2}]
+        )
+        self.assertFalse(any(
+            'core_recipe_tags' in query['sql']
+            for query in ctx.captured_queries
+        ))
+
+    def test_rename_keeps_concurrent_count(self):
+        """Test renaming a tag keeps counts changed since it was read"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        get_object = TagViewSet.get_object
+
+        def get_object_then_link(view):
+            obj = get_object(view)
+            # A recipe linked by another request meanwhile.
+            Tag.objects.filter(pk=obj.pk).update(
+                recipe_count=F('recipe_count') + 1
+            )
+            return obj
+
+        with patch.object(TagViewSet, 'get_object', get_object_then_link):
+            res = self.client.patch(
+                reverse('recipe:tag-detail', args=[tag.id]),
+                {'name': 'Plant based'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag.refresh_from_db()
+        self.assertEqual((tag.name, tag.recipe_count), ('Plant based', 1))
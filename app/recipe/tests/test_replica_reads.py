@@ -0,0 +1,102 @@
+"""
+Tests for the recipe API reads served by the read replicas
+"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.routers import ReplicaRouter, reading_replicas
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+@override_settings(REPLICA_DATABASES=['replica_0'], REPLICA_PIN_SECONDS=5)
+class ReplicaReadTests(TestCase):
+    """Test which requests may read the replicas"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=Decimal('1'),
+        )
+        self.routed = []
+
+        def record(router, model, **hints):
+            self.routed.append(reading_replicas())
+            # The replicas are stand-ins for the test database.
+            return None
+
+        patcher = patch.object(
+            ReplicaRouter, 'db_for_read', autospec=True, side_effect=record
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _replica_read(self, method, url, *args, **kwargs):
+        """Send a request and return whether it read the replicas."""
+        self.routed.clear()
+        res = getattr(self.client, method)(url, *args, **kwargs)
+        self.assertLess(res.status_code, 400)
+        return any(self.routed)
+
+    def test_list_and_retrieve_read_replicas(self):
+        """Test recipe, tag and ingredient reads use the replicas"""
+        self.assertTrue(self._replica_read('get', RECIPES_URL))
+        self.assertTrue(self._replica_read(
+            'get', reverse('recipe:recipe-detail', args=[self.recipe.id])
+        ))
+        self.assertTrue(self._replica_read('get', TAGS_URL))
+        self.assertTrue(
+            self._replica_read('get', reverse('recipe:ingredient-list'))
+        )
+
+    def test_other_actions_read_primary(self):
+        """Test writes and other GET actions stay on the primary"""
+        self.assertFalse(self._replica_read(
+            'patch',
+            reverse('recipe:recipe-detail', args=[self.recipe.id]),
+            {'title': 'Stew'},
+        ))
+        self.assertFalse(self._replica_read(
+            'get', reverse('recipe:recipe-export'), {'format': 'ndjson'}
+        ))
+
+    def test_reads_own_writes(self):
+        """Test a user who just wrote reads the primary"""
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(
+            'other@example.com', 'testpass123'
+        ))
+
+        res = self.client.post(
+            RECIPES_URL,
+            {'title': 'Salad', 'time_minutes': 5, 'price': '2.00'},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(self._replica_read('get', RECIPES_URL))
+        self.assertFalse(self._replica_read('get', TAGS_URL))
+        self.routed.clear()
+        other.get(RECIPES_URL)
+        self.assertTrue(any(self.routed))
+
+    def test_failed_write_does_not_pin(self):
+        """Test a rejected write leaves the user on the replicas"""
+        res = self.client.post(RECIPES_URL, {'title': ''}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(self._replica_read('get', RECIPES_URL))
@@ -0,0 +1,151 @@
+"""Tests for the recipe response cache"""
+
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.cache import cache_stats, get_response_cache
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+IMPORT_URL = reverse('recipe:recipe-bulk-import')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {'title': 'Sample', 'time_minutes': 10, 'price': Decimal('5.00')}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+# The local memory cache of the tests is not shared, which turns the
+# response cache off by default.
+@override_settings(RESPONSE_CACHE_TIMEOUT=300)
+class ResponseCacheTests(TestCase):
+    """Test caching list responses per user."""
+
+    def setUp(self):
+        get_response_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_second_list_is_served_from_cache(self):
+        """Test a repeated list request does not query the database."""
+        create_recipe(self.user)
+        stats = cache_stats()
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPES_URL)
+
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.json(), res.json())
+        self.assertEqual(cache_stats()['hits'], stats['hits'] + 1)
+        self.assertEqual(cache_stats()['misses'], stats['misses'] + 1)
+
+    def test_equivalent_params_share_entry(self):
+        """Test reordered tag IDs hit the same cache entry."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Quick')
+
+        self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag2.id}, {tag1.id}'})
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_different_params_are_cached_separately(self):
+        """Test filters are part of the cache key."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        create_recipe(self.user)
+
+        self.client.get(RECIPES_URL)
+        res = self.client.get(RECIPES_URL, {'tags': str(tag.id)})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.json(), [])
+
+    def test_create_invalidates(self):
+        """Test creating a recipe invalidates the cached list."""
+        self.client.get(RECIPES_URL)
+        create_recipe(self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.json()), 1)
+
+    def test_m2m_change_invalidates(self):
+        """Test linking a tag invalidates the cached list."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPES_URL)
+        self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        recipe.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.json()[0]['tags'], [{'id': tag.id, 'name': 'Vegan'}])
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(len(res.json()), 1)
+
+    def test_tag_delete_invalidates(self):
+        """Test deleting a tag invalidates the cached tag list."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        tag.delete()
+
+        self.assertEqual(self.client.get(TAGS_URL).json(), [])
+
+    def test_bulk_import_invalidates(self):
+        """Test importing recipes invalidates the cached list."""
+        self.client.get(RECIPES_URL)
+        line = {'title': 'Imported', 'time_minutes': 5, 'price': '1.00'}
+
+        self.client.post(
+            IMPORT_URL,
+            json.dumps(line).encode('utf-8'),
+            content_type='application/x-ndjson',
+        )
+
+        self.assertEqual(len(self.client.get(RECIPES_URL).json()), 1)
+
+    def test_users_do_not_share_entries(self):
+        """Test cached responses are per user."""
+        create_recipe(self.user)
+        self.client.get(RECIPES_URL)
+        other = get_user_model().objects.create_user('o@example.com', 'pass1234')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.json(), [])
+
+    def test_errors_are_not_cached(self):
+        """Test failed responses are not stored."""
+        self.client.get(RECIPES_URL, {'tags': '1', 'match': 'bad'})
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'match': 'bad'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotEqual(res.get('X-Cache'), 'HIT')
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        """Test a zero timeout disables the cache."""
+        self.client.get(RECIPES_URL)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('X-Cache', res)
@@ -0,0 +1,98 @@
+"""Contract tests for the fast recipe read path"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.rows import build_recipe_rows, iter_recipe_rows, value_columns
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+def normalize(data):
+    """Return plain dicts with relations sorted by id."""
+    data = dict(data)
+    for field in ('tags', 'ingredients'):
+        data[field] = sorted(
+            (dict(item) for item in data[field]), key=lambda item: item['id']
+        )
+    return data
+
+
+class RecipeRowsContractTests(TestCase):
+    """Test the fast rows match the existing serializers."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.request = APIRequestFactory().get('/')
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick', 'Dinner')
+        ]
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        full = Recipe.objects.create(
+            user=self.user,
+            title='Full',
+            description='Everything set',
+            time_minutes=45,
+            price=Decimal('12.3'),
+            link='https://example.com/full',
+            image='uploads/recipe/full.jpg',
+            image_derivatives={
+                'thumbnail': {'webp': 'uploads/recipe/full/thumbnail.webp'},
+            },
+        )
+        full.tags.add(*tags)
+        full.ingredients.add(salt)
+        Recipe.objects.create(
+            user=self.user,
+            title='Bare',
+            time_minutes=5,
+            price=Decimal('0.5'),
+        )
+        self.queryset = Recipe.objects.order_by('-id')
+
+    def _assert_contract(self, serializer_class):
+        fields = serializer_class.Meta.fields
+        rows = list(self.queryset.values(*value_columns(fields)))
+        fast = build_recipe_rows(rows, fields, self.request)
+        expected = serializer_class(
+            self.queryset, many=True, context={'request': self.request}
+        ).data
+
+        self.assertEqual(
+            [normalize(row) for row in fast],
+            [normalize(row) for row in expected],
+        )
+        self.assertEqual(list(fast[0]), list(expected[0]))
+
+    def test_list_rows_match_recipe_serializer(self):
+        """Test list rows match RecipeSerializer output."""
+        self._assert_contract(RecipeSerializer)
+
+    def test_detail_rows_match_recipe_detail_serializer(self):
+        """Test detail rows match RecipeDetailSerializer output."""
+        self._assert_contract(RecipeDetailSerializer)
+
+    def test_iter_rows_match_in_chunks(self):
+        """Test iterating in chunks gives the same rows."""
+        fields = RecipeDetailSerializer.Meta.fields
+        rows = list(self.queryset.values(*value_columns(fields)))
+
+        self.assertEqual(
+            list(iter_recipe_rows(self.queryset, fields, chunk_size=1)),
+            build_recipe_rows(rows, fields),
+        )
+
+    def test_empty_rows(self):
+        """Test building no rows issues no queries."""
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                build_recipe_rows([], RecipeSerializer.Meta.fields), []
+            )
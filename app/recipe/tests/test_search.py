@@ -0,0 +1,178 @@
+"""Tests for the recipe full-text search"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe.search import has_trigram
+
+RECIPES_URL = reverse('recipe:recipe-list')
+IMPORT_URL = reverse('recipe:recipe-bulk-import')
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def ingredient_url(ingredient_id):
+    """Create and return an ingredient detail URL."""
+    return reverse('recipe:ingredient-detail', args=[ingredient_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchTests(TestCase):
+    """Test searching recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text, **params):
+        """Return the IDs of the recipes found for text."""
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [r['id'] for r in res.data]
+
+    def test_search_title_description_and_ingredients(self):
+        """Test words match the title, description or ingredient names."""
+        by_title = create_recipe(self.user, title='Tomato soup')
+        by_description = create_recipe(
+            self.user, title='Soup', description='With roasted tomatoes'
+        )
+        by_ingredient = create_recipe(self.user, title='Salad')
+        by_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Cherry tomato')
+        )
+        create_recipe(self.user, title='Pancakes')
+
+        ids = self._search('tomato')
+
+        self.assertEqual(ids, [by_title.id, by_description.id, by_ingredient.id])
+
+    def test_search_excludes_other_users(self):
+        """Test only the authenticated user's recipes are searched."""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123'
+        )
+        create_recipe(other, title='Tomato soup')
+        recipe = create_recipe(self.user, title='Tomato pie')
+
+        self.assertEqual(self._search('tomato'), [recipe.id])
+
+    def test_search_reflects_updated_title(self):
+        """Test a renamed recipe is found by its new title."""
+        recipe = create_recipe(self.user, title='Tomato soup')
+
+        self.client.patch(detail_url(recipe.id), {'title': 'Onion soup'})
+
+        self.assertEqual(self._search('tomato'), [])
+        self.assertEqual(self._search('onion'), [recipe.id])
+
+    def test_search_reflects_ingredient_changes(self):
+        """Test renaming and deleting an ingredient updates its recipes."""
+        recipe = create_recipe(self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Basil')
+        recipe.ingredients.add(ingredient)
+
+        self.client.patch(ingredient_url(ingredient.id), {'name': 'Parsley'})
+        self.assertEqual(self._search('basil'), [])
+        self.assertEqual(self._search('parsley'), [recipe.id])
+
+        self.client.delete(ingredient_url(ingredient.id))
+        self.assertEqual(self._search('parsley'), [])
+
+    def test_search_reflects_removed_ingredients(self):
+        """Test clearing a recipe's ingredients removes them from search."""
+        recipe = create_recipe(self.user)
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Garlic')
+        )
+
+        self.client.patch(
+            detail_url(recipe.id), {'ingredients': []}, format='json'
+        )
+
+        self.assertEqual(self._search('garlic'), [])
+
+    def test_search_finds_imported_recipes(self):
+        """Test recipes created by a bulk import are searchable."""
+        payload = [{
+            'title': 'Imported curry',
+            'time_minutes': 10,
+            'price': '2.50',
+            'ingredients': [{'name': 'Coconut'}],
+        }]
+
+        res = self.client.post(IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(self._search('coconut curry')), 1)
+
+    def test_search_pagination_follows_cursor(self):
+        """Test ranked pages return every match once, best first."""
+        for i in range(5):
+            create_recipe(
+                self.user,
+                title='Soup ' * (i + 1),
+                description=f'Variant {i}',
+            )
+
+        seen = []
+        url = f'{RECIPES_URL}?search=soup&page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(r['id'] for r in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(seen, self._search('soup'))
+        self.assertEqual(len(seen), 5)
+
+    def test_invalid_search_mode_returns_error(self):
+        """Test an unknown search mode returns a bad request."""
+        res = self.client.get(
+            RECIPES_URL, {'search': 'soup', 'search_mode': 'magic'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('recipe.search.has_trigram', return_value=False)
+    def test_fuzzy_search_unavailable_returns_error(self, mock_trigram):
+        """Test fuzzy mode without pg_trgm returns a bad request."""
+        res = self.client.get(
+            RECIPES_URL, {'search': 'soup', 'search_mode': 'fuzzy'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fuzzy_search_tolerates_typos(self):
+        """Test fuzzy mode matches misspelt titles."""
+        if not has_trigram():
+            self.skipTest('pg_trgm is not installed')
+        recipe = create_recipe(self.user, title='Spaghetti carbonara')
+        create_recipe(self.user, title='Pancakes')
+
+        ids = self._search('spagetti carbonara', search_mode='fuzzy')
+
+        self.assertEqual(ids, [recipe.id])
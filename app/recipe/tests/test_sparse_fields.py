@@ -0,0 +1,154 @@
+"""Tests for batch reads and sparse fieldsets of the recipe API"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.filters import MAX_BATCH_IDS
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Create and return the detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsTests(TestCase):
+    """Test the ids, fields and expand query params"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipes = []
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                description='Long text',
+                time_minutes=10,
+                price=Decimal('2.50'),
+                image=f'uploads/recipe/{i}.jpg',
+            )
+            recipe.tags.add(self.tag)
+            self.recipes.append(recipe)
+
+    def test_batch_by_ids(self):
+        """Test only the listed recipes of the user are returned"""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123'
+        )
+        hidden = Recipe.objects.create(
+            user=other, title='Hidden', time_minutes=1, price=Decimal('1')
+        )
+        ids = [self.recipes[0].id, self.recipes[2].id, hidden.id]
+
+        res = self.client.get(
+            RECIPES_URL, {'ids': ','.join(map(str, ids))}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row['id'] for row in res.data],
+            [self.recipes[2].id, self.recipes[0].id],
+        )
+
+    def test_batch_rejects_bad_ids(self):
+        """Test malformed or too many IDs are rejected"""
+        too_many = ','.join(str(i) for i in range(MAX_BATCH_IDS + 1))
+        for ids in ('1,a', '\u00b2', too_many):
+            res = self.client.get(RECIPES_URL, {'ids': ids})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('ids', res.data)
+
+    def test_fields_trim_query_and_output(self):
+        """Test a grid of id, title and image costs one narrow query"""
+        ids = ','.join(str(recipe.id) for recipe in self.recipes)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                RECIPES_URL, {'ids': ids, 'fields': 'title,image'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(res.data[0]), ['id', 'title', 'image'])
+        self.assertTrue(res.data[0]['image'].endswith('.jpg'))
+        recipe_queries = [
+            query['sql'] for query in ctx.captured_queries
+            if 'core_recipe' in query['sql']
+        ]
+        self.assertEqual(len(recipe_queries), 1)
+        self.assertNotIn('"description"', recipe_queries[0])
+        self.assertNotIn('"price"', recipe_queries[0])
+
+    def test_relations_as_ids_unless_expanded(self):
+        """Test relations are IDs, or objects when expanded"""
+        res = self.client.get(RECIPES_URL, {'fields': 'tags,ingredients'})
+
+        self.assertEqual(res.data[0]['tags'], [self.tag.id])
+        self.assertEqual(res.data[0]['ingredients'], [])
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id', 'expand': 'tags'})
+
+        self.assertEqual(list(res.data[0]), ['id', 'tags'])
+        self.assertEqual(
+            res.data[0]['tags'], [{'id': self.tag.id, 'name': 'Vegan'}]
+        )
+
+    def test_unknown_field_rejected(self):
+        """Test unknown fields and relations are rejected"""
+        for params in ({'fields': 'title,user'}, {'expand': 'title'}):
+            res = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_fields(self):
+        """Test a single recipe can be trimmed too"""
+        url = detail_url(self.recipes[0].id)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(url, {'fields': 'title,description'})
+
+        self.assertEqual(
+            res.data,
+            {
+                'id': self.recipes[0].id,
+                'title': 'Recipe 0',
+                'description': 'Long text',
+            },
+        )
+
+    def test_retrieve_etag_depends_on_fields(self):
+        """Test a trimmed response does not share the full one's ETag"""
+        url = detail_url(self.recipes[0].id)
+        full = self.client.get(url)
+
+        res = self.client.get(
+            url, {'fields': 'title'}, HTTP_IF_NONE_MATCH=full['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(res.data), ['id', 'title'])
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=300)
+    def test_cached_lists_keyed_by_fields(self):
+        """Test cached lists of different fieldsets are kept apart"""
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'fields': 'title'})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(list(res.data[0]), ['id', 'title'])
@@ -8,7 +8,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Tag
-from recipe.serializers import TagSerializer
+from recipe.serializers import TagDetailSerializer
 from core.models import Recipe
 
 TAGS_URL = reverse('recipe:tag-list')
@@ -49,7 +49,7 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL)
         tags = Tag.objects.all().order_by('-name')
-        serializer = TagSerializer(tags, many=True)
+        serializer = TagDetailSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(serializer.data, res.data)
 
@@ -77,6 +77,16 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_tag_update_duplicate_name_error(self):
+        """Testing renaming a tag to an existing name fails"""
+        Tag.objects.create(user=self.user, name="Dessert")
+        tag = Tag.objects.create(user=self.user, name="After Dinner")
+        res = self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "After Dinner")
+
     def test_tag_delete(self):
         """Testing deleting tags"""
         tag = Tag.objects.create(user=self.user, name='Breakfast')
@@ -100,8 +110,9 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        s1 = TagSerializer(tag1)
-        s2 = TagSerializer(tag2)
+        tag1.refresh_from_db()
+        s1 = TagDetailSerializer(tag1)
+        s2 = TagDetailSerializer(tag2)
         self.assertIn(s1.data, res.data)
         self.assertNotIn(s2.data, res.data)
 
@@ -127,3 +138,22 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_tags_paginated_by_name(self):
+        """Test paginating tags keeps the name ordering."""
+        for name in ['Apple', 'Banana', 'Cherry']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [t['name'] for t in res.data['results']],
+            ['Cherry', 'Banana'],
+        )
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [t['name'] for t in res.data['results']],
+            ['Apple'],
+        )
+        self.assertIsNone(res.data['next'])
@@ -0,0 +1,204 @@
+"""Tests for the streaming image upload validation"""
+
+import io
+import struct
+import zlib
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.uploads import ImageUploadHandler, read_dimensions
+
+
+GPS_INFO = 0x8825
+ORIENTATION = 0x0112
+
+
+def image_upload_url(recipe_id):
+    """Create and return the image upload URL."""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def encode_image(fmt, size=(64, 48), **params):
+    """Return the bytes of a noise image in the given format."""
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 64).convert('RGB').save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+def camera_exif():
+    """Return EXIF data with a GPS position and a rotation."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    exif[0x010F] = 'Camera maker'
+    exif[GPS_INFO] = {1: 'N', 2: (51.0, 30.0, 0.0)}
+    return exif.tobytes()
+
+
+def png_with_size(width, height):
+    """Return a PNG whose header claims the given size."""
+    data = encode_image('PNG', size=(1, 1))
+    ihdr = struct.pack('>II', width, height) + data[24:29]
+    crc = struct.pack('>I', zlib.crc32(b'IHDR' + ihdr))
+    return data[:16] + ihdr + crc + data[33:]
+
+
+class ImageUploadHandlerTests(TestCase):
+    """Test the upload handler rejects files from their first chunk."""
+
+    def _handler(self):
+        """Return a handler receiving a new file."""
+        handler = ImageUploadHandler()
+        handler.new_file('image', 'upload.jpg', 'image/jpeg', None)
+        return handler
+
+    def _receive(self, handler, data):
+        """Feed data to the handler in 64 KiB chunks like Django does."""
+        chunk_size = handler.chunk_size
+        for start in range(0, len(data), chunk_size):
+            handler.receive_data_chunk(data[start:start + chunk_size], start)
+        return handler.file_complete(len(data))
+
+    def test_rejects_non_image_on_first_chunk(self):
+        """Test unknown magic bytes are rejected before more is read."""
+        handler = self._handler()
+
+        with self.assertRaises(ValidationError):
+            handler.receive_data_chunk(b'#!/bin/sh\nrm -rf /\n' * 10, 0)
+
+    def test_rejects_decompression_bomb_from_header(self):
+        """Test an image claiming too many pixels is rejected early."""
+        handler = self._handler()
+
+        with self.assertRaises(ValidationError) as ctx:
+            handler.receive_data_chunk(png_with_size(50000, 50000), 0)
+
+        self.assertIn('pixels', str(ctx.exception.detail['image'][0]))
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=100 * 1024)
+    def test_rejects_oversized_file_when_limit_is_crossed(self):
+        """Test the upload stops at the chunk crossing the byte limit."""
+        handler = self._handler()
+        first = encode_image('JPEG')
+        handler.receive_data_chunk(first, 0)
+
+        with self.assertRaises(ValidationError):
+            handler.receive_data_chunk(b'\0' * 100 * 1024, len(first))
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=1024)
+    def test_rejects_declared_content_length(self):
+        """Test a request announcing a too large body is not read at all."""
+        handler = ImageUploadHandler()
+
+        with self.assertRaises(ValidationError):
+            handler.handle_raw_input(None, {}, 10 * 1024 * 1024, b'x')
+
+    def test_reads_dimensions_from_header(self):
+        """Test the size is known from the first bytes of each format."""
+        for fmt in ('JPEG', 'PNG', 'GIF', 'WEBP'):
+            data = encode_image(fmt, size=(300, 200))
+            with self.subTest(fmt=fmt):
+                self.assertEqual(read_dimensions(data[:1024], fmt), (300, 200))
+
+    def test_strips_jpeg_metadata_and_keeps_orientation(self):
+        """Test GPS and camera tags are removed from a JPEG."""
+        data = encode_image('JPEG', exif=camera_exif())
+
+        upload = self._receive(self._handler(), data)
+
+        with Image.open(upload) as image:
+            exif = image.getexif()
+            self.assertEqual(dict(exif), {ORIENTATION: 6})
+            with Image.open(io.BytesIO(data)) as original:
+                self.assertEqual(image.tobytes(), original.tobytes())
+        upload.seek(0)
+        self.assertEqual(upload.size, len(upload.read()))
+
+    def test_strips_png_text_chunks(self):
+        """Test text chunks are removed from a PNG."""
+        info = PngInfo()
+        info.add_text('Author', 'Someone')
+        data = encode_image('PNG', pnginfo=info)
+
+        upload = self._receive(self._handler(), data)
+
+        with Image.open(upload) as image:
+            self.assertNotIn('Author', image.info)
+            image.load()
+
+    def test_strips_webp_exif(self):
+        """Test the EXIF chunk is removed from a WebP."""
+        data = encode_image('WEBP', exif=camera_exif())
+
+        upload = self._receive(self._handler(), data)
+
+        with Image.open(upload) as image:
+            self.assertNotIn('exif', image.info)
+            image.load()
+
+
+class ImageUploadApiTests(TestCase):
+    """Test uploading images through the API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def _upload(self, name, content):
+        """Upload content as the recipe image."""
+        return self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': SimpleUploadedFile(name, content)},
+            format='multipart',
+        )
+
+    def test_upload_stores_stripped_image(self):
+        """Test the stored image has no GPS metadata."""
+        with self.captureOnCommitCallbacks():
+            res = self._upload('photo.jpg', encode_image(
+                'JPEG', exif=camera_exif()
+            ))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        with Image.open(self.recipe.image.path) as image:
+            self.assertNotIn(GPS_INFO, image.getexif())
+
+    def test_upload_non_image_returns_error(self):
+        """Test a renamed text file is rejected with a message."""
+        res = self._upload('fake.jpg', b'just some text, not an image')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=1000)
+    def test_upload_too_many_pixels_returns_error(self):
+        """Test an image above the pixel limit is rejected."""
+        res = self._upload('big.png', encode_image('PNG', size=(100, 100)))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
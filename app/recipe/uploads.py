@@ -0,0 +1,280 @@
+"""
+Streaming validation of uploaded recipe images.
+
+``ImageUploadHandler`` writes uploads straight to a temporary file and
+inspects the first chunks as they arrive, so oversized files, files that
+are not images and decompression bombs are rejected before the rest of
+the body is read. Accepted images have their metadata stripped without
+decoding the pixels.
+"""
+
+import io
+import shutil
+import struct
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+
+# Room for the multipart boundaries and headers around the file.
+MULTIPART_OVERHEAD = 64 * 1024
+# Bytes read looking for the dimensions before giving up.
+HEADER_LIMIT = 512 * 1024
+COPY_BUFFER_SIZE = 64 * 1024
+
+MAGIC_BYTES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+EXIF_ORIENTATION = 0x0112
+PNG_METADATA_CHUNKS = {b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME'}
+WEBP_METADATA_CHUNKS = {b'EXIF', b'XMP '}
+
+
+def sniff_format(header):
+    """Return the image format announced by the magic bytes, if any."""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    for magic, fmt in MAGIC_BYTES:
+        if header.startswith(magic):
+            return fmt
+    return None
+
+
+def _webp_dimensions(header):
+    """Read the canvas size from the first chunk of a WebP file."""
+    chunk, data = header[12:16], header[20:30]
+    if len(data) < 10:
+        return None
+    if chunk == b'VP8X':
+        return (
+            int.from_bytes(data[4:7], 'little') + 1,
+            int.from_bytes(data[7:10], 'little') + 1,
+        )
+    if chunk == b'VP8L':
+        bits = int.from_bytes(data[1:5], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', data[6:10])
+        return width & 0x3FFF, height & 0x3FFF
+    raise ValueError('Unknown WebP chunk.')
+
+
+def read_dimensions(header, fmt):
+    """Return the pixel size from the start of an image file.
+
+    Returns None while ``header`` is too short to contain the size. Only
+    the header is parsed, no pixel data is decoded.
+    """
+    if fmt == 'WEBP':
+        return _webp_dimensions(header)
+    try:
+        with Image.open(io.BytesIO(header)) as image:
+            return image.size
+    except Image.DecompressionBombError:
+        raise
+    except (OSError, SyntaxError, struct.error, IndexError):
+        return None
+
+
+def _copy(src, dst, length):
+    """Copy length bytes between files with a bounded buffer."""
+    while length > 0:
+        data = src.read(min(length, COPY_BUFFER_SIZE))
+        if not data:
+            raise ValueError('Truncated file.')
+        dst.write(data)
+        length -= len(data)
+
+
+def _exif_orientation(payload):
+    """Return the orientation tag of an EXIF APP1 payload."""
+    exif = Image.Exif()
+    try:
+        exif.load(payload)
+    except (OSError, SyntaxError, struct.error, ValueError):
+        return None
+    return exif.get(EXIF_ORIENTATION)
+
+
+def _orientation_segment(orientation):
+    """Return an APP1 segment holding only the orientation tag."""
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    payload = exif.tobytes()
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def _strip_jpeg(src, dst):
+    """Copy a JPEG without EXIF, XMP, IPTC and comment segments.
+
+    A rotated image keeps a minimal EXIF segment with its orientation.
+    """
+    dst.write(src.read(2))
+    while True:
+        marker = src.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            raise ValueError('Invalid JPEG marker.')
+        if marker[1] == 0xDA:
+            # Start of scan: the entropy coded data runs to the end.
+            dst.write(marker)
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            return
+        if 0xD0 <= marker[1] <= 0xD9 or marker[1] == 0x01:
+            dst.write(marker)
+            continue
+        length_bytes = src.read(2)
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker[1] in (0xE1, 0xED, 0xFE):
+            payload = src.read(length - 2)
+            if payload.startswith(b'Exif\x00\x00'):
+                orientation = _exif_orientation(payload)
+                if orientation not in (None, 1):
+                    dst.write(_orientation_segment(orientation))
+            continue
+        dst.write(marker + length_bytes)
+        _copy(src, dst, length - 2)
+
+
+def _strip_png(src, dst):
+    """Copy a PNG without text, time and EXIF chunks."""
+    dst.write(src.read(8))
+    while True:
+        head = src.read(8)
+        if not head:
+            return
+        length, chunk = struct.unpack('>I', head[:4])[0], head[4:]
+        if chunk in PNG_METADATA_CHUNKS:
+            src.seek(length + 4, io.SEEK_CUR)
+            continue
+        dst.write(head)
+        _copy(src, dst, length + 4)
+
+
+def _strip_webp(src, dst):
+    """Copy a WebP without EXIF and XMP chunks."""
+    dst.write(src.read(12))
+    while True:
+        head = src.read(8)
+        if not head:
+            break
+        chunk, length = head[:4], struct.unpack('<I', head[4:])[0]
+        padded = length + (length & 1)
+        if chunk in WEBP_METADATA_CHUNKS:
+            src.seek(padded, io.SEEK_CUR)
+            continue
+        dst.write(head)
+        if chunk == b'VP8X':
+            # Clear the EXIF and XMP flags of the extended header.
+            flags = src.read(1)[0] & ~0x0C
+            dst.write(bytes([flags]))
+            padded -= 1
+        _copy(src, dst, padded)
+    size = dst.seek(0, io.SEEK_END)
+    dst.seek(4)
+    dst.write(struct.pack('<I', size - 8))
+
+
+def strip_metadata(src, dst, fmt):
+    """Copy an image file without its metadata, leaving pixels untouched."""
+    if fmt == 'JPEG':
+        _strip_jpeg(src, dst)
+    elif fmt == 'PNG':
+        _strip_png(src, dst)
+    elif fmt == 'WEBP':
+        _strip_webp(src, dst)
+    else:
+        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Stream image uploads to disk, rejecting bad ones early.
+
+    Rejections raise a ``ValidationError`` from inside the multipart
+    parser, so the remainder of the request body is never read.
+    """
+
+    def _reject(self, message):
+        self.upload_interrupted()
+        raise ValidationError({'image': [message]})
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        """Reject a request whose declared length is already too large."""
+        max_bytes = settings.IMAGE_UPLOAD_MAX_BYTES
+        if content_length > max_bytes + MULTIPART_OVERHEAD:
+            self._reject(f'Image must be at most {max_bytes} bytes.')
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+        self.image_format = None
+        self.checked = False
+
+    def receive_data_chunk(self, raw_data, start):
+        max_bytes = settings.IMAGE_UPLOAD_MAX_BYTES
+        if start + len(raw_data) > max_bytes:
+            self._reject(f'Image must be at most {max_bytes} bytes.')
+        if not self.checked:
+            self._inspect(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def _inspect(self, raw_data, complete=False):
+        """Check the format and size once enough of the header arrived."""
+        self.header += raw_data
+        if self.image_format is None:
+            if len(self.header) < 12 and not complete:
+                return
+            self.image_format = sniff_format(self.header)
+            if self.image_format is None:
+                self._reject('Upload a JPEG, PNG, GIF or WebP image.')
+
+        max_pixels = settings.IMAGE_UPLOAD_MAX_PIXELS
+        try:
+            size = read_dimensions(self.header, self.image_format)
+        except Image.DecompressionBombError:
+            self._reject(f'Image must have at most {max_pixels} pixels.')
+        except ValueError:
+            size = (0, 0)
+        if size is None:
+            if complete or len(self.header) > HEADER_LIMIT:
+                self._reject('The image header could not be read.')
+            return
+
+        if not size[0] or not size[1]:
+            self._reject('The image header could not be read.')
+        if size[0] * size[1] > max_pixels:
+            self._reject(f'Image must have at most {max_pixels} pixels.')
+        self.checked = True
+        self.header = b''
+
+    def file_complete(self, file_size):
+        """Return a copy of the upload without its metadata."""
+        if not self.checked:
+            self._inspect(b'', complete=True)
+
+        upload = super().file_complete(file_size)
+        stripped = TemporaryUploadedFile(
+            self.file_name,
+            self.content_type,
+            0,
+            self.charset,
+            self.content_type_extra,
+        )
+        try:
+            strip_metadata(upload, stripped, self.image_format)
+        except (ValueError, IndexError, struct.error):
+            stripped.close()
+            self._reject('The image is corrupted.')
+        finally:
+            upload.close()
+
+        stripped.size = stripped.seek(0, io.SEEK_END)
+        stripped.seek(0)
+        self.file = stripped
+        return stripped
@@ -4,13 +4,43 @@ Views for the recipes API
 
 from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter, OpenApiTypes
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from core.models import Recipe,Tag, Ingredient
+from core.routers import ReplicaReadMixin
+from core.throttling import UserRateThrottle
+from user.authentication import CachedTokenAuthentication
 from recipe import serializers
-from .serializers import RecipeSerializer,RecipeDetailSerializer, TagSerializer, IngredientSerializer, RecipeImageSerializer
+from .bulk import import_recipes, export_recipe_rows, iter_ndjson, iter_csv
+from .cache import cache_response
+from .conditional import conditional, lock_recipe, recipe_etag, recipe_list_etag
+from .images import schedule_derivatives
+from .filters import filter_by_ids, filter_by_related, parse_ids, MATCH_ANY, MAX_BATCH_IDS
+from .pagination import RecipeCursorPagination, RecipeAttrCursorPagination
+from .parsers import ImageUploadParser, NDJSONParser
+from .renderers import NDJSONRenderer, CSVRenderer
+from .rows import build_recipe_rows, sparse_fieldset, value_columns
+from .search import search_recipes, MODE_TEXT
+from .serializers import RecipeSerializer,RecipeDetailSerializer, TagDetailSerializer, IngredientDetailSerializer, RecipeImageSerializer
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
+from rest_framework.parsers import JSONParser
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+
+
+SPARSE_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description = 'Comma separated fields to return, out of the detail fields; id is always included'
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description = 'Comma separated relations to return as objects; once fields or expand is given, other relations are lists of IDs'
+    ),
+]
 
 
 @extend_schema_view(
@@ -25,60 +55,216 @@ from rest_framework.response import Response
                 'ingredients',
                 OpenApiTypes.STR,
                 description = "comman seperated list of ingreident IDs to Filter"
-            )
+            ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR,
+                enum = ['any', 'all'],
+                description = 'Match recipes having any (default) or all of the given IDs'
+            ),
+            OpenApiParameter(
+                'page_size',
+                OpenApiTypes.INT,
+                description = 'Number of recipes per page, enables cursor pagination'
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description = 'Text to search in titles, descriptions and ingredients, best matches first'
+            ),
+            OpenApiParameter(
+                'search_mode',
+                OpenApiTypes.STR,
+                enum = ['text', 'fuzzy'],
+                description = 'Match words (default) or titles by similarity, tolerating typos'
+            ),
+            OpenApiParameter(
+                'ids',
+                OpenApiTypes.STR,
+                description = f'Comma separated list of at most {MAX_BATCH_IDS} recipe IDs to return'
+            ),
+            *SPARSE_PARAMETERS,
         ]
-    )
+    ),
+    retrieve = extend_schema(parameters = SPARSE_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()  # Order by ID in descending order
     serializer_class = RecipeDetailSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    throttle_classes = [UserRateThrottle]
+    throttle_scope = 'recipe'
 
-    def _params_to_ints(self,qs):
-        """Conver a list of string to integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    def _params_to_ints(self, qs, param):
+        """Convert a list of string to integers, 400 on anything else"""
+        return parse_ids(qs, param)
 
     def get_queryset(self):
         """Retrive the recipes for authenticated user """
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        match = self.request.query_params.get('match', MATCH_ANY)
         queryset = self.queryset 
+        ids = self.request.query_params.get('ids')
+        if ids:
+            queryset = filter_by_ids(queryset, ids)
         if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in = tag_ids)
+            tag_ids = self._params_to_ints(tags, 'tags')
+            queryset = filter_by_related(queryset, 'tags', tag_ids, match)
         if ingredients:
-            ingredients_id = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in = ingredients_id) 
+            ingredients_id = self._params_to_ints(ingredients, 'ingredients')
+            queryset = filter_by_related(
+                queryset, 'ingredients', ingredients_id, match
+            )
 
-        return queryset.filter(
+        queryset = queryset.filter(
             user = self.request.user
-        ).order_by('-id').distinct()
+        ).order_by('-id')
+        search = self.request.query_params.get('search')
+        if search:
+            mode = self.request.query_params.get('search_mode', MODE_TEXT)
+            queryset = search_recipes(queryset, search, mode)
+
+        return self._optimize_queryset(queryset)
+
+    def _optimize_queryset(self, queryset):
+        """Prefetch nested relations for actions serializing one recipe."""
+        if self.action in ('update', 'partial_update'):
+            queryset = queryset.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+                Prefetch(
+                    'ingredients',
+                    queryset=Ingredient.objects.only('id', 'name')
+                ),
+            )
+        return queryset
 
     def get_serializer_class(self):
         """Return the searlizer class for request"""
-        if self.action == 'list':
+        if self.action in ('list', 'bulk_import'):
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
 
         return self.serializer_class
 
+    @conditional(recipe_list_etag)
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        """List recipes built directly from database values"""
+        fields, expand = sparse_fieldset(
+            request.query_params, self.get_serializer_class().Meta.fields
+        )
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = value_columns(fields)
+        if 'rank' in queryset.query.annotations:
+            # Cursor pagination reads the position from the rows.
+            columns.append('rank')
+        rows = queryset.values(*columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                build_recipe_rows(page, fields, request, expand)
+            )
+        return Response(build_recipe_rows(list(rows), fields, request, expand))
+
+    @conditional(recipe_etag)
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe built directly from database values.
+
+        Answers If-None-Match without reading the recipe itself.
+        """
+        fields, expand = sparse_fieldset(
+            request.query_params, self.serializer_class.Meta.fields
+        )
+        row = get_object_or_404(
+            self.filter_queryset(self.get_queryset()).values(
+                *value_columns(fields)
+            ),
+            pk=kwargs[self.lookup_url_kwarg or self.lookup_field],
+        )
+        return Response(build_recipe_rows([row], fields, request, expand)[0])
+
+    @conditional(recipe_etag, lock=lock_recipe)
+    def update(self, request, *args, **kwargs):
+        """Update a recipe, honouring If-Match"""
+        return super().update(request, *args, **kwargs)
+
+    @conditional(recipe_etag, lock=lock_recipe)
+    def destroy(self, request, *args, **kwargs):
+        """Delete a recipe, honouring If-Match"""
+        return super().destroy(request, *args, **kwargs)
+
     def perform_create(self,serializer):
         """Create the new object for authenticated user"""
         serializer.save(user=self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @action(
+        methods=['POST'],
+        detail=True,
+        url_path='upload-image',
+        parser_classes=[ImageUploadParser],
+    )
     def upload_image(self,request, pk=None):
         """Upload an image to a recipe"""
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data = request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save(image_derivatives = {})
+            schedule_derivatives(recipe)
             return Response(serializer.data, status = status.HTTP_200_OK)
         return Response(serializer.errors, status = status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='import',
+        parser_classes=[NDJSONParser, JSONParser],
+    )
+    def bulk_import(self, request):
+        """Import recipes from an NDJSON stream or a JSON array"""
+        data = request.data
+        if isinstance(data, list):
+            rows = enumerate(data, 1)
+        elif isinstance(data, dict):
+            return Response(
+                {'detail': 'Expected NDJSON lines or a JSON array.'},
+                status = status.HTTP_400_BAD_REQUEST
+            )
+        else:
+            rows = data
+
+        result = import_recipes(rows, self.get_serializer_context())
+        if result['created']:
+            return Response(result, status = status.HTTP_201_CREATED)
+        return Response(result, status = status.HTTP_400_BAD_REQUEST)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request):
+        """Stream every recipe of the user as NDJSON or CSV"""
+        rows = export_recipe_rows(self.get_queryset(), request)
+        if request.accepted_renderer.format == 'csv':
+            content, extension = iter_csv(rows), 'csv'
+        else:
+            content, extension = iter_ndjson(rows), 'ndjson'
+
+        response = StreamingHttpResponse(
+            content,
+            content_type = request.accepted_renderer.media_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{extension}"'
+        )
+        return response
+
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -100,13 +286,23 @@ class RecipeViewSet(viewsets.ModelViewSet):
     ),
 )
 
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
+    throttle_classes = [UserRateThrottle]
+    throttle_scope = 'recipe'
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        """List the attributes of the authenticated user"""
+        return super().list(request, *args, **kwargs)
+
     def get_queryset(self):
         '''Filter the query set to authenticated user'''
         assigned_only = bool(
@@ -114,17 +310,16 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipes__isnull=False)
+            # Served by the partial index on tags and ingredients in use.
+            queryset = queryset.filter(recipe_count__gt=0)
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        return queryset.filter(user=self.request.user).order_by('-name')
 
 class TagViewSet(BaseRecipeAttrViewSet):
     queryset = Tag.objects.all()
-    serializer_class = TagSerializer
+    serializer_class = TagDetailSerializer
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """manage the ingredients in the database"""
     queryset = Ingredient.objects.all()
-    serializer_class = IngredientSerializer
+    serializer_class = IngredientDetailSerializer
@@ -0,0 +1,82 @@
+"""
+Authentication for the APIs.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import LRUCache
+
+
+_local_cache = LRUCache(
+    max_size=settings.TOKEN_AUTH_CACHE_SIZE,
+    ttl=settings.TOKEN_AUTH_CACHE_TTL,
+)
+
+
+def get_token_cache():
+    """Return the configured token cache.
+
+    ``TOKEN_AUTH_CACHE_ALIAS`` selects a Django cache shared between
+    workers; when empty a per-process LRU cache is used.
+    """
+    if settings.TOKEN_AUTH_CACHE_ALIAS:
+        return caches[settings.TOKEN_AUTH_CACHE_ALIAS]
+    return _local_cache
+
+
+def _cache_key(key):
+    return f'auth-token:{key}'
+
+
+def _values(instance):
+    """Return the column values of a model instance, in field order."""
+    return tuple(
+        getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+    )
+
+
+def _from_values(model, values):
+    """Build a fresh instance from values returned by ``_values``."""
+    return model.from_db(
+        DEFAULT_DB_ALIAS,
+        [field.attname for field in model._meta.concrete_fields],
+        values,
+    )
+
+
+def invalidate_token(key):
+    """Drop a token from the cache."""
+    get_token_cache().delete(_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication caching the token and user lookup.
+
+    Only column values are cached and every request gets instances of
+    its own, as views change ``request.user`` in place and the local
+    cache is shared by the threads of a worker.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        cached = cache.get(_cache_key(key))
+        if cached is not None:
+            user_values, token_values = cached
+            user = _from_values(get_user_model(), user_values)
+            token = _from_values(Token, token_values)
+            token.user = user
+            return user, token
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(
+            _cache_key(key),
+            (_values(user), _values(token)),
+            settings.TOKEN_AUTH_CACHE_TTL,
+        )
+        return user, token
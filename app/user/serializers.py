@@ -8,7 +8,9 @@ from django.contrib.auth import (
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
-class UserSerializer(serializers.ModelSerializer):
+from core.metrics import TimedRepresentationMixin
+
+class UserSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Serializer for the user object."""
     class Meta:
         model = get_user_model()
@@ -20,13 +22,17 @@ class UserSerializer(serializers.ModelSerializer):
         return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
-        """Update and return the user"""
+        """Update and return the user, saving only the changed columns"""
         password = validated_data.pop('password',None)
-        user = super().update(instance, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        update_fields = list(validated_data)
         if password:
-            user.set_password(password)
-            user.save()
-        return user
+            instance.set_password(password)
+            update_fields.append('password')
+        if update_fields:
+            instance.save(update_fields=update_fields)
+        return instance
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -0,0 +1,107 @@
+"""
+Tests for the cached token authentication
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from django.contrib.auth.hashers import make_password
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+
+from user.authentication import CachedTokenAuthentication, get_token_cache
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test caching token lookups and invalidating them"""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def _authenticate(self, key=None):
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Token {key or self.token.key}'
+        )
+        return self.auth.authenticate(request)
+
+    def test_second_lookup_is_cached(self):
+        """Test only the first authentication queries the database"""
+        with self.assertNumQueries(1):
+            user, token = self._authenticate()
+        with self.assertNumQueries(0):
+            cached_user, cached_token = self._authenticate()
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(cached_user, self.user)
+        self.assertEqual(cached_token.key, self.token.key)
+
+    def test_cached_lookups_not_shared(self):
+        """Test each request gets user and token instances of its own"""
+        self._authenticate()
+        first_user, first_token = self._authenticate()
+        first_user.name = 'Changed in place'
+
+        user, token = self._authenticate()
+
+        self.assertIsNot(user, first_user)
+        self.assertIsNot(token, first_token)
+        self.assertEqual(user.name, self.user.name)
+        self.assertIs(token.user, user)
+        self.assertFalse(user._state.adding)
+
+    def test_invalid_token_not_cached(self):
+        """Test an invalid token keeps failing"""
+        for _ in range(2):
+            with self.assertRaises(AuthenticationFailed):
+                self._authenticate('invalid')
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token invalidates the cache"""
+        self._authenticate()
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate()
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user invalidates the cache"""
+        self._authenticate()
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate()
+
+    def test_password_change_invalidates_cache(self):
+        """Test changing the password drops the cached lookup"""
+        self._authenticate()
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            user, _ = self._authenticate()
+        self.assertTrue(user.check_password('newpass123'))
+
+    def test_profile_update_keeps_changes_behind_cache(self):
+        """Test a profile update never writes cached columns back"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        client.get(reverse('user:me'))
+        # As another worker would, without invalidating this cache.
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password=make_password('changed123')
+        )
+
+        res = client.patch(reverse('user:me'), {'name': 'New Name'})
+
+        self.user.refresh_from_db()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.user.name, 'New Name')
+        self.assertTrue(self.user.check_password('changed123'))
@@ -2,8 +2,11 @@
 Tests for the user API
 """
 
-from django.test import TestCase
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.urls import reverse
 
 from rest_framework.test import APIClient
@@ -117,6 +120,33 @@ class PulicUserApiTests(TestCase):
         # Expecting 400 because password is required
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_token_rehashes_old_password(self):
+        """Test logging in upgrades a hash made by an older hasher"""
+        user = create_user(email='test@example.com', password='unused')
+        user.password = make_password('testpass123', hasher='pbkdf2_sha256')
+        user.save()
+
+        res = self.client.post(
+            TOKEN_URL, {'email': user.email, 'password': 'testpass123'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password('testpass123'))
+
+    @override_settings(HASHING_QUEUE_TIMEOUT=0)
+    def test_create_token_hashing_busy(self):
+        """Test logins are refused while every hashing slot is taken"""
+        create_user(email='test@example.com', password='testpass123')
+        payload = {'email': 'test@example.com', 'password': 'testpass123'}
+
+        with patch('core.hashers.threading.BoundedSemaphore.acquire',
+                   return_value=False):
+            res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
 
     def test_retrieve_user_authorized(self):
         '''Test authentication is required for user!'''
@@ -3,28 +3,39 @@ Views for the user API.
 '''
 
 
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+from core.throttling import EmailRateThrottle, IPRateThrottle
+from user.authentication import CachedTokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user int he system"""
     serializer_class  = UserSerializer
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = 'signup'
 
 class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user."""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = 'login'
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated users. """
 
     serializer_class = UserSerializer
-    authentication_class = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        """Retrieve and return the authenticated user"""
-        return self.request.user
\ No newline at end of file
+        """Retrieve and return the authenticated user.
+
+        Read again rather than taken from the request: the cached token
+        lookup may hold columns another worker has changed since.
+        """
+        return get_user_model().objects.get(pk=self.request.user.pk)
@@ -1,13 +1,19 @@
 server {
     listen ${LISTEN_PORT};
 
+    # Recipe images are named after their content and never change.
+    location /static/media/uploads/recipe/ {
+        alias /vol/static/media/uploads/recipe/;
+        expires max;
+        add_header Cache-Control "public, immutable";
+    }
+
     location /static {
         alias /vol/static;
     }
 
     location / {
-        uwsgi_pass ${APP_HOST}:${APP_PORT};
-        include /etc/nginx/uwsgi_params;
+        ${APP_PASS};
         client_max_body_size 10M;
     }
 }
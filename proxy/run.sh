@@ -1,4 +1,10 @@
 #!/bin/sh
 set -e
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
-nginx -g 'daemon off;'
\ No newline at end of file
+# Talk uwsgi to uWSGI, or HTTP to uvicorn when the app runs under ASGI.
+if [ "${APP_SERVER:-uwsgi}" = "asgi" ]; then
+    export APP_PASS="proxy_pass http://${APP_HOST}:${APP_PORT}; include /etc/nginx/proxy_params"
+else
+    export APP_PASS="uwsgi_pass ${APP_HOST}:${APP_PORT}; include /etc/nginx/uwsgi_params"
+fi
+envsubst '${LISTEN_PORT} ${APP_PASS}' < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+nginx -g 'daemon off;'
@@ -11,5 +11,21 @@ python manage.py migrate
 # Collect static files
 python manage.py collectstatic --noinput
 
-# Start the uWSGI server (use this in production)
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# Workers share their metrics through METRICS_DIR; start it empty so no
+# snapshot of an earlier run is taken for a live worker.
+if [ -n "${METRICS_DIR}" ]; then
+    rm -rf "${METRICS_DIR}"
+    mkdir -p "${METRICS_DIR}"
+fi
+
+# Start the app server (use this in production). APP_SERVER=asgi serves
+# app.asgi with uvicorn, where slow requests do not hold a worker thread
+# while their body is read; the proxy must be started with the same value.
+if [ "${APP_SERVER:-uwsgi}" = "asgi" ]; then
+    exec uvicorn app.asgi:application --host 0.0.0.0 --port 9000 \
+        --workers ${ASGI_WORKERS:-4} --proxy-headers \
+        --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-127.0.0.1}" --no-access-log
+else
+    exec uwsgi --socket :9000 --workers 4 --threads ${UWSGI_THREADS:-4} --master --enable-threads --module app.wsgi \
+        --py-sys-executable /py/bin/python
+fi